@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+File: artifact_store.py
+Content-addressed store for stage outputs, so work whose inputs did not change
+is skipped no matter what the files happen to be called.
+
+    data/artifacts/blobs/ab/abcdef...         one file per distinct content (sha256)
+    data/artifacts/index.sqlite3
+        blobs(hash, size, ext, refs, last_used)
+        keys(key, stage, hash, meta, last_used)   cache key -> blob + JSON metadata
+        file_hashes(path, size, mtime_ns, hash)   memo, so a 1 GB video is hashed once
+
+A stage's cache key is the sha256 of its name, the content hashes of its input
+files and its parameters (ArtifactStore.key). A blob's refs is the number of
+keys bound to it; gc() drops keys unused for MAX_AGE_DAYS (and the least
+recently used ones past MAX_GB), then deletes blobs nothing references.
+Blobs are copied in and handed out by hard link when possible (same
+filesystem), else copied; stages replace their outputs rather than rewrite them.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+
+from sqlite_index import SQLiteIndex
+
+CHUNK = 1 << 20
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+class ArtifactStore(SQLiteIndex):
+    """
+    Usage:
+        store = ArtifactStore('data/artifacts')
+        key = store.key('transcript', files=[video_path], model='tiny')
+        hit = store.fetch(key, 'temp/vid.json')        # meta dict (file materialized) or None
+        if hit is None:
+            ... run the stage, writing temp/vid.json ...
+            store.save(key, 'temp/vid.json', meta={'segments': 312})
+    """
+
+    def __init__(self, root='data/artifacts', db_path=None, timeout=30):
+        self.root = root
+        self.blob_dir = os.path.join(root, 'blobs')
+        self.db_path = db_path or os.path.join(root, 'index.sqlite3')
+        self.timeout = timeout
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+
+        conn = self._connect()
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+                         "ext TEXT NOT NULL, refs INTEGER NOT NULL, last_used REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS keys (key TEXT PRIMARY KEY, stage TEXT NOT NULL, "
+                         "hash TEXT NOT NULL, meta TEXT, last_used REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS keys_lru ON keys (last_used)")
+            conn.execute("CREATE TABLE IF NOT EXISTS file_hashes (path TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+                         "mtime_ns INTEGER NOT NULL, hash TEXT NOT NULL)")
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Hashing
+    # ------------------------------------------------------------------
+    def file_hash(self, path):
+        """sha256 of a file's content, memoized by (path, size, mtime)."""
+        st = os.stat(path)
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT hash FROM file_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                               (os.path.abspath(path), st.st_size, st.st_mtime_ns)).fetchone()
+        finally:
+            conn.close()
+        if row:
+            return row[0]
+
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self._remember_hash(path, digest)
+        return digest
+
+    def key(self, stage, files=(), **params):
+        """Cache key of a stage run: its name, the content of its input files and its parameters."""
+        inputs = {'stage': stage, 'files': [self.file_hash(p) for p in files], 'params': params}
+        return sha256_bytes(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8'))
+
+    # ------------------------------------------------------------------
+    # Blobs
+    # ------------------------------------------------------------------
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    @staticmethod
+    def _link_or_copy(src, dest):
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+
+    def _remember_hash(self, path, digest):
+        st = os.stat(path)
+        self._transaction(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+            (os.path.abspath(path), st.st_size, st.st_mtime_ns, digest)))
+
+    def _put_file(self, path, digest=None, link=False):
+        if digest: self._remember_hash(path, digest)
+        else: digest = self.file_hash(path)
+        ext = os.path.splitext(path)[1]
+        blob = self.blob_path(digest)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            if link:
+                self._link_or_copy(path, blob)
+            else:
+                # Copied, not linked: the stage may still rewrite its own file in place
+                tmp = f"{blob}.{os.getpid()}.tmp"
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, blob)
+        return digest, ext, os.path.getsize(blob)
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+    def lookup(self, key):
+        """
+        Returns:
+            tuple: (blob_path, meta) or None
+        """
+        now = time.time()
+        def find(conn):
+            row = conn.execute("SELECT k.hash, k.meta FROM keys k JOIN blobs b ON b.hash = k.hash "
+                               "WHERE k.key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("UPDATE keys SET last_used = ? WHERE key = ?", (now, key))
+                conn.execute("UPDATE blobs SET last_used = ? WHERE hash = ?", (now, row[0]))
+            return row
+        row = self._transaction(find)
+        if not row:
+            return None
+        blob = self.blob_path(row[0])
+        if not os.path.exists(blob):
+            self.forget(key)
+            return None
+        return blob, json.loads(row[1] or '{}')
+
+    def fetch(self, key, dest):
+        """Materializes the artifact of key at dest. Returns its meta, or None on a miss."""
+        hit = self.lookup(key)
+        if hit is None:
+            return None
+        os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+        self._link_or_copy(hit[0], dest)
+        return hit[1]
+
+    def save(self, key, path, stage='', meta=None, digest=None, link=False):
+        """
+        Stores the file at path as the artifact of key (refcounted; rebinding releases the old blob).
+        digest: sha256 already computed by the caller (e.g. while streaming a download)
+        link: the file is never rewritten in place (downloads), so it is hard-linked instead of copied
+        """
+        digest, ext, size = self._put_file(path, digest, link)
+        now = time.time()
+        def bind(conn):
+            old = conn.execute("SELECT hash FROM keys WHERE key = ?", (key,)).fetchone()
+            if old and old[0] == digest:
+                conn.execute("UPDATE keys SET meta = ?, last_used = ? WHERE key = ?", (json.dumps(meta or {}), now, key))
+                return
+            if old:
+                conn.execute("UPDATE blobs SET refs = refs - 1 WHERE hash = ?", (old[0],))
+            conn.execute("INSERT INTO blobs VALUES (?, ?, ?, 1, ?) "
+                         "ON CONFLICT(hash) DO UPDATE SET refs = refs + 1, last_used = excluded.last_used",
+                         (digest, size, ext, now))
+            conn.execute("INSERT OR REPLACE INTO keys VALUES (?, ?, ?, ?, ?)",
+                         (key, stage, digest, json.dumps(meta or {}), now))
+        self._transaction(bind)
+        return digest
+
+    def forget(self, key):
+        def drop(conn):
+            row = conn.execute("SELECT hash FROM keys WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM keys WHERE key = ?", (key,))
+                conn.execute("UPDATE blobs SET refs = refs - 1 WHERE hash = ?", (row[0],))
+        self._transaction(drop)
+
+    # ------------------------------------------------------------------
+    # Garbage collection
+    # ------------------------------------------------------------------
+    def gc(self, max_age_sec=None, max_bytes=None):
+        """
+        Drops keys unused for max_age_sec, then least-recently-used keys until
+        the referenced blobs fit in max_bytes, then deletes unreferenced blobs.
+
+        Returns:
+            tuple: (keys_dropped, blobs_deleted, bytes_freed)
+        """
+        now = time.time()
+        def collect(conn):
+            dropped = []
+            if max_age_sec:
+                dropped += conn.execute("SELECT key, hash FROM keys WHERE last_used < ?", (now - max_age_sec,)).fetchall()
+            if max_bytes:
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs WHERE refs > 0").fetchone()[0]
+                stale = {k for k, _ in dropped}
+                refs = dict(conn.execute("SELECT hash, refs FROM blobs"))
+                for key, digest in conn.execute("SELECT key, hash FROM keys ORDER BY last_used").fetchall():
+                    if total <= max_bytes:
+                        break
+                    if key in stale:
+                        continue
+                    dropped.append((key, digest))
+                    refs[digest] -= 1
+                    if refs[digest] == 0:
+                        total -= conn.execute("SELECT size FROM blobs WHERE hash = ?", (digest,)).fetchone()[0]
+            for key, digest in dropped:
+                conn.execute("DELETE FROM keys WHERE key = ?", (key,))
+                conn.execute("UPDATE blobs SET refs = refs - 1 WHERE hash = ?", (digest,))
+            dead = conn.execute("SELECT hash, size FROM blobs WHERE refs <= 0").fetchall()
+            conn.execute("DELETE FROM blobs WHERE refs <= 0")
+            # Memoized hashes of files that are gone
+            paths = [p for (p,) in conn.execute("SELECT path FROM file_hashes") if not os.path.exists(p)]
+            conn.executemany("DELETE FROM file_hashes WHERE path = ?", [(p,) for p in paths])
+            return len(dropped), dead
+
+        dropped, dead = self._transaction(collect)
+        freed = 0
+        for digest, size in dead:
+            try:
+                os.remove(self.blob_path(digest))
+                freed += size
+            except FileNotFoundError:
+                pass
+        return dropped, len(dead), freed
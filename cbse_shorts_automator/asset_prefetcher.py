@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+File: asset_prefetcher.py
+Background download of the next rows' PDFs and source videos.
+
+Wraps the eligible-row iterable: while row i is being processed, the assets
+of rows i+1..i+LOOK_AHEAD are already downloading into DIRS['DOWNLOADS_*'].
+A row is only handed on once its own prefetch has finished (or failed, in
+which case the row's normal fetch step retries the download itself).
+
+Downloads are written to "<path>.part" and renamed into place, so a file
+that exists at its final path is always complete and fetch_row_pdf /
+fetch_row_video reuse it instead of downloading again. Prefetched bytes
+waiting for their row are capped by DISK_BUDGET_MB; the row that is next in
+line is never held back by the budget.
+"""
+
+import os
+import threading
+import collections
+import concurrent.futures
+
+class AssetPrefetcher:
+    """
+    Usage:
+        prefetcher = AssetPrefetcher(download_row_assets, look_ahead=2, disk_budget_mb=4096)
+        for row_num, row in prefetcher.iterate(eligible_rows, read_row_job):
+            process_row(...)      # finds the files already on disk
+    """
+
+    def __init__(self, fetch_fn, look_ahead=2, disk_budget_mb=4096, workers=2, discard_fn=None):
+        """
+        Args:
+            fetch_fn: Callable(job) that downloads a job's assets (skipping files already present)
+            look_ahead: Rows to prefetch beyond the one being processed
+            disk_budget_mb: Cap on prefetched bytes not yet handed to the consumer
+            workers: Parallel prefetch downloads
+            discard_fn: Callable(job) removing a prefetched row's files if it is never consumed
+        """
+        self.fetch_fn = fetch_fn
+        self.look_ahead = max(0, int(look_ahead))
+        self.budget_bytes = int(disk_budget_mb * 1024 * 1024)
+        self.workers = max(1, int(workers))
+        self.discard_fn = discard_fn
+
+        self.cond = threading.Condition()
+        self.held = {}        # seq -> bytes prefetched for a row not yet handed on
+        self.head_seq = 0     # seq of the next row the consumer will get
+        self.stats = {'rows': 0, 'failed': 0, 'bytes': 0, 'budget_waits': 0}
+
+    @staticmethod
+    def _job_bytes(job):
+        total = 0
+        for key in ('temp_pdf', 'temp_vid'):
+            path = job.get(key)
+            if path and os.path.exists(path):
+                total += os.path.getsize(path)
+        return total
+
+    def _prefetch(self, seq, job):
+        with self.cond:
+            waited = False
+            while seq != self.head_seq and self.held and sum(self.held.values()) >= self.budget_bytes:
+                waited = True
+                self.cond.wait(timeout=5)
+            if waited:
+                self.stats['budget_waits'] += 1
+
+        try:
+            self.fetch_fn(job)
+            ok = True
+        except Exception as e:
+            print(f"   ⚠️ Prefetch failed for {job['vid_id']}: {e}")
+            ok = False
+
+        size = self._job_bytes(job)
+        with self.cond:
+            if seq >= self.head_seq:
+                self.held[seq] = size
+            self.stats['rows'] += 1
+            self.stats['bytes'] += size
+            if not ok:
+                self.stats['failed'] += 1
+            self.cond.notify_all()
+        return ok
+
+    def _advance(self, seq):
+        with self.cond:
+            self.held.pop(seq, None)
+            self.head_seq = seq + 1
+            self.cond.notify_all()
+
+    def iterate(self, rows, make_job):
+        """
+        Args:
+            rows: Iterable of (row_num, row); consumed LOOK_AHEAD rows ahead
+            make_job: Callable(row, row_num) -> job dict or None (row is passed through as-is)
+
+        Yields:
+            (row_num, row) in the original order, each after its assets are on disk
+        """
+        source = iter(rows)
+        window = collections.deque()
+        seq = 0
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers,
+                                                         thread_name_prefix="prefetch")
+
+        def top_up():
+            nonlocal seq, source
+            while source is not None and len(window) < self.look_ahead + 1:
+                try:
+                    row_num, row = next(source)
+                except StopIteration:
+                    source = None
+                    return
+                job = make_job(row, row_num)
+                future = executor.submit(self._prefetch, seq, job) if job else None
+                window.append((seq, row_num, row, job, future))
+                seq += 1
+
+        try:
+            top_up()
+            while window:
+                item_seq, row_num, row, job, future = window.popleft()
+                if future is not None:
+                    future.result()
+                self._advance(item_seq)
+                top_up()  # Queue the next download before handing this row over
+                yield row_num, row
+        finally:
+            # Consumer stopped early: drop whatever was fetched for rows it never took
+            for item_seq, _, _, job, future in window:
+                if future is not None:
+                    future.cancel()
+            executor.shutdown(wait=True)
+            for _, _, _, job, future in window:
+                if job is not None and self.discard_fn is not None:
+                    try:
+                        self.discard_fn(job)
+                    except Exception:
+                        pass
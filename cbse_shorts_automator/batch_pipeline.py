@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+File: batch_pipeline.py
+Cross-row staged pipeline for main_shorts_generator (--pipeline).
+
+Rows flow through four stages connected by bounded queues:
+    fetch (PDF + video download) -> script (Gemini) -> voice (TTS) -> render
+Each stage has its own thread count, so row N+1's downloads, LLM call and
+voiceover happen while row N is rendering. The bounded queues stop the
+network stages from running too far ahead of the encoder.
+"""
+
+import time
+import queue
+import threading
+import traceback
+
+_STOP = object()
+
+class _Stage:
+    """One pipeline stage: N threads pulling from in_queue and pushing to out_queue."""
+
+    def __init__(self, name, fn, workers, in_queue, out_queue):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.threads = []
+        self._alive = self.workers
+        self._lock = threading.Lock()
+
+class StagedPipeline:
+    """
+    Usage:
+        pipeline = StagedPipeline(engine, gemini, CONFIG['PIPELINE'], on_result=write_back)
+        processed = pipeline.run([(row_num, row), ...])
+    """
+
+    def __init__(self, engine, gemini, settings=None, on_result=None):
+        """
+        Args:
+            engine: Shared ShortsEngine
+            gemini: Shared GeminiManager
+            settings: PIPELINE config block (QUEUE_SIZE, *_WORKERS)
+            on_result: Callback(row_num, success, meta_data), called on the caller's thread
+        """
+        import main_shorts_generator as msg
+        self.msg = msg
+        self.engine = engine
+        self.gemini = gemini
+        self.on_result = on_result
+
+        settings = settings or {}
+        self.queue_size = settings.get('QUEUE_SIZE', 2)
+        self.stage_specs = [
+            ('fetch', self._fetch, settings.get('FETCH_WORKERS', 2)),
+            ('script', self._script, settings.get('SCRIPT_WORKERS', 2)),
+            ('voice', self._voice, settings.get('VOICE_WORKERS', 2)),
+            # Templates mutate module-level layout globals; keep renders serial unless configured
+            ('render', self._render, settings.get('RENDER_WORKERS', 1)),
+        ]
+        self.results = queue.Queue()
+        self.fed_total = None
+
+    # ------------------------------------------------------------------
+    # Stage bodies (each receives and returns the job dict)
+    # ------------------------------------------------------------------
+    def _fetch(self, job):
+        print(f"\n🎬 [fetch] Row {job['row_idx']} [ID: {job['vid_id']}]")
+        self.msg.row_journal(job)
+        return self.msg.fetch_row_assets(job)
+
+    def _script(self, job):
+        print(f"   🤖 [script] Row {job['row_idx']}")
+        return self.msg.generate_row_script(self.gemini, job)
+
+    def _voice(self, job):
+        print(f"   🎙️ [voice] Row {job['row_idx']}")
+        return self.msg.synthesize_row_voice(self.engine, job)
+
+    def _render(self, job):
+        print(f"   🎬 [render] Row {job['row_idx']}")
+        success, meta_data = self.msg.render_row(self.engine, job)
+        job['result'] = (success, meta_data)
+        return job
+
+    # ------------------------------------------------------------------
+    # Plumbing
+    # ------------------------------------------------------------------
+    def _finish(self, job, success, meta_data):
+        try:
+            self.msg.cleanup_row(job, success=success)
+        except Exception as e:
+            print(f"⚠️ Cleanup failed for row {job['row_idx']}: {e}")
+        self.results.put((job['row_idx'], success, meta_data))
+
+    def _stage_loop(self, stage, is_last):
+        while True:
+            job = stage.in_queue.get()
+            if job is _STOP:
+                break
+            start = time.time()
+            try:
+                job = stage.fn(job)
+                # Busy time only (queue waits excluded) feeds the render-time history
+                job['work_sec'] = job.get('work_sec', 0.0) + time.time() - start
+            except Exception as e:
+                print(f"❌ [{stage.name}] Row {job['row_idx']} failed: {e}")
+                traceback.print_exc()
+                # Failed rows leave the pipeline here; later stages never see them
+                self._finish(job, *self.msg.row_failure(e))
+                continue
+
+            if is_last:
+                self.msg.record_row_time(job, job['work_sec'])
+                self._finish(job, *job['result'])
+            else:
+                stage.out_queue.put(job)
+
+        # Last thread out of this stage closes the next stage
+        with stage._lock:
+            stage._alive -= 1
+            closing = stage._alive == 0
+        if closing and stage.out_queue is not None:
+            for _ in range(self._downstream_workers(stage)):
+                stage.out_queue.put(_STOP)
+
+    def _downstream_workers(self, stage):
+        idx = self.stages.index(stage)
+        return self.stages[idx + 1].workers
+
+    def _build_stages(self):
+        self.stages = []
+        in_q = queue.Queue(maxsize=self.queue_size)
+        self.head_queue = in_q
+        for i, (name, fn, workers) in enumerate(self.stage_specs):
+            is_last = i == len(self.stage_specs) - 1
+            out_q = None if is_last else queue.Queue(maxsize=self.queue_size)
+            self.stages.append(_Stage(name, fn, workers, in_q, out_q))
+            in_q = out_q
+
+    def _feed(self, rows):
+        fed = 0
+        try:
+            for group in self.msg.iter_row_groups(rows):
+                jobs = []
+                for row_num, row in group:
+                    fed += 1
+                    job = self.msg.read_row_job(row, row_num)
+                    if job is None:
+                        self.results.put((row_num, False, {"status": "Skipped: Column N empty"}))
+                        continue
+                    jobs.append(job)
+                # Shared downloads/transcripts stay until the group's last row is cleaned up
+                self.msg.retain_assets(jobs)
+                for job in jobs:
+                    self.head_queue.put(job)  # Blocks when the fetch stage is far enough ahead
+        finally:
+            for _ in range(self.stages[0].workers):
+                self.head_queue.put(_STOP)
+            self.fed_total = fed
+
+    def run(self, rows):
+        """
+        Pushes rows through all stages and blocks until every row has a result.
+
+        Args:
+            rows: Iterable of (sheet_row_number, row_values); consumed lazily by the feeder
+
+        Returns:
+            int: Number of rows that were attempted
+        """
+        self._build_stages()
+
+        for i, stage in enumerate(self.stages):
+            is_last = i == len(self.stages) - 1
+            for n in range(stage.workers):
+                t = threading.Thread(
+                    target=self._stage_loop, args=(stage, is_last),
+                    name=f"pipeline-{stage.name}-{n}", daemon=True
+                )
+                t.start()
+                stage.threads.append(t)
+
+        feeder = threading.Thread(target=self._feed, args=(rows,), name="pipeline-feed", daemon=True)
+        feeder.start()
+
+        processed = 0
+        while self.fed_total is None or processed < self.fed_total:
+            try:
+                row_num, success, meta_data = self.results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            processed += 1
+            if self.on_result:
+                try:
+                    self.on_result(row_num, success, meta_data)
+                except Exception as e:
+                    print(f"⚠️ Result callback failed for row {row_num}: {e}")
+
+        feeder.join()
+        for stage in self.stages:
+            for t in stage.threads:
+                t.join()
+        return processed
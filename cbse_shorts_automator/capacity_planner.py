@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+File: capacity_planner.py
+Does the pending batch fit today's budgets? (main_shorts_generator.py --capacity)
+
+Per row, using the template the scheduler assigned:
+- TTS characters: median 'tts_chars' of recorded rows; below MIN_SAMPLES, the
+  word budgets the PromptManager prompt asks for ("Max 15 words", ...) for
+  the fields the template speaks, times CHARS_PER_WORD.
+- Gemini: one request per row. Prompt tokens from the real prompt built around
+  a full-size chapter excerpt (excerpt_chars: the passage budget, or the 8000
+  chars create_prompt falls back to); output tokens from recorded script
+  sizes, else the prompt's budgets.
+- Render minutes: RenderTimePredictor, as used for scheduling.
+
+Budgets:
+- TTS: remaining monthly characters of every Google TTS account (VoiceUsageTracker
+  state). Past that VoiceManager falls back to Edge TTS, so this is a quality limit.
+- Gemini: REQUESTS_PER_KEY_PER_DAY (and TOKENS_PER_KEY_PER_DAY, 0 = unlimited)
+  times the number of keys, minus the requests and tokens GeminiManager logged
+  today (GeminiUsageLog: every call, including failed ones and rows that never
+  rendered).
+- Render: RENDER_MINUTES worker-minutes (0 = unlimited).
+
+The recommendation is the longest prefix of the scheduled rows that stays within
+SAFETY_MARGIN of every budget.
+"""
+
+import re
+
+# Script fields each template sends to TTS (mirrors the templates' voice_tasks())
+TTS_FIELDS = {
+    'quiz': ['hook_spoken', 'question_spoken', 'opt_a_spoken', 'opt_b_spoken', 'opt_c_spoken',
+             'opt_d_spoken', 'explanation_spoken', 'cta_spoken'],
+    'fact': ['hook_spoken', 'fact_title', 'fact_spoken', 'cta_spoken'],
+    'tip': ['hook_spoken', 'tip_title', 'tip_spoken', 'bonus', 'cta_spoken'],
+}
+# Fixed text the templates add ("A: ", "Think fast!", "The answer is X! ")
+TTS_EXTRA_CHARS = {'quiz': 40, 'fact': 0, 'tip': 0}
+
+_FIELD = re.compile(r'"(?P<field>\w+)":\s*"\[(?P<hint>[^\]]*)\]')
+_WORDS = re.compile(r'(?:Max|Approx)\s+(?P<words>\d+)\s+words', re.I)
+
+class CapacityPlanner:
+    """
+    Usage:
+        planner = CapacityPlanner(predictor, settings=CONFIG['CAPACITY'], gemini_keys=3,
+                                  tts_available={'account1': 812000},
+                                  gemini_used=GeminiUsageLog('data/gemini_usage').today())
+        plan = planner.plan([{'row': 12, 'template': 'quiz', 'class_level': 10, 'eta': 310}, ...])
+        planner.print_report(plan)
+    """
+
+    def __init__(self, predictor, settings=None, gemini_keys=1, tts_available=None, prompter=None, excerpt_chars=8000,
+                 gemini_used=None):
+        """
+        Args:
+            predictor: RenderTimePredictor (history also feeds TTS/script sizes)
+            settings: CAPACITY config block
+            gemini_keys: Number of Gemini API keys in rotation
+            tts_available: {account: remaining monthly chars} for Google TTS
+            prompter: PromptManager (imported lazily when omitted)
+            excerpt_chars: PDF text per prompt (PASSAGES.MAX_CHARS when the passage index is on)
+            gemini_used: {'requests', 'tokens'} already spent today (GeminiUsageLog.today())
+        """
+        settings = settings or {}
+        self.predictor = predictor
+        self.chars_per_word = settings.get('CHARS_PER_WORD', 6)
+        self.chars_per_token = settings.get('CHARS_PER_TOKEN', 4)
+        self.default_field_words = settings.get('DEFAULT_FIELD_WORDS', 4)
+        self.min_samples = settings.get('MIN_SAMPLES', 3)
+        self.margin = settings.get('SAFETY_MARGIN', 0.9)
+        self.requests_per_key = settings.get('GEMINI_REQUESTS_PER_KEY_PER_DAY', 250)
+        self.tokens_per_key = settings.get('GEMINI_TOKENS_PER_KEY_PER_DAY', 0)
+        self.render_minutes = settings.get('RENDER_MINUTES', 0)
+        self.gemini_keys = max(1, gemini_keys)
+        self.tts_available = tts_available or {}
+        self.excerpt_chars = excerpt_chars
+        self.gemini_used = gemini_used or {'requests': 0, 'tokens': 0}
+
+        if prompter is None:
+            from prompt_manager import PromptManager
+            prompter = PromptManager()
+        self.prompter = prompter
+        self._template_cache = {}
+
+    # ------------------------------------------------------------------
+    # Per-row estimates
+    # ------------------------------------------------------------------
+    def _recorded_median(self, template, field):
+        values = sorted(r[field] for r in self.predictor.history()
+                        if r.get('template') == template and r.get(field))
+        return values[len(values) // 2] if len(values) >= self.min_samples else None
+
+    def _prompt_figures(self, template, class_level):
+        """(prompt_chars, {field: budgeted words}) from the prompt create_prompt would send."""
+        key = (template, class_level)
+        if key not in self._template_cache:
+            prompt = self.prompter.create_prompt("x" * self.excerpt_chars, class_level, template)
+            budgets = {}
+            for m in _FIELD.finditer(prompt):
+                words = _WORDS.search(m.group('hint'))
+                budgets[m.group('field')] = int(words.group('words')) if words else self.default_field_words
+            self._template_cache[key] = (len(prompt), budgets)
+        return self._template_cache[key]
+
+    def row_cost(self, template, class_level=None, eta=None):
+        """
+        Returns:
+            dict: {'tts_chars', 'requests', 'prompt_tokens', 'output_tokens', 'render_min'}
+        """
+        prompt_chars, budgets = self._prompt_figures(template, class_level)
+
+        tts_chars = self._recorded_median(template, 'tts_chars')
+        if tts_chars is None:
+            words = sum(budgets.get(f, self.default_field_words) for f in TTS_FIELDS.get(template, []))
+            tts_chars = words * self.chars_per_word + TTS_EXTRA_CHARS.get(template, 0)
+
+        script_chars = self._recorded_median(template, 'script_chars')
+        if script_chars is None:
+            script_chars = sum(budgets.values()) * self.chars_per_word
+
+        if eta is None:
+            eta = self.predictor.predict(template, class_level)
+        return {
+            'tts_chars': int(tts_chars),
+            'requests': 1,
+            'prompt_tokens': int(prompt_chars / self.chars_per_token),
+            'output_tokens': int(script_chars * 1.3 / self.chars_per_token),  # JSON keys and quoting
+            'render_min': eta / 60.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Budgets
+    # ------------------------------------------------------------------
+    def budgets(self):
+        """Remaining capacity per resource (None = unlimited)."""
+        used = self.gemini_used
+        return {
+            'tts_chars': sum(max(0, v) for v in self.tts_available.values()) if self.tts_available else None,
+            'requests': max(0, self.requests_per_key * self.gemini_keys - used['requests']) if self.requests_per_key else None,
+            'tokens': max(0, self.tokens_per_key * self.gemini_keys - used['tokens']) if self.tokens_per_key else None,
+            'render_min': self.render_minutes or None,
+        }
+
+    # ------------------------------------------------------------------
+    # Plan
+    # ------------------------------------------------------------------
+    def plan(self, rows):
+        """
+        Args:
+            rows: Scheduled rows in run order: dicts with 'row', 'template', 'class_level', 'eta'
+
+        Returns:
+            dict: {'rows', 'totals', 'budgets', 'recommended', 'limit_by'}
+        """
+        budgets = self.budgets()
+        totals = {'tts_chars': 0, 'requests': 0, 'tokens': 0, 'render_min': 0.0}
+        recommended, limit_by = None, None
+        costed = []
+
+        for i, row in enumerate(rows):
+            cost = self.row_cost(row['template'], row.get('class_level'), row.get('eta'))
+            costed.append(dict(row, **cost))
+            totals['tts_chars'] += cost['tts_chars']
+            totals['requests'] += cost['requests']
+            totals['tokens'] += cost['prompt_tokens'] + cost['output_tokens']
+            totals['render_min'] += cost['render_min']
+
+            if recommended is None:
+                for resource, total in totals.items():
+                    budget = budgets[resource]
+                    if budget is not None and total > budget * self.margin:
+                        recommended, limit_by = i, resource
+                        break
+
+        return {
+            'rows': costed,
+            'totals': totals,
+            'budgets': budgets,
+            'recommended': len(rows) if recommended is None else recommended,
+            'limit_by': limit_by,
+        }
+
+    def print_report(self, plan):
+        labels = {'tts_chars': 'Google TTS chars', 'requests': 'Gemini requests',
+                  'tokens': 'Gemini tokens', 'render_min': 'Render minutes'}
+        print(f"\n📐 Capacity for {len(plan['rows'])} pending row(s) "
+              f"({self.gemini_keys} Gemini key(s), {len(self.tts_available)} TTS account(s))")
+        for resource, label in labels.items():
+            total = plan['totals'][resource]
+            budget = plan['budgets'][resource]
+            shown = f"{total:,.0f}" if resource != 'render_min' else f"{total:,.1f}"
+            if budget is None:
+                print(f"   {label:<17} {shown:>12}   (no budget set)")
+            else:
+                print(f"   {label:<17} {shown:>12} / {budget:>12,.0f}   {100.0 * total / budget if budget else 100:.0f}%")
+
+        n = plan['recommended']
+        if plan['limit_by'] is None:
+            print(f"✅ All {n} row(s) fit within {self.margin:.0%} of every budget")
+        else:
+            print(f"⚠️ Recommend scheduling {n} row(s): row {n + 1} would take "
+                  f"{labels[plan['limit_by']]} past {self.margin:.0%} of the budget")
+        return n
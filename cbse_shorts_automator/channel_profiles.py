@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+File: channel_profiles.py
+Several YouTube channels served by one installation.
+
+generator_config.json:
+    "CHANNEL_PROFILES": [
+        {"NAME": "quickprep", "SPREADSHEET_ID": "...", "SHEET_NAME": "Sheet1",
+         "CHANNEL_NAME": "NCERT QuickPrep", "LOGO": "config/logo.png",
+         "MUSIC_DIR": "config/music", "OUTPUT_DIR": "shorts", "WEIGHT": 2},
+        {"NAME": "boards", "SPREADSHEET_ID": "...", "CHANNEL_NAME": "Board Prep",
+         "LOGO": "config/channels/boards/logo.png", "MUSIC_DIR": "config/channels/boards/music",
+         "OUTPUT_DIR": "shorts/boards", "WEIGHT": 1}
+    ]
+Missing keys fall back to the top-level SPREADSHEET_ID / SHEET_NAME / CHANNEL_NAME.
+An empty list means the single channel described by the top-level keys.
+
+One process (and one engine) serves every profile, so the Whisper model, TTS
+clients, SFX bank, artifact store and worker pool are shared. Per profile:
+its own sheet (reads, result writes, leases), branding (channel name, logo,
+music library) applied per render, output folder, and a fair-share WEIGHT:
+a batch takes row groups from the profiles by stride scheduling, so a
+profile with weight 2 gets about twice the rows of one with weight 1 while
+both have pending rows.
+
+Sheet row numbers are only unique within one sheet, so rows of a profile run
+are ChannelRow values: ints that carry the profile name. They format as the
+plain row number (A1 ranges keep working) but hash and compare per channel.
+"""
+
+DEFAULT_PROFILE = 'default'
+
+class ChannelRow(int):
+    """Sheet row number tagged with the profile it belongs to."""
+
+    def __new__(cls, value, channel):
+        obj = int.__new__(cls, value)
+        obj.channel = channel
+        return obj
+
+    def __reduce__(self):
+        # Worker processes receive rows pickled
+        return (ChannelRow, (int(self), self.channel))
+
+    def __eq__(self, other):
+        if isinstance(other, ChannelRow):
+            return int(self) == int(other) and self.channel == other.channel
+        return int(self) == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((int(self), self.channel))
+
+    @property
+    def label(self):
+        return f"{self.channel}:{int(self)}"
+
+def row_label(row_num):
+    """'boards:12' for a ChannelRow, '12' for a plain row number."""
+    return getattr(row_num, 'label', str(row_num))
+
+class ChannelProfile:
+    def __init__(self, name, spreadsheet_id, sheet_name, channel_name, logo_path='config/logo.png',
+                 music_dir='config/music', output_dir='shorts', weight=1.0):
+        self.name = name
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_name = sheet_name
+        self.channel_name = channel_name
+        self.logo_path = logo_path
+        self.music_dir = music_dir
+        self.output_dir = output_dir
+        self.weight = max(float(weight), 0.01)
+
+    def branding(self):
+        """Passed to the engine with each row's config (ShortsEngine.apply_branding)."""
+        return {'channel_name': self.channel_name, 'logo_path': self.logo_path, 'music_dir': self.music_dir}
+
+    def tag(self, row_num):
+        return ChannelRow(row_num, self.name)
+
+def load_profiles(config):
+    """
+    Returns:
+        list: ChannelProfile objects; a single 'default' profile when CHANNEL_PROFILES is empty
+    """
+    base = {
+        'SPREADSHEET_ID': config.get('SPREADSHEET_ID'),
+        'SHEET_NAME': config.get('SHEET_NAME', 'Sheet1'),
+        'CHANNEL_NAME': config.get('CHANNEL_NAME', 'SUBSCRIBE NOW'),
+        'LOGO': 'config/logo.png',
+        'MUSIC_DIR': 'config/music',
+        'OUTPUT_DIR': config.get('DIRS', {}).get('SHORTS_OUT', 'shorts'),
+        'WEIGHT': 1,
+    }
+    entries = config.get('CHANNEL_PROFILES') or [dict(base, NAME=DEFAULT_PROFILE)]
+    profiles, seen = [], set()
+    for entry in entries:
+        p = dict(base, **entry)
+        if not p.get('NAME') or p['NAME'] in seen:
+            raise ValueError(f"Channel profile needs a unique NAME: {entry}")
+        if not p.get('SPREADSHEET_ID'):
+            raise ValueError(f"Channel profile '{p['NAME']}' has no SPREADSHEET_ID")
+        seen.add(p['NAME'])
+        profiles.append(ChannelProfile(
+            p['NAME'], p['SPREADSHEET_ID'], p['SHEET_NAME'], p['CHANNEL_NAME'],
+            logo_path=p['LOGO'], music_dir=p['MUSIC_DIR'], output_dir=p['OUTPUT_DIR'], weight=p['WEIGHT']
+        ))
+    return profiles
+
+def fair_share(queues, weights, limit=None):
+    """
+    Merges per-profile row lists (each already in its own schedule order) by
+    stride scheduling: the profile with the lowest rows-taken/weight goes next.
+    Row groups (rows sharing assets) are taken whole.
+
+    Args:
+        queues: {profile_name: [[(row_num, row), ...], ...]} row groups in run order
+        weights: {profile_name: weight}
+
+    Returns:
+        list: (row_num, row) in merged order
+    """
+    position = {name: 0 for name in queues}
+    served = {name: 0.0 for name in queues}
+    merged = []
+    while limit is None or len(merged) < limit:
+        ready = [n for n in queues if position[n] < len(queues[n])]
+        if not ready:
+            break
+        name = min(ready, key=lambda n: (served[n] / weights.get(n, 1.0), n))
+        group = queues[name][position[name]]
+        position[name] += 1
+        served[name] += len(group)
+        merged.extend(group)
+    return merged[:limit] if limit else merged
+
+# ----------------------------------------------------------------------
+# Per-profile sheet clients behind the single-sheet interfaces
+# ----------------------------------------------------------------------
+class ChannelWriters:
+    """SheetWriteBuffer interface over one buffer per profile (routed by ChannelRow)."""
+
+    def __init__(self, writers):
+        self.writers = writers
+
+    def for_row(self, row_num):
+        return self.writers[row_num.channel]
+
+    def flush(self):
+        for w in self.writers.values():
+            w.flush()
+
+    def close(self):
+        for w in self.writers.values():
+            w.close()
+
+class ChannelLeases:
+    """RowLeaseManager interface over one manager per profile (routed by ChannelRow)."""
+
+    def __init__(self, managers):
+        self.managers = managers
+        self.owner = next(iter(managers.values())).owner
+
+    def claim_iter(self, rows, pending_status, limit=None):
+        """Claims in the given (fair-share) order; each profile's sheet gets its own lease writes."""
+        claimed = 0
+        for row_num, row in rows:
+            if limit is not None and claimed >= limit:
+                return
+            try:
+                ok = self.managers[row_num.channel].claim(row_num, pending_status)
+            except Exception as e:
+                print(f"⚠️ Claim failed for row {row_label(row_num)}: {e}")
+                continue
+            if ok:
+                claimed += 1
+                yield row_num, row
+
+    def is_claimable(self, status, pending_status):
+        return next(iter(self.managers.values())).is_claimable(status, pending_status)
+
+    def release(self, row_num):
+        return self.managers[row_num.channel].release(row_num)
+
+    def start(self):
+        for m in self.managers.values():
+            m.start()
+        return self
+
+    def stop(self):
+        for m in self.managers.values():
+            m.stop()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+File: download_cache.py
+Pooled, streaming HTTP downloads with a conditional-GET cache keyed by URL.
+
+Rows of the same NCERT chapter share a PDF URL. The first download streams to
+disk (hashing as it goes) and is saved in the ArtifactStore under the URL's
+cache key together with the server's validators (ETag / Last-Modified).
+Later downloads of that URL send If-None-Match / If-Modified-Since; a 304
+costs one round trip and the cached blob is linked into place. A changed file
+(200) replaces the cached one.
+
+Connections are pooled per thread (requests.Session), so consecutive rows
+reuse the TLS connection to the same host.
+
+Drive lecture videos (DriveDownloader) are cached by Drive file ID instead:
+a repeat row links the cached file without touching the network. A miss is
+fetched in PIECE_MB Range pieces over CONNECTIONS parallel connections (one
+connection below PARALLEL_MIN_MB) into a preallocated .part file; finished
+pieces are recorded in a .part.json sidecar, so a failed or interrupted
+download resumes with the missing pieces only (as long as the file's size and
+ETag are unchanged). The result is checked against the expected size and, when
+Google sends one (X-Goog-Hash), the md5 before it is moved into place.
+Servers without Range support get a plain single-stream download.
+"""
+
+import os
+import json
+import time
+import base64
+import hashlib
+import threading
+import concurrent.futures
+
+from stage_timeout import StageTimeout, check_deadline, wait_futures
+
+class DownloadCache:
+    """
+    Usage:
+        downloads = DownloadCache(store=ArtifactStore('data/artifacts'))
+        downloads.fetch(pdf_url, 'temp/V12.pdf')     # 'downloaded' | 'revalidated'
+    """
+
+    def __init__(self, store=None, connect_timeout=10, read_timeout=60, pool_size=8,
+                 chunk_size=1 << 16, headers=None):
+        self.store = store
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.chunk_size = chunk_size
+        self.headers = headers or {'User-Agent': 'Mozilla/5.0'}
+        self._local = threading.local()
+
+    def session(self):
+        """This thread's pooled session (requests.Session is not shared across threads)."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
+
+    def cache_key(self, url):
+        return self.store.key('download', url=url)
+
+    # ------------------------------------------------------------------
+    # Download
+    # ------------------------------------------------------------------
+    def stream_to(self, response, save_path):
+        """
+        Writes a streamed response to save_path (.part + rename), hashing on the way.
+
+        Returns:
+            tuple: (sha256, bytes)
+        """
+        h = hashlib.sha256()
+        size = 0
+        part = save_path + ".part"
+        with open(part, 'wb') as f:
+            for chunk in response.iter_content(self.chunk_size):
+                check_deadline()
+                if chunk:
+                    f.write(chunk)
+                    h.update(chunk)
+                    size += len(chunk)
+        # A file at save_path is always complete (prefetch hand-off)
+        os.replace(part, save_path)
+        return h.hexdigest(), size
+
+    def fetch(self, url, save_path):
+        """
+        Downloads url to save_path, revalidating a cached copy first.
+
+        Returns:
+            str: 'revalidated' (304, cached copy linked into place) or 'downloaded'
+
+        Raises:
+            requests.HTTPError: The server answered with anything but 200 (or 304 for a cached copy)
+        """
+        key = self.cache_key(url) if self.store else None
+        cached = self.store.lookup(key) if key else None
+        headers = {}
+        if cached:
+            meta = cached[1]
+            if meta.get('etag'): headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'): headers['If-Modified-Since'] = meta['last_modified']
+
+        with self.session().get(url, headers=headers, stream=True, timeout=self.timeout) as r:
+            if r.status_code == 304 and cached:
+                if self.store.fetch(key, save_path) is not None:
+                    return 'revalidated'
+                # Blob vanished between lookup and fetch: download unconditionally
+                return self.fetch(url, save_path)
+            r.raise_for_status()
+            if r.status_code != 200:
+                # e.g. a 304 we did not ask for, or a 204 / 206: no complete body to save
+                import requests
+                raise requests.HTTPError(f"Unexpected HTTP {r.status_code} for {url}", response=r)
+            digest, size = self.stream_to(r, save_path)
+            validators = {'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified')}
+
+        if key:
+            self.store.save(key, save_path, stage='download', digest=digest,
+                            meta=dict(validators, url=url, sha256=digest, bytes=size))
+        return 'downloaded'
+
+class DriveDownloader(DownloadCache):
+    """
+    Usage:
+        drive = DriveDownloader(store=ArtifactStore('data/artifacts'), connections=4)
+        drive.fetch_drive(file_id, 'temp/V12.mp4')    # 'cached' | 'downloaded'
+
+    base_url is the Drive download endpoint; point it at a local HTTP server
+    (same ?export=download&id= parameters) to test without Drive.
+    """
+
+    def __init__(self, store=None, base_url="https://drive.google.com/uc", connections=4,
+                 parallel_min_mb=16, piece_mb=8, retries=3, **kwargs):
+        super().__init__(store=store, pool_size=max(connections, kwargs.pop('pool_size', 8)), **kwargs)
+        self.base_url = base_url
+        self.connections = max(1, connections)
+        self.parallel_min = int(parallel_min_mb * 1024 * 1024)
+        self.piece = max(1, int(piece_mb * 1024 * 1024))
+        self.retries = max(1, retries)
+
+    def fetch_drive(self, file_id, save_path):
+        """
+        Returns:
+            str: 'cached' (linked from the file-ID cache) or 'downloaded'
+
+        Raises:
+            Exception: Every attempt failed (the .part file is kept for the next resume)
+        """
+        key = self.store.key('drive', file_id=file_id) if self.store else None
+        if key and self.store.fetch(key, save_path) is not None:
+            return 'cached'
+
+        for attempt in range(self.retries):
+            try:
+                digest, size = self._download(file_id, save_path)
+                break
+            except StageTimeout:
+                raise
+            except Exception as e:
+                if attempt + 1 == self.retries:
+                    raise
+                print(f"   ⏳ Retry {attempt + 2}/{self.retries} for video ({e})...")
+                time.sleep(2)
+
+        if key:
+            self.store.save(key, save_path, stage='download', digest=digest, link=True,
+                            meta={'file_id': file_id, 'sha256': digest, 'bytes': size})
+        return 'downloaded'
+
+    # ------------------------------------------------------------------
+    # Drive request
+    # ------------------------------------------------------------------
+    def _open(self, file_id, headers=None):
+        """GET on the download endpoint, confirming the large-file virus-scan warning if asked."""
+        session = self.session()
+        params = {'export': 'download', 'id': file_id}
+        r = session.get(self.base_url, params=params, headers=headers, stream=True, timeout=self.timeout)
+        token = next((v for k, v in r.cookies.items() if k.startswith('download_warning')), None)
+        if token:
+            r.close()
+            r = session.get(self.base_url, params=dict(params, confirm=token), headers=headers,
+                            stream=True, timeout=self.timeout)
+        r.raise_for_status()
+        return r
+
+    @staticmethod
+    def _expected_md5(response):
+        """md5 hex from X-Goog-Hash ('crc32c=...,md5=<base64>') or Content-MD5, else None."""
+        values = [response.headers.get('X-Goog-Hash', '')] + [f"md5={response.headers.get('Content-MD5', '')}"]
+        for part in ','.join(values).split(','):
+            name, _, value = part.strip().partition('=')
+            if name == 'md5' and value:
+                try:
+                    return base64.b64decode(value).hex()
+                except ValueError:
+                    pass
+        return None
+
+    # ------------------------------------------------------------------
+    # Download
+    # ------------------------------------------------------------------
+    def _download(self, file_id, save_path):
+        part, state_path = save_path + ".part", save_path + ".part.json"
+        # One-byte probe: total size, Range support and validators without pulling the body
+        probe = self._open(file_id, headers={'Range': 'bytes=0-0'})
+        if probe.status_code != 206 or '/' not in probe.headers.get('Content-Range', ''):
+            # No Range support: single stream, starts over on failure
+            with probe:
+                size = int(probe.headers.get('Content-Length') or 0)
+                digest, got = self.stream_to(probe, save_path)
+            if size and got != size:
+                raise IOError(f"Video download incomplete: {got} of {size} bytes")
+            return digest, got
+
+        with probe:
+            size = int(probe.headers['Content-Range'].rsplit('/', 1)[1])
+            url, etag = probe.url, probe.headers.get('ETag')
+            expected_md5 = self._expected_md5(probe)
+
+        state = self._load_state(state_path)
+        if state.get('file_id') == file_id and state.get('size') == size and state.get('etag') == etag \
+                and os.path.exists(part) and os.path.getsize(part) == size:
+            done = set(state['done'])
+            print(f"   ↩️ Resuming video download: {len(done)} piece(s) already on disk")
+        else:
+            done = set()
+            with open(part, 'wb') as f:
+                f.truncate(size)
+        state = {'file_id': file_id, 'size': size, 'etag': etag, 'done': sorted(done)}
+
+        pieces = [(start, min(start + self.piece, size) - 1) for start in range(0, size, self.piece)]
+        todo = [p for p in pieces if p[0] not in done]
+        workers = self.connections if size >= self.parallel_min else 1
+        cookies = self.session().cookies
+        cancel = threading.Event()
+        # No blocking shutdown: on a stage timeout the pieces on disk are kept for the resume
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(workers, len(todo) or 1))
+        errors = []
+        try:
+            futures = [executor.submit(self._fetch_piece, url, cookies, start, end, part, cancel) for start, end in todo]
+            for future in wait_futures(futures):
+                # A failed piece doesn't stop the others: everything that lands is kept for the resume
+                try:
+                    done.add(future.result())
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                state['done'] = sorted(done)
+                self._save_state(state_path, state)
+        finally:
+            cancel.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+        if errors:
+            raise errors[0]
+
+        digest, md5 = self._hash_file(part)
+        if os.path.getsize(part) != size or (expected_md5 and md5 != expected_md5):
+            for p in (part, state_path):
+                if os.path.exists(p): os.remove(p)
+            raise IOError(f"Video checksum mismatch for {file_id}; partial download discarded")
+        os.replace(part, save_path)
+        os.remove(state_path)
+        return digest, size
+
+    def _fetch_piece(self, url, cookies, start, end, part, cancel):
+        headers = {'Range': f"bytes={start}-{end}"}
+        written = 0
+        with self.session().get(url, headers=headers, cookies=cookies, stream=True, timeout=self.timeout) as r:
+            if r.status_code != 206:
+                raise IOError(f"Range request answered HTTP {r.status_code}")
+            with open(part, 'r+b') as f:
+                f.seek(start)
+                for chunk in r.iter_content(self.chunk_size):
+                    if cancel.is_set():
+                        raise StageTimeout("Video download cancelled")
+                    f.write(chunk)
+                    written += len(chunk)
+        if written != end - start + 1:
+            raise IOError(f"Short read for bytes {start}-{end}: {written} bytes")
+        return start
+
+    def _hash_file(self, path):
+        sha, md5 = hashlib.sha256(), hashlib.md5()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+                md5.update(chunk)
+        return sha.hexdigest(), md5.hexdigest()
+
+    @staticmethod
+    def _load_state(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_state(path, state):
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+File: gemini_usage.py
+Per-day log of Gemini API calls, for the --capacity budgets.
+
+GeminiManager records every generate_content call where it is made (failed
+and retried calls included, whether or not the row ever renders):
+    data/gemini_usage/2026-10-15.jsonl
+    {"ts", "model", "prompt_tokens", "output_tokens"}
+One file per local day, so pool workers only ever append (one short O_APPEND
+write per line) and old days are dropped by deleting whole files.
+"""
+
+import os
+import json
+import time
+import glob
+import datetime
+import threading
+
+class GeminiUsageLog:
+    """
+    Usage:
+        usage = GeminiUsageLog('data/gemini_usage')
+        usage.record('gemini-2.5-flash', prompt_tokens=2100, output_tokens=650)
+        usage.today()    # {'requests': 12, 'tokens': 33600}
+    """
+
+    def __init__(self, log_dir='data/gemini_usage', keep_days=7):
+        self.log_dir = log_dir
+        self.keep_days = keep_days
+        self.lock = threading.Lock()
+
+    def _path(self, day):
+        return os.path.join(self.log_dir, f"{day.isoformat()}.jsonl")
+
+    def record(self, model, prompt_tokens=0, output_tokens=0):
+        entry = {'ts': int(time.time()), 'model': model,
+                 'prompt_tokens': int(prompt_tokens or 0), 'output_tokens': int(output_tokens or 0)}
+        os.makedirs(self.log_dir, exist_ok=True)
+        with self.lock:
+            with open(self._path(datetime.date.today()), 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def today(self):
+        """Requests and tokens (prompt + output) recorded since local midnight."""
+        requests, tokens = 0, 0
+        try:
+            with open(self._path(datetime.date.today())) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    requests += 1
+                    tokens += entry.get('prompt_tokens', 0) + entry.get('output_tokens', 0)
+        except OSError:
+            pass
+        return {'requests': requests, 'tokens': tokens}
+
+    def prune(self):
+        """Deletes the files of days older than keep_days."""
+        cutoff = self._path(datetime.date.today() - datetime.timedelta(days=self.keep_days))
+        for path in glob.glob(os.path.join(self.log_dir, "*.jsonl")):
+            if path < cutoff:
+                os.remove(path)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+File: generator_daemon.py
+Long-lived generator process (main_shorts_generator.py --daemon).
+
+Start-up cost is paid once: ShortsEngine (VoiceManager + its cached TTS
+clients), the Gemini client, the Whisper model and the decoded SFX stay
+loaded, so each short only pays for its own downloads, LLM call, TTS and
+render.
+
+Jobs come from two places:
+- Spool directory: drop a JSON file into {SPOOL_DIR}/incoming/
+      {"vid_id": "...", "pdf_url": "...", "vid_url": "...",
+       "chapter_title": "...", "video_title": "...", "class": "Class 10",
+       "row_num": 12,            <- optional; result is also written to the sheet
+       "channel": "boards"}      <- optional; CHANNEL_PROFILES name (sheet + branding)
+  It is moved to processing/ while it runs and to done/ or failed/ afterwards,
+  with the result added under "result". Spool jobs are checked between rows.
+- Sheet poller: every SHEET_POLL_SEC the eligible rows are fetched (and
+  lease-claimed when --lease is on) and processed like a normal run.
+"""
+
+import os
+import json
+import time
+import signal
+import traceback
+
+class GeneratorDaemon:
+    """
+    Usage:
+        daemon = GeneratorDaemon(sheets, on_result, writer=writer, settings=CONFIG['DAEMON'])
+        daemon.serve_forever()   # SIGTERM / Ctrl+C: finish the current job, then exit
+    """
+
+    def __init__(self, sheets, on_result, writer=None, leases=None, settings=None):
+        """
+        Args:
+            sheets: Sheets API service (None disables the sheet poller)
+            on_result: Callback(row_num, success, meta_data) for sheet rows
+            writer: SheetWriteBuffer behind on_result; flushed before each poll
+            leases: Optional RowLeaseManager for multi-node claiming
+            settings: DAEMON config block
+        """
+        import main_shorts_generator as msg
+        self.msg = msg
+        self.sheets = sheets
+        self.on_result = on_result
+        self.writer = writer
+        self.leases = leases
+
+        settings = settings or {}
+        self.spool_dir = settings.get('SPOOL_DIR', 'data/spool')
+        self.spool_poll_sec = settings.get('SPOOL_POLL_SEC', 5)
+        self.sheet_poll_sec = settings.get('SHEET_POLL_SEC', 300) if sheets is not None else 0
+        self.preload_whisper = settings.get('PRELOAD_WHISPER', True)
+        self.preload_sfx = settings.get('PRELOAD_SFX', True)
+        self.preload_tts = settings.get('PRELOAD_TTS', True)
+
+        self.dirs = {name: os.path.join(self.spool_dir, name)
+                     for name in ('incoming', 'processing', 'done', 'failed')}
+        for d in self.dirs.values():
+            os.makedirs(d, exist_ok=True)
+
+        self.engine = None
+        self.gemini = None
+        self.stopping = False
+        self.jobs_done = 0
+
+    # ------------------------------------------------------------------
+    # Warm-up
+    # ------------------------------------------------------------------
+    def warm(self):
+        from shorts_engine import ShortsEngine
+        from video_processor import VideoProcessor
+
+        start = time.time()
+        VideoProcessor.keep_model_warm = True
+        self.engine = ShortsEngine(self.msg.CONFIG_FILE)
+        self.gemini = self.msg.GeminiManager()
+
+        if self.preload_whisper:
+            VideoProcessor(temp_dir=self.msg.DIRS['TEMP'])._load_model()
+            print("   🧠 Whisper model loaded")
+        if self.preload_sfx:
+            print(f"   🔊 {self.engine.sfx_manager.preload()} SFX file(s) decoded")
+        if self.preload_tts:
+            print(f"   🗣️ {self.engine.voice_manager.warm()} Google TTS client(s) ready")
+        print(f"🔥 Daemon warm in {time.time() - start:.1f}s")
+
+    # ------------------------------------------------------------------
+    # Spool intake
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _pid_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def recover_spool(self):
+        """Puts jobs left in processing/ by a dead daemon back into incoming/."""
+        for name in os.listdir(self.dirs['processing']):
+            pid, _, original = name.partition('__')
+            if not pid.isdigit() or not original or self._pid_alive(int(pid)):
+                continue
+            os.replace(os.path.join(self.dirs['processing'], name),
+                       os.path.join(self.dirs['incoming'], original))
+            print(f"♻️ Re-queued spool job {original} (daemon {pid} is gone)")
+
+    def _claim_spool_file(self):
+        """Atomically moves the oldest incoming job into processing/; safe with several daemons."""
+        incoming = self.dirs['incoming']
+        entries = []
+        for name in os.listdir(incoming):
+            if not name.endswith('.json'):
+                continue
+            try:
+                entries.append((os.path.getmtime(os.path.join(incoming, name)), name))
+            except FileNotFoundError:
+                continue
+        for _, name in sorted(entries):
+            dst = os.path.join(self.dirs['processing'], f"{os.getpid()}__{name}")
+            try:
+                os.rename(os.path.join(incoming, name), dst)
+                return dst
+            except FileNotFoundError:
+                continue  # Another daemon took it
+        return None
+
+    def _job_from_spool(self, data):
+        for key in ('vid_id', 'pdf_url', 'vid_url'):
+            if not data.get(key):
+                raise ValueError(f"Spool job is missing '{key}'")
+        return self.msg.new_job(
+            self.msg.channel_row(data.get('row_num'), data.get('channel')), str(data['vid_id']).strip(),
+            chapter_title=data.get('chapter_title', ''),
+            video_title=data.get('video_title', ''),
+            pdf_url=data['pdf_url'],
+            vid_url=data['vid_url'],
+            class_level=self.msg.parse_class_level(str(data.get('class', data.get('class_level', '')))),
+            channel=data.get('channel')
+        )
+
+    def run_spool_file(self, path):
+        name = os.path.basename(path).partition('__')[2]
+        start = time.time()
+        data = {}
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            job = self._job_from_spool(data)
+        except Exception as e:
+            data = data if isinstance(data, dict) else {}
+            success, meta_data = self.msg.row_failure(e)
+        else:
+            print(f"\n📥 Spool job {name} [ID: {job['vid_id']}]")
+            # Same refcounts as sheet rows: a prefetched row may share this PDF / video
+            self.msg.retain_assets([job])
+            success, meta_data = self.msg.process_job(self.engine, self.gemini, job)
+            if job['row_idx']:
+                self.on_result(job['row_idx'], success, meta_data)
+
+        data['result'] = dict(meta_data, success=success, seconds=round(time.time() - start, 1))
+        target = os.path.join(self.dirs['done' if success else 'failed'], name)
+        with open(target + ".tmp", 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(target + ".tmp", target)
+        os.remove(path)
+        self.jobs_done += 1
+        print(f"   {'✅' if success else '❌'} Spool job {name} finished in {time.time() - start:.1f}s")
+
+    def drain_spool(self):
+        """Runs spool jobs until the incoming folder is empty. Returns how many ran."""
+        ran = 0
+        while not self.stopping:
+            path = self._claim_spool_file()
+            if path is None:
+                break
+            self.run_spool_file(path)
+            ran += 1
+        return ran
+
+    # ------------------------------------------------------------------
+    # Sheet poller
+    # ------------------------------------------------------------------
+    def poll_sheet(self):
+        # Buffered results must land first, or finished rows would look pending again
+        if self.writer is not None:
+            self.writer.flush()
+        rows = self.msg.prefetch_rows(self.msg.select_rows(self.sheets, self.leases))
+        for group in self.msg.iter_row_groups(rows):
+            start = time.time()
+            self.msg.process_group(self.engine, self.gemini, group, self.on_result)
+            self.jobs_done += len(group)
+            print(f"   ⏱️ Rows {[n for n, _ in group]} done in {time.time() - start:.1f}s")
+            # Spool jobs don't wait for the rest of the sheet batch
+            self.drain_spool()
+            if self.stopping:
+                break
+
+    # ------------------------------------------------------------------
+    # Main loop
+    # ------------------------------------------------------------------
+    def _on_signal(self, signum, frame):
+        if self.stopping:
+            raise KeyboardInterrupt
+        print("\n🛑 Stop requested: finishing the current job (signal again to abort)")
+        self.stopping = True
+
+    def serve_forever(self):
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+
+        self.warm()
+        self.recover_spool()
+        print(f"👂 Watching {self.dirs['incoming']}"
+              + (f" and the sheet every {self.sheet_poll_sec}s" if self.sheet_poll_sec else ""))
+
+        last_sheet_poll = 0.0
+        while not self.stopping:
+            try:
+                ran = self.drain_spool()
+                if self.sheet_poll_sec and time.time() - last_sheet_poll >= self.sheet_poll_sec:
+                    last_sheet_poll = time.time()
+                    self.poll_sheet()
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                # A bad poll (network, quota) must not take the daemon down
+                print(f"⚠️ Daemon loop error: {e}")
+                traceback.print_exc()
+                ran = 0
+
+            if not ran and not self.stopping:
+                deadline = time.time() + self.spool_poll_sec
+                while time.time() < deadline and not self.stopping:
+                    time.sleep(0.5)
+
+        print(f"👋 Daemon stopped after {self.jobs_done} job(s)")
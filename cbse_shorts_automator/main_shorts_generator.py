@@ -7,27 +7,25 @@ Updated:
 - Batch processing ready.
 """
 
-import imagemagick_setup
 import os
 import sys
 import json
 import time
 import re
-import requests
-import fitz
 import random
 import gc 
+import argparse
+import threading
+import hashlib
 
-#from google.auth.transport.requests import Request
-import google.auth.transport.requests
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-import google.generativeai as genai
-
-from shorts_engine import ShortsEngine, generate_random_config
-from voice_manager import VoiceManager
-from prompt_manager import PromptManager  # <--- NEW IMPORT
+# Heavy modules (moviepy via shorts_engine, whisper, fitz, requests, Google API
+# clients) are imported where they are first used, so start-up and --plan stay light
+from shorts_config import generate_random_config
+from shared_assets import SharedAssets
+from channel_profiles import ChannelRow, load_profiles, row_label
+from stage_timeout import StageTimeout, stage_deadline
+from resource_scope import resource_summary
+from sheet_reader import col_letter as get_col_letter
 
 CONFIG_FILE = "config/generator_config.json"
 
@@ -55,6 +53,86 @@ COL_IDX_FILENAME = COL_MAPPING.get('COL_INDEX_FILENAME', 43)
 COL_IDX_TEMPLATE = COL_MAPPING.get('COL_INDEX_TEMPLATE', 44)
 COL_IDX_DURATION = COL_MAPPING.get('COL_INDEX_DURATION', 45)
 
+# Multi-process worker pool (--workers N)
+POOL_CONFIG = CONFIG.get('WORKER_POOL', {})
+
+# Cross-row staged pipeline (--pipeline)
+PIPELINE_CONFIG = CONFIG.get('PIPELINE', {})
+
+# Intra-row dependency graph (transcript overlaps the Gemini call)
+ROW_GRAPH_CONFIG = CONFIG.get('ROW_GRAPH', {})
+
+# Write-behind sheet updates (one batchUpdate per flush)
+SHEET_WRITES_CONFIG = CONFIG.get('SHEET_WRITES', {})
+
+# Column-projected, incremental sheet reads
+SHEET_READS_CONFIG = CONFIG.get('SHEET_READS', {})
+
+# Multi-node row claiming (owner + expiry lease in the status column)
+LEASE_CONFIG = CONFIG.get('LEASE', {})
+
+# Long-lived daemon (--daemon): spool directory + sheet poller
+DAEMON_CONFIG = CONFIG.get('DAEMON', {})
+
+# Background download of upcoming rows' PDF/video
+PREFETCH_CONFIG = CONFIG.get('PREFETCH', {})
+
+# Rows sharing a chapter PDF / Drive video run back-to-back on one worker
+AFFINITY_CONFIG = CONFIG.get('AFFINITY', {})
+
+# Refcounts for downloads shared by several rows (see cleanup_row)
+SHARED_ASSETS = SharedAssets()
+_PDF_TEXT_CACHE = {}
+
+# Batch ordering (sjf / deadline / fifo) from predicted row wall time
+SCHEDULING_CONFIG = CONFIG.get('SCHEDULING', {})
+
+# Template picked for each scheduled row, so --plan/--capacity show what gets rendered
+ROW_PLANS = {}
+TEMPLATE_MIX = ('quiz', 'fact', 'tip')
+_RENDER_PREDICTOR = None
+
+# Per-row checkpoint journal: a restarted row resumes after its last finished stage
+CHECKPOINT_CONFIG = CONFIG.get('CHECKPOINT', {})
+
+# base filename -> highest version handed out (SQLite; replaces probing shorts/)
+OUTPUT_INDEX_CONFIG = CONFIG.get('OUTPUT_INDEX', {})
+_OUTPUT_INDEXES = {}
+
+# Scratch index over DIRS['TEMP'] (+ /dev/shm tier): per-short ownership, byte quotas, LRU eviction
+SCRATCH_CONFIG = CONFIG.get('SCRATCH', {})
+_SCRATCH = None
+
+# Content-addressed artifact store (TTS segments, transcripts): cache keys from input hashes
+ARTIFACTS_CONFIG = CONFIG.get('ARTIFACTS', {})
+_ARTIFACTS = None
+
+# HTTP downloads: pooled sessions, streamed to disk; PDFs revalidated with ETag/Last-Modified,
+# Drive videos fetched in parallel Range pieces (resumable) and cached by file ID
+DOWNLOADS_CONFIG = CONFIG.get('DOWNLOADS', {})
+_DOWNLOADS = None
+_DRIVE_DOWNLOADS = None
+
+# PDF text extraction: page-parallel for large books, cached by PDF content hash
+PDF_TEXT_CONFIG = CONFIG.get('PDF_TEXT', {})
+_PDF_EXTRACTOR = None
+
+# Per-chapter passage index: prompts carry rotating, diverse passages instead of pdf_text[:8000]
+PASSAGES_CONFIG = CONFIG.get('PASSAGES', {})
+_PASSAGES = None
+
+# Channel profiles: own sheet, branding and fair-share weight per channel; engine and caches are shared
+PROFILES = load_profiles(CONFIG)
+PROFILES_BY_NAME = {p.name: p for p in PROFILES}
+MULTI_CHANNEL = bool(CONFIG.get('CHANNEL_PROFILES'))
+
+# Wall-clock budget per row stage; on expiry the stage's ffmpeg/ImageMagick/Node children are killed
+STAGE_TIMEOUTS_CONFIG = CONFIG.get('STAGE_TIMEOUTS', {})
+
+# Daily budgets for --capacity (TTS characters, Gemini requests/tokens, render minutes)
+CAPACITY_CONFIG = CONFIG.get('CAPACITY', {})
+_GEMINI_USAGE = None
+
 STOP_WORDS = {
     'the', 'a', 'an', 'is', 'are', 'was', 'were', 'this', 'that', 'it', 'to', 'for', 'with', 'on', 'in', 'of',
     'and', 'or', 'but', 'so', 'because', 'if', 'then', 'else', 'when', 'where', 'how', 'why', 'who', 'which',
@@ -65,6 +143,9 @@ STOP_WORDS = {
 }
 def authenticate(scopes, token_filename, service_name):
     """ Authenticates with Google APIs using the manual input flow. """
+    import google.auth.transport.requests
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
     print(f"\n--- AUTHENTICATION: {service_name} ---")
     
     creds = None
@@ -140,29 +221,34 @@ def authenticate(scopes, token_filename, service_name):
 #            token.write(creds.to_json())
 #    return build('sheets', 'v4', credentials=creds)
 
-def get_col_letter(n):
-    """Converts 0-based index to A, B, ... AA, AB format"""
-    s = ""
-    while n >= 0:
-        s = chr(n % 26 + 65) + s
-        n = n // 26 - 1
-    return s
+def get_gemini_usage():
+    """Process-wide GeminiUsageLog (per-day call log behind the --capacity Gemini budgets)."""
+    global _GEMINI_USAGE
+    if _GEMINI_USAGE is None:
+        from gemini_usage import GeminiUsageLog
+        _GEMINI_USAGE = GeminiUsageLog(CAPACITY_CONFIG.get('GEMINI_USAGE_DIR', 'data/gemini_usage'))
+    return _GEMINI_USAGE
 
 class GeminiManager:
     def __init__(self):
+        from prompt_manager import PromptManager
         self.keys = [line.strip() for line in open(CONFIG['GEMINI_KEYS_FILE']) if line.strip()]
         self.idx = 0
         self.prompter = PromptManager() # Initialize Prompter
+        self.lock = threading.Lock() # Key rotation is shared when scripts run concurrently
+        self.usage = get_gemini_usage()
         self._configure()
 
     def _configure(self):
+        import google.generativeai as genai
         if self.idx < len(self.keys):
             genai.configure(api_key=self.keys[self.idx])
         else:
             raise Exception("All Gemini keys exhausted")
 
-    def get_script(self, pdf_text, class_level=None, template='quiz'):
-        prompt = self.prompter.create_prompt(pdf_text, class_level, template)
+    def get_script(self, pdf_text, class_level=None, template='quiz', focused_text=None):
+        import google.generativeai as genai
+        prompt = self.prompter.create_prompt(pdf_text, class_level, template, focused_text=focused_text)
 
         safety_settings = [
             {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_ONLY_HIGH"},
@@ -181,7 +267,13 @@ class GeminiManager:
         for m in models:
             try:
                 model = genai.GenerativeModel(m)
-                res = model.generate_content(prompt, generation_config=gen_config, safety_settings=safety_settings)
+                res = None
+                try:
+                    res = model.generate_content(prompt, generation_config=gen_config, safety_settings=safety_settings)
+                finally:
+                    # Every call counts against the daily quota, including failed ones
+                    meta = getattr(res, 'usage_metadata', None)
+                    self.usage.record(m, getattr(meta, 'prompt_token_count', 0), getattr(meta, 'candidates_token_count', 0))
                 # Check if we have valid parts before accessing .text
                 #if res.candidates[0].content.parts:
                 #    print(res.text)
@@ -198,8 +290,9 @@ class GeminiManager:
             except Exception as e:
                 print(f"⚠️ Gemini error with {m}: {e}")
                 if "429" in str(e) or "quota" in str(e).lower():
-                    self.idx += 1
-                    self._configure()
+                    with self.lock:
+                        self.idx += 1
+                        self._configure()
         
         raise Exception("Gemini generation failed")
 
@@ -233,10 +326,20 @@ def format_column_n(value):
         return '0000'
 
 def find_next_version(output_dir, base_filename):
-    version = 1
-    while os.path.exists(os.path.join(output_dir, f"{base_filename}_V{version}.mp4")):
-        version += 1
-    return version
+    """Reserves the next free _V{n} for base_filename; atomic across workers and nodes via OutputIndex."""
+    if not OUTPUT_INDEX_CONFIG.get('ENABLED', True):
+        version = 1
+        while os.path.exists(os.path.join(output_dir, f"{base_filename}_V{version}.mp4")):
+            version += 1
+        return version
+    
+    index = _OUTPUT_INDEXES.get(output_dir)
+    if index is None:
+        from output_index import OutputIndex
+        index = _OUTPUT_INDEXES[output_dir] = OutputIndex(
+            OUTPUT_INDEX_CONFIG.get('DB_FILE', 'data/output_index.sqlite3'), output_dir
+        )
+    return index.reserve(base_filename)
 
 def generate_output_filename(chapter_title, template_type, script, col_n_value, output_dir):
     chapter = normalize_filename_part(chapter_title, max_len=10)
@@ -256,211 +359,1159 @@ def generate_output_filename(chapter_title, template_type, script, col_n_value,
     version = find_next_version(output_dir, base)
     return f"{base}_V{version}.mp4"
 
+def get_downloads():
+    """Process-wide DownloadCache (pooled sessions; PDFs cached by URL in the artifact store)."""
+    global _DOWNLOADS
+    if _DOWNLOADS is None:
+        from download_cache import DownloadCache
+        _DOWNLOADS = DownloadCache(
+            store=get_artifacts() if DOWNLOADS_CONFIG.get('CACHE_ENABLED', True) else None,
+            connect_timeout=DOWNLOADS_CONFIG.get('CONNECT_TIMEOUT_SEC', 10),
+            read_timeout=DOWNLOADS_CONFIG.get('READ_TIMEOUT_SEC', 60),
+            pool_size=DOWNLOADS_CONFIG.get('POOL_SIZE', 8)
+        )
+    return _DOWNLOADS
+
+def get_pdf_extractor():
+    """Process-wide PDFTextExtractor (text + page offsets cached by PDF content hash)."""
+    global _PDF_EXTRACTOR
+    if _PDF_EXTRACTOR is None:
+        from pdf_text import PDFTextExtractor
+        _PDF_EXTRACTOR = PDFTextExtractor(
+            store=get_artifacts() if PDF_TEXT_CONFIG.get('CACHE_ENABLED', True) else None,
+            workers=PDF_TEXT_CONFIG.get('WORKERS', 4),
+            parallel_min_pages=PDF_TEXT_CONFIG.get('PARALLEL_MIN_PAGES', 40)
+        )
+    return _PDF_EXTRACTOR
+
 def download_file(url, save_path):
-    headers = {'User-Agent': 'Mozilla/5.0'}
     retries = CONFIG.get('API_RETRY_ATTEMPTS', 3)
     for attempt in range(retries):
         try:
             if attempt > 0:
                 print(f"   ⏳ Retry {attempt+1}/{retries} for PDF...")
                 time.sleep(2)
-            r = requests.get(url, headers=headers, timeout=20)
-            if r.status_code == 200:
-                with open(save_path, 'wb') as f: f.write(r.content)
-                return True
+            if get_downloads().fetch(url, save_path) == 'revalidated':
+                print("   ⚡ PDF unchanged since last download (304)")
+            return True
+        except StageTimeout: raise
         except Exception as e:
             print(f"   ❌ PDF Error: {e}")
     return False
 
+def extract_drive_file_id(url):
+    patterns = [r'/d/([a-zA-Z0-9_-]+)', r'id=([a-zA-Z0-9_-]+)']
+    for p in patterns:
+        match = re.search(p, url or "")
+        if match: return match.group(1)
+    return None
+
+def get_drive_downloads():
+    """Process-wide DriveDownloader (parallel Range pieces, resume, file-ID cache in the artifact store)."""
+    global _DRIVE_DOWNLOADS
+    if _DRIVE_DOWNLOADS is None:
+        from download_cache import DriveDownloader
+        _DRIVE_DOWNLOADS = DriveDownloader(
+            store=get_artifacts() if DOWNLOADS_CONFIG.get('CACHE_ENABLED', True) else None,
+            base_url=DOWNLOADS_CONFIG.get('DRIVE_URL', "https://drive.google.com/uc"),
+            connections=DOWNLOADS_CONFIG.get('CONNECTIONS', 4),
+            parallel_min_mb=DOWNLOADS_CONFIG.get('PARALLEL_MIN_MB', 16),
+            piece_mb=DOWNLOADS_CONFIG.get('PIECE_MB', 8),
+            retries=CONFIG.get('API_RETRY_ATTEMPTS', 3),
+            connect_timeout=DOWNLOADS_CONFIG.get('CONNECT_TIMEOUT_SEC', 10),
+            read_timeout=DOWNLOADS_CONFIG.get('READ_TIMEOUT_SEC', 60)
+        )
+    return _DRIVE_DOWNLOADS
+
 def download_drive_video(url, output_path):
     try:
         print(f"⬇️ Downloading Video...")
-        patterns = [r'/d/([a-zA-Z0-9_-]+)', r'id=([a-zA-Z0-9_-]+)']
-        file_id = None
-        for p in patterns:
-            match = re.search(p, url)
-            if match:
-                file_id = match.group(1)
-                break
+        file_id = extract_drive_file_id(url)
         if not file_id: return False
-
-        DL_URL = "https://drive.google.com/uc?export=download"
-        session = requests.Session()
-        response = session.get(DL_URL, params={'id': file_id}, stream=True)
-        token = None
-        for key, value in response.cookies.items():
-            if key.startswith('download_warning'):
-                token = value
-                break
-        if token:
-            response = session.get(DL_URL, params={'id': file_id, 'confirm': token}, stream=True)
-        if response.status_code == 200:
-            with open(output_path, "wb") as f:
-                for chunk in response.iter_content(32768):
-                    if chunk: f.write(chunk)
-            return True
+        if get_drive_downloads().fetch_drive(file_id, output_path) == 'cached':
+            print("   ⚡ Lecture video served from the local cache")
+        return True
+    except StageTimeout: raise
+    except Exception as e:
+        print(f"   ❌ Video Error: {e}")
         return False
-    except Exception: return False
 
-def process_row(engine, gemini, row, row_idx):
+def stage_budget(stage):
+    """Deadline context for a row stage (STAGE_TIMEOUTS.<STAGE>_SEC); a no-op when disabled or 0."""
+    seconds = STAGE_TIMEOUTS_CONFIG.get(f"{stage.upper()}_SEC", 0) if STAGE_TIMEOUTS_CONFIG.get('ENABLED', True) else 0
+    return stage_deadline(stage, seconds, STAGE_TIMEOUTS_CONFIG.get('KILL_GRACE_SEC', 5))
+
+def asset_ready(path):
+    """True if a complete download is already on disk (downloads land via rename)."""
+    return os.path.exists(path) and os.path.getsize(path) > 0
+
+def read_row_job(row, row_idx):
+    """
+    Builds the per-row job dict that travels through the stages below.
+    Returns None when the row has no ID (Column N).
+    """
     def get_c(i): return row[i].strip() if len(row) > i else ""
     
     vid_id = get_c(COL_IDX_ID)
-    chapter_title = get_c(COL_IDX_CHAPTER)
-    video_title = get_c(COL_IDX_TOPIC)
-    pdf_url = get_c(COL_IDX_PDF)
-    vid_url = get_c(COL_IDX_VIDEO)
+    if not vid_id: return None
     
-    if not vid_id: return False, {"status": "Skipped: Column N empty"}
-    
-    class_str = get_c(COL_IDX_CLASS)
-    class_level = parse_class_level(class_str)
-    
-    print(f"\n🎬 Processing Row {row_idx} [ID: {vid_id}]...")
+    return new_job(
+        row_idx, vid_id,
+        chapter_title=get_c(COL_IDX_CHAPTER),
+        video_title=get_c(COL_IDX_TOPIC),
+        pdf_url=get_c(COL_IDX_PDF),
+        vid_url=get_c(COL_IDX_VIDEO),
+        class_level=parse_class_level(get_c(COL_IDX_CLASS)),
+        plan=ROW_PLANS.get(row_idx),
+        channel=getattr(row_idx, 'channel', None)
+    )
+
+def row_profile(row_num):
+    """Channel profile a sheet row belongs to (ChannelRow), else the first profile."""
+    return PROFILES_BY_NAME.get(getattr(row_num, 'channel', None), PROFILES[0])
+
+def channel_row(row_num, channel=None):
+    """Row number as used in this run: tagged with its profile when CHANNEL_PROFILES is set."""
+    if channel and channel not in PROFILES_BY_NAME: raise ValueError(f"Unknown channel profile '{channel}'")
+    if not row_num or not MULTI_CHANNEL: return row_num
+    return ChannelRow(int(row_num), channel or PROFILES[0].name)
+
+def new_job(row_idx, vid_id, chapter_title, video_title, pdf_url, vid_url, class_level, plan=None, channel=None):
+    """
+    Job dict for one short; row_idx is the sheet row (None for spool-only jobs).
+    Downloads are named after their source (PDF URL hash, Drive file ID), so rows
+    that share a chapter PDF or lecture video share the file and its transcript.
+    """
+    pdf_name = f"pdf_{hashlib.sha1(pdf_url.encode()).hexdigest()[:16]}" if pdf_url else f"t_{vid_id}"
+    file_id = extract_drive_file_id(vid_url)
+    vid_name = f"vid_{file_id}" if file_id else f"t_{vid_id}"
+    return {
+        'row_idx': row_idx,
+        'vid_id': vid_id,
+        'chapter_title': chapter_title,
+        'video_title': video_title,
+        'pdf_url': pdf_url,
+        'vid_url': vid_url,
+        'class_level': class_level,
+        'plan': plan,
+        'channel': channel or PROFILES[0].name,
+        'temp_pdf': os.path.join(DIRS['DOWNLOADS_PDF'], f"{pdf_name}.pdf"),
+        'temp_vid': os.path.join(DIRS['DOWNLOADS_VID'], f"{vid_name}.mp4"),
+    }
+
+def source_key(job):
+    return extract_drive_file_id(job['vid_url']) or job['vid_url']
+
+def transcript_cache_path(job):
+    return os.path.join(DIRS['TEMP'], f"{os.path.basename(job['temp_vid'])}.json")
+
+def slides_cache_path(job):
+    return os.path.join(DIRS['TEMP'], f"{os.path.basename(job['temp_vid'])}.slides.json")
+
+def journal_id(job):
+    # Column N IDs are only unique within one channel's sheet
+    return f"{job['channel']}__{job['vid_id']}" if MULTI_CHANNEL else job['vid_id']
+
+def row_journal(job):
+    """Opens the row's checkpoint journal (None when CHECKPOINT is off). Called once per row, before any stage."""
+    if not CHECKPOINT_CONFIG.get('ENABLED', True): return None
+    if job.get('journal') is None:
+        from row_journal import RowJournal
+        job['journal'] = RowJournal(
+            CHECKPOINT_CONFIG.get('JOURNAL_DIR', 'data/journal'), journal_id(job),
+            inputs=f"{job['pdf_url']}|{job['vid_url']}"
+        )
+        done = job['journal'].completed()
+        job['resumed'] = bool(done)
+        if done: print(f"   ♻️ Resuming row after: {', '.join(done)}")
+    return job['journal']
+
+def resume_state(job):
+    """Stages a previous attempt of this row finished (read-only; {} when there is no journal)."""
+    if not CHECKPOINT_CONFIG.get('ENABLED', True): return {}
+    from row_journal import RowJournal
+    return RowJournal.peek(CHECKPOINT_CONFIG.get('JOURNAL_DIR', 'data/journal'), journal_id(job),
+                           inputs=f"{job['pdf_url']}|{job['vid_url']}")
+
+def prune_row_journals():
+    """Drops journals of failed rows nobody retried within MAX_AGE_HOURS, with their temp files."""
+    if not CHECKPOINT_CONFIG.get('ENABLED', True): return
+    from row_journal import RowJournal
+    delete = CONFIG.get('DELETE_TEMP_FILES', True)
+    removed = RowJournal.prune(
+        CHECKPOINT_CONFIG.get('JOURNAL_DIR', 'data/journal'),
+        CHECKPOINT_CONFIG.get('MAX_AGE_HOURS', 72) * 3600,
+        keep=lambda p: not delete or SHARED_ASSETS.is_held(p)
+    )
+    if removed: print(f"🧹 Pruned {removed} stale row journal(s)")
+
+def get_artifacts():
+    """Process-wide ArtifactStore (None when ARTIFACTS.ENABLED is off)."""
+    global _ARTIFACTS
+    if _ARTIFACTS is None and ARTIFACTS_CONFIG.get('ENABLED', True):
+        from artifact_store import ArtifactStore
+        _ARTIFACTS = ArtifactStore(ARTIFACTS_CONFIG.get('ROOT', 'data/artifacts'))
+    return _ARTIFACTS
+
+def gc_artifacts():
+    """Drops artifacts unused for MAX_AGE_DAYS (or past MAX_GB, least recently used first)."""
+    store = get_artifacts()
+    if not store: return
+    dropped, blobs, freed = store.gc(
+        max_age_sec=ARTIFACTS_CONFIG.get('MAX_AGE_DAYS', 30) * 86400,
+        max_bytes=int(ARTIFACTS_CONFIG.get('MAX_GB', 10) * 1024 ** 3) or None
+    )
+    if blobs: print(f"🧹 Artifact store: {dropped} key(s) expired, {blobs} blob(s) deleted, {freed / 1048576:.0f} MB freed")
+
+def job_affinity_keys(job):
+    """Inputs a row shares with others: chapter PDF URL and Drive file ID."""
+    keys = set()
+    if job.get('pdf_url'): keys.add(('pdf', job['pdf_url']))
+    if job.get('vid_url'): keys.add(('vid', extract_drive_file_id(job['vid_url']) or job['vid_url']))
+    return keys
+
+def fetch_row_pdf(job):
+    """PDF download + text extraction (both once per shared PDF)."""
+    # Budget starts once the lock is ours: waiting behind another row's download is not this row's time
+    with SHARED_ASSETS.path_lock(job['temp_pdf']), stage_budget('fetch'):
+        if asset_ready(job['temp_pdf']): print("   ⚡ Using prefetched PDF")
+        elif not download_file(job['pdf_url'], job['temp_pdf']): raise Exception("PDF download failed")
+        
+        cached = _PDF_TEXT_CACHE.get(job['temp_pdf'])
+        if cached is not None:
+            pdf_text, pdf_pages = cached
+        else:
+            pdf_text, pdf_pages = get_pdf_extractor().extract(job['temp_pdf'])
+            if SHARED_ASSETS.is_held(job['temp_pdf']): _PDF_TEXT_CACHE[job['temp_pdf']] = (pdf_text, pdf_pages)
     
-    temp_pdf = os.path.join(DIRS['DOWNLOADS_PDF'], f"t_{vid_id}.pdf")
-    temp_vid = os.path.join(DIRS['DOWNLOADS_VID'], f"t_{vid_id}.mp4")
+    if len(pdf_text) < 50: raise Exception("PDF empty")
+    job['pdf_text'] = pdf_text
+    job['pdf_pages'] = pdf_pages
+    if job.get('journal'): job['journal'].done_item('downloaded', 'pdf', job['temp_pdf'], temp_file=True)
+    return job
+
+def fetch_row_video(job):
+    """Source (lecture) video download."""
+    with SHARED_ASSETS.path_lock(job['temp_vid']), stage_budget('fetch'):
+        if asset_ready(job['temp_vid']): print("   ⚡ Using downloaded video")
+        elif not download_drive_video(job['vid_url'], job['temp_vid']): raise Exception("Video download failed")
+    if job.get('journal'): job['journal'].done_item('downloaded', 'video', job['temp_vid'], temp_file=True)
+    return job
 
+def prefetch_row_assets(job):
+    """Background download for the prefetcher: files only, no text extraction."""
+    with SHARED_ASSETS.path_lock(job['temp_pdf']):
+        if not asset_ready(job['temp_pdf']) and not download_file(job['pdf_url'], job['temp_pdf']):
+            raise Exception("PDF download failed")
+    with SHARED_ASSETS.path_lock(job['temp_vid']):
+        if not asset_ready(job['temp_vid']) and not download_drive_video(job['vid_url'], job['temp_vid']):
+            raise Exception("Video download failed")
+    return job
+
+def fetch_row_assets(job):
+    """Stage 1 (network): PDF download + text extraction, source video download."""
+    fetch_row_pdf(job)
+    fetch_row_video(job)
+    return job
+
+def transcribe_row_video(job):
+    """
+    Whisper transcript of the source video (and its slide OCR index when
+    VIDEO_PROCESSING.ENABLE_OCR is on). Only depends on the download, so it can
+    run while the script is being generated; the template's VideoProcessor then
+    finds the cached transcript instead of transcribing again.
+    """
+    from video_processor import VideoProcessor
+    from slide_ocr import SlideOCR
+    if VideoProcessor.scratch is None: VideoProcessor.scratch = get_scratch()
+    if VideoProcessor.artifacts is None: VideoProcessor.artifacts = get_artifacts()
+    if VideoProcessor.slide_ocr is None: VideoProcessor.slide_ocr = SlideOCR.from_config(CONFIG.get('VIDEO_PROCESSING', {}))
+    video_proc = VideoProcessor(temp_dir=DIRS['TEMP'])
     try:
-        if not download_file(pdf_url, temp_pdf): raise Exception("PDF download failed")
-        
-        doc = fitz.open(temp_pdf)
-        pdf_text = "".join([page.get_text() for page in doc])
-        pdf_text = re.sub(r'\n+', '\n', pdf_text)
-        
-        if len(pdf_text) < 50: raise Exception("PDF empty")
-        
-        if not download_drive_video(vid_url, temp_vid): raise Exception("Video download failed")
-        
-        gen_config = generate_random_config(class_level=class_level)
-        print(f"   🎨 Template: {gen_config['template'].upper()}")
-
-        print("🤖 Generating AI script...")
-        script = gemini.get_script(
-            pdf_text, 
-            class_level=class_level,
-            template=gen_config['template']
+        with stage_budget('transcribe'):
+            job['transcript'] = video_proc.get_transcript_map(job['temp_vid'])
+            video_proc.get_slide_index(job['temp_vid'])
+    finally:
+        video_proc.release_model()
+    if job.get('journal'):
+        job['journal'].done('transcript', {'cache': transcript_cache_path(job)}, temp_files=[transcript_cache_path(job)])
+    return job
+
+def get_passages():
+    """Process-wide PassageIndex (None when PASSAGES.ENABLED is off)."""
+    global _PASSAGES
+    if _PASSAGES is None and PASSAGES_CONFIG.get('ENABLED', True):
+        from passage_index import PassageIndex
+        _PASSAGES = PassageIndex(
+            PASSAGES_CONFIG.get('DB_FILE', 'data/passages.sqlite3'),
+            passage_chars=PASSAGES_CONFIG.get('PASSAGE_CHARS', 700),
+            diversity=PASSAGES_CONFIG.get('DIVERSITY', 0.5)
         )
-        
-        # Preview
-        if gen_config['template'] == 'quiz': preview = script.get('question_text', '')
-        elif gen_config['template'] == 'fact': preview = script.get('fact_title', '')
-        else: preview = script.get('tip_title', '')
-        print(f"   ✅ Script: {preview[:50]}...")
-        
-        output_filename = generate_output_filename(
-            chapter_title, gen_config['template'], script, vid_id, DIRS['SHORTS_OUT']
+    return _PASSAGES
+
+def select_passages(job):
+    """Chapter passages for this row's prompt, rotating past ones earlier shorts used (None = first 8000 chars)."""
+    index = get_passages()
+    if not index: return None
+    try:
+        excerpt, job['passage_picks'] = index.select(job['pdf_text'], job.get('pdf_pages'),
+                                                     max_chars=PASSAGES_CONFIG.get('MAX_CHARS', 3500))
+    except Exception as e:
+        print(f"⚠️ Passage selection failed, using the chapter opening: {e}")
+        return None
+    if excerpt: print(f"   📚 Prompt excerpt: {len(excerpt)} chars of {len(job['pdf_text'])}")
+    return excerpt or None
+
+def settle_passages(job, used):
+    """Claims this row's passages once its script exists; a failed call hands them back unused."""
+    picks = job.pop('passage_picks', None)
+    if not picks: return
+    index = get_passages()
+    try:
+        if used: index.claim(picks, owner=job['vid_id'])
+        else: index.release(picks)
+    except Exception as e:
+        index.release(picks)
+        print(f"⚠️ Could not record the passages used: {e}")
+
+def prune_passages():
+    """Drops passage indexes of chapters not built or used within MAX_AGE_DAYS."""
+    index = get_passages()
+    if not index: return
+    removed = index.prune(PASSAGES_CONFIG.get('MAX_AGE_DAYS', 60) * 86400)
+    if removed: print(f"🧹 Pruned {removed} stale chapter passage index(es)")
+
+def generate_row_script(gemini, job):
+    """Stage 2 (LLM): picks the template config, gets the script and reserves the output filename."""
+    journal = job.get('journal')
+    saved = journal.get('script') if journal else None
+    if saved:
+        # Same script, config and output name as the interrupted attempt: no second Gemini call
+        job.update(saved, gen_config=dict(saved['gen_config']))
+        print(f"   ♻️ Script restored from journal ({job['gen_config']['template'].upper()}): {job['output_filename']}")
+        return job
+    
+    plan = job.get('plan') or {}
+    profile = PROFILES_BY_NAME.get(job['channel'], PROFILES[0])
+    gen_config = generate_random_config(class_level=job['class_level'], template=plan.get('template'))
+    gen_config['branding'] = profile.branding()
+    print(f"   🎨 Template: {gen_config['template'].upper()}")
+
+    print("🤖 Generating AI script...")
+    script = None
+    with stage_budget('script'):
+        try:
+            script = gemini.get_script(
+                job['pdf_text'], 
+                class_level=job['class_level'],
+                template=gen_config['template'],
+                focused_text=select_passages(job)
+            )
+        finally:
+            settle_passages(job, used=script is not None)
+    
+    # Preview
+    if gen_config['template'] == 'quiz': preview = script.get('question_text', '')
+    elif gen_config['template'] == 'fact': preview = script.get('fact_title', '')
+    else: preview = script.get('tip_title', '')
+    print(f"   ✅ Script: {preview[:50]}...")
+    
+    output_filename = generate_output_filename(
+        job['chapter_title'], gen_config['template'], script, job['vid_id'], profile.output_dir
+    )
+    job['gen_config'] = gen_config
+    job['script'] = script
+    job['output_filename'] = output_filename
+    job['output_path'] = os.path.join(profile.output_dir, output_filename)
+    if journal:
+        journal.done('script', {'gen_config': dict(gen_config), 'script': script,
+                                'output_filename': output_filename, 'output_path': job['output_path']})
+    return job
+
+def synthesize_row_voice(engine, job):
+    """Stage 3 (TTS): pre-renders the template's voice tracks so the render stage only mixes them."""
+    journal = job.get('journal')
+    with stage_budget('voice'):
+        tracks, voice_system = engine.synthesize_voice_tracks(
+            job['script'], job['gen_config'], job['output_path'],
+            existing=journal.get('tts') if journal else None,
+            on_track=(lambda key, path: journal.done_item('tts', key, path, temp_file=True)) if journal else None
         )
-        output_path = os.path.join(DIRS['SHORTS_OUT'], output_filename)
-        
+    if journal:
+        if voice_system: journal.done('voice', {'system': voice_system})
+        else: voice_system = (journal.get('voice') or {}).get('system')
+    job['gen_config']['voice_tracks'] = tracks
+    job['voice_system'] = voice_system
+    # Characters sent to TTS, for the capacity planner's history
+    job['tts_chars'] = sum(len(t) for t in engine.get_template(job['gen_config']['template']).voice_tasks(job['script']).values())
+    return job
+
+def render_row(engine, job):
+    """Stage 4 (CPU): template render. Returns (success, meta_data) for the sheet."""
+    journal = job.get('journal')
+    saved = journal.get('render') if journal else None
+    if saved:
+        # Crashed after the render but before the row was reported
+        print(f"   ♻️ Render already finished: {job['output_filename']}")
+        return True, saved
+    
+    with stage_budget('render'):
         result = engine.generate_short(
-            video_path=temp_vid,
-            pdf_path=temp_pdf,
-            script=script,
-            config=gen_config,
-            output_path=output_path,
-            class_level=class_level
+            video_path=job['temp_vid'],
+            pdf_path=job['temp_pdf'],
+            script=job['script'],
+            # Templates checkpoint the source-clip cut (and the quiz audio mix) through the journal
+            config=dict(job['gen_config'], checkpoint=journal) if journal else job['gen_config'],
+            output_path=job['output_path'],
+            class_level=job['class_level']
         )
 
-        if result['success']:
-            print(f"✅ Created: {output_filename}")
-            # Get voice system used
-            voice_system_used = engine.voice_manager.last_used_system or "Unknown"
-            
-            # Return full metadata for Sheet update
-            meta_data = {
-                "status": CONFIG['STATUS_SUCCESS'],
-                "filename": output_filename,
-                "template": gen_config['template'],
-                "duration": int(result.get('duration', 0)),
-                "voice_system": voice_system_used  # ADD THIS LINE
-            }
-            return True, meta_data
+    if result['success']:
+        print(f"✅ Created: {job['output_filename']}")
+        # Get voice system used
+        voice_system_used = job.get('voice_system') or engine.voice_manager.last_used_system or "Unknown"
+        
+        # Return full metadata for Sheet update
+        meta_data = {
+            "status": CONFIG['STATUS_SUCCESS'],
+            "filename": job['output_filename'],
+            "template": job['gen_config']['template'],
+            "duration": int(result.get('duration', 0)),
+            "voice_system": voice_system_used  # ADD THIS LINE
+        }
+        if journal: journal.done('render', meta_data)
+        return True, meta_data
+    else:
+        raise Exception(result.get('error', 'Unknown error'))
+
+def row_failure(error):
+    return False, {"status": f"{CONFIG['STATUS_FAILURE_PREFIX']} {str(error)}"}
+
+def retain_assets(jobs):
+    """Called once per group before its first row: shared files outlive each row's cleanup."""
+    from video_processor import VideoProcessor
+    for job in jobs:
+        SHARED_ASSETS.retain([job['temp_pdf'], job['temp_vid'], transcript_cache_path(job), slides_cache_path(job)])
+        VideoProcessor.pinned_caches.update([transcript_cache_path(job), slides_cache_path(job)])
+
+def _delete_asset(path):
+    _PDF_TEXT_CACHE.pop(path, None)
+    if path.startswith(DIRS['TEMP']) and get_scratch(): get_scratch().forget(path)
+    for p in (path, path + ".part"):
+        if os.path.exists(p): os.remove(p)
+
+def get_scratch():
+    """Process-wide ScratchSpace (None when SCRATCH.ENABLED is off)."""
+    global _SCRATCH
+    if _SCRATCH is None and SCRATCH_CONFIG.get('ENABLED', True):
+        from scratch_space import ScratchSpace
+        _SCRATCH = ScratchSpace.from_config(DIRS['TEMP'], SCRATCH_CONFIG)
+    return _SCRATCH
+
+def release_row_scratch(job, keep):
+    """
+    Drops the row's claim on its scratch files (the template normally already
+    did; this covers rows that failed before or outside the render).
+    """
+    scratch = get_scratch()
+    if not scratch or not job.get('output_filename'): return
+    owner = os.path.splitext(job['output_filename'])[0]
+    if keep or not CONFIG.get('DELETE_TEMP_FILES', True): scratch.unhold(owner)
+    else: scratch.release_owner(owner)
+
+def cleanup_row(job, delete_files=True, success=True):
+    """
+    Releases the row's downloads; a file is only deleted once no other row of
+    its group still needs it. delete_files=False leaves deletion to the caller
+    (worker pool parent, which sees every in-flight group). A failed row keeps
+    its files and checkpoint journal so the next attempt resumes from them.
+    """
+    from video_processor import VideoProcessor
+    keep = not success and CHECKPOINT_CONFIG.get('ENABLED', True) and CHECKPOINT_CONFIG.get('KEEP_FAILED_TEMP', True)
+    if success and job.get('journal'): job['journal'].finish()
+    release_row_scratch(job, keep)
+    for p in [job['temp_pdf'], job['temp_vid'], transcript_cache_path(job), slides_cache_path(job)]:
+        if not SHARED_ASSETS.release(p): continue
+        VideoProcessor.unpin_cache(p)
+        _PDF_TEXT_CACHE.pop(p, None)
+        if delete_files and not keep and CONFIG.get('DELETE_TEMP_FILES', True): _delete_asset(p)
+    gc.collect()
+
+def discard_row_assets(job):
+    """Prefetched files of a row that never ran, unless another row holds them."""
+    if not CONFIG.get('DELETE_TEMP_FILES', True): return
+    for p in [job['temp_pdf'], job['temp_vid']]:
+        if not SHARED_ASSETS.is_held(p): _delete_asset(p)
+
+def release_all_assets():
+    """End of run: drops files still retained by rows that were never processed."""
+    from video_processor import VideoProcessor
+    for p in SHARED_ASSETS.held_paths():
+        VideoProcessor.unpin_cache(p)
+        if CONFIG.get('DELETE_TEMP_FILES', True): _delete_asset(p)
+    SHARED_ASSETS.clear()
+
+def run_row_graph(engine, gemini, job):
+    """
+    Runs one row's steps as a dependency graph:
+        pdf -> pdf_text -> script -> voice --+
+        video -> transcript -----------------+-> render
+    The source-clip cut stays inside the template render, since its length comes
+    from the voice track durations.
+    """
+    from task_graph import TaskGraph
+    
+    graph = TaskGraph(f"row {job['row_idx']}")
+    graph.add('pdf_text', lambda: fetch_row_pdf(job))
+    graph.add('video', lambda: fetch_row_video(job))
+    graph.add('transcript', lambda _: transcribe_row_video(job), deps=['video'])
+    graph.add('script', lambda _: generate_row_script(gemini, job), deps=['pdf_text'])
+    graph.add('voice', lambda _: synthesize_row_voice(engine, job), deps=['script'])
+    graph.add('render', lambda *_: render_row(engine, job), deps=['voice', 'transcript'])
+    
+    try:
+        results = graph.run(max_workers=ROW_GRAPH_CONFIG.get('MAX_WORKERS', 3))
+    finally:
+        print(f"   ⏱️ Row steps: {graph.summary()}")
+    return results['render']
+
+def process_row(engine, gemini, row, row_idx):
+    job = read_row_job(row, row_idx)
+    if job is None: return False, {"status": "Skipped: Column N empty"}
+    
+    print(f"\n🎬 Processing Row {row_idx} [ID: {job['vid_id']}]...")
+    retain_assets([job])
+    return process_job(engine, gemini, job)
+
+def process_group(engine, gemini, group, on_result, delete_files=True, plans=None):
+    """
+    Processes rows that share a chapter PDF and/or lecture video back-to-back:
+    the download, PDF text and Whisper transcript are produced once and kept
+    until the group's last row is done. plans: {row_num: plan} from the
+    scheduler when it ran in another process.
+    """
+    jobs = [(row_num, read_row_job(row, row_num)) for row_num, row in group]
+    for row_num, job in jobs:
+        if job and plans and row_num in plans: job['plan'] = plans[row_num]
+    retain_assets([job for _, job in jobs if job])
+    if len(group) > 1:
+        print(f"\n🔗 Row group {[n for n, _ in group]} shares its source assets")
+    
+    for row_num, job in jobs:
+        if job is None:
+            on_result(row_num, False, {"status": "Skipped: Column N empty"})
+            continue
+        print(f"\n🎬 Processing Row {row_num} [ID: {job['vid_id']}]...")
+        success, meta_data = process_job(engine, gemini, job, delete_files=delete_files)
+        on_result(row_num, success, meta_data)
+
+def process_job(engine, gemini, job, delete_files=True):
+    """Runs every step for one job dict. Returns (success, meta_data); never raises."""
+    start = time.time()
+    success = False
+    try:
+        row_journal(job)
+        if ROW_GRAPH_CONFIG.get('ENABLED', True):
+            result = run_row_graph(engine, gemini, job)
         else:
-            raise Exception(result.get('error', 'Unknown error'))
+            fetch_row_assets(job)
+            generate_row_script(gemini, job)
+            synthesize_row_voice(engine, job)
+            result = render_row(engine, job)
+        success = result[0]
+        record_row_time(job, time.time() - start)
+        return result
 
     except Exception as e:
         print(f"❌ Error: {e}")
-        return False, {"status": f"{CONFIG['STATUS_FAILURE_PREFIX']} {str(e)}"}
+        return row_failure(e)
     
     finally:
-        if CONFIG.get('DELETE_TEMP_FILES', True):
-            for p in [temp_pdf, temp_vid]:
-                if os.path.exists(p): os.remove(p)
-        gc.collect()
+        cleanup_row(job, delete_files=delete_files, success=success)
 
-def main():
-    for d in DIRS.values(): os.makedirs(d, exist_ok=True)
-    os.makedirs("temp", exist_ok=True)
-    
-    print("🚀 Starting NCERT QuickPrep Shorts Generator")
-    # --- CHANGED SECTION START ---
-    # Use the new authenticate function
-    sheets_creds = authenticate(
-        CONFIG['SHEETS_SCOPES'], 
-        CONFIG['SHEETS_TOKEN_FILE'], 
-        "Google Sheets"
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="NCERT QuickPrep Shorts Generator")
+    parser.add_argument(
+        '--workers', type=int, default=POOL_CONFIG.get('WORKERS', 1),
+        help="Number of worker processes rendering rows in parallel (1 = in-process, sequential)"
     )
-    
-    # Build the service object using the credentials
-    sheets = build('sheets', 'v4', credentials=sheets_creds)
-    gemini = GeminiManager()
-    engine = ShortsEngine(CONFIG_FILE)
+    parser.add_argument(
+        '--pipeline', action='store_true',
+        help="Overlap rows: download/script/TTS of the next rows run while the current row renders"
+    )
+    parser.add_argument(
+        '--daemon', action='store_true',
+        help="Stay resident with warm models; take jobs from the spool directory and the sheet poller"
+    )
+    parser.add_argument(
+        '--plan', action='store_true',
+        help="Dry run: list the rows the next run would take, with template and predicted time, then exit. "
+             "Reads the sheet, so it needs Sheets credentials (or --mock-sheet); the media stack is not loaded"
+    )
+    parser.add_argument(
+        '--capacity', action='store_true',
+        help="Estimate TTS characters, Gemini requests/tokens and render minutes for all pending rows, "
+             "recommend a batch size that fits the budgets, then exit"
+    )
+    parser.add_argument(
+        '--mock-sheet', metavar='JSON',
+        help="Use a local JSON grid (sheets_mock.MockSheetsService) instead of Google Sheets"
+    )
+    parser.add_argument(
+        '--lease', action='store_true', default=LEASE_CONFIG.get('ENABLED', False),
+        help="Claim rows with an owner/expiry lease so several nodes can share the sheet"
+    )
+    return parser.parse_args(argv)
+
+def is_row_eligible(status, filter_val, vid_id, vid_url, leases=None):
+    pending = CONFIG['STATUS_TO_PROCESS']
+    # With leases, a lease whose owner stopped renewing is up for grabs again
+    claimable = leases.is_claimable(status, pending) if leases is not None else status.lower() == pending.lower()
+    return bool(claimable and filter_val and vid_id and vid_url)
+
+def fetch_eligible_rows(sheets, limit=None, profile=None, leases=None):
+    """
+    Returns [(sheet_row_number, row), ...] for rows that are pending and have the
+    mandatory columns, capped at limit (default MAX_ROWS_TO_PROCESS).
+    profile: channel whose sheet is read (default: the first / only one).
+    leases: lease manager deciding whether a leased row is claimable (default: pending status only).
+    """
+    if limit is None: limit = CONFIG['MAX_ROWS_TO_PROCESS']
+    profile = profile or PROFILES[0]
+    if SHEET_READS_CONFIG.get('PROJECTED', True):
+        return fetch_eligible_rows_projected(sheets, limit, profile, leases)
     
     last_col = get_col_letter(COL_IDX_DURATION) # Ensure we read enough columns if needed
-    range_n = f"{CONFIG['SHEET_NAME']}!A:{last_col}"
+    range_n = f"{profile.sheet_name}!A:{last_col}"
     
     rows = sheets.spreadsheets().values().get(
-        spreadsheetId=CONFIG['SPREADSHEET_ID'], range=range_n
+        spreadsheetId=profile.spreadsheet_id, range=range_n
     ).execute().get('values', [])
     
-    processed = 0
+    eligible = []
     for i, row in enumerate(rows):
         if i == 0: continue
-        if processed >= CONFIG['MAX_ROWS_TO_PROCESS']: break
+        if len(eligible) >= limit: break
         
         def val(idx): return row[idx].strip() if len(row) > idx else ""
         
-        if val(COL_IDX_STATUS).lower() != CONFIG['STATUS_TO_PROCESS'].lower(): continue
-        if not val(COL_IDX_FILTER) or not val(COL_IDX_ID) or not val(COL_IDX_VIDEO): continue
-        
-        success, meta_data = process_row(engine, gemini, row, i+1)
+        if not is_row_eligible(val(COL_IDX_STATUS), val(COL_IDX_FILTER), val(COL_IDX_ID), val(COL_IDX_VIDEO), leases): continue
         
-        # 1. Update Status (Column AN / 39)
-        status_cell = f"{CONFIG['SHEET_NAME']}!{get_col_letter(COL_IDX_STATUS)}{i+1}"
-        sheets.spreadsheets().values().update(
-            spreadsheetId=CONFIG['SPREADSHEET_ID'], range=status_cell,
-            valueInputOption='USER_ENTERED', body={'values': [[meta_data['status']]]}
-        ).execute()
+        eligible.append((channel_row(i+1, profile.name), row))
+    return eligible
+
+def fetch_eligible_rows_projected(sheets, limit, profile, leases=None):
+    """Reads only the filter columns first, then full rows for eligible, changed rows."""
+    from sheet_reader import ProjectedSheetReader
+    
+    reader = ProjectedSheetReader(
+        sheets, profile.spreadsheet_id, profile.sheet_name,
+        filter_cols={
+            'status': COL_IDX_STATUS, 'filter': COL_IDX_FILTER,
+            'id': COL_IDX_ID, 'video': COL_IDX_VIDEO
+        },
+        last_col_idx=COL_IDX_DURATION,
+        snapshot_path=SHEET_READS_CONFIG.get('SNAPSHOT_FILE', 'data/sheet_snapshot.json'),
+        max_age_sec=SHEET_READS_CONFIG.get('SNAPSHOT_MAX_AGE_SEC', 21600)
+    )
+    eligible = reader.read_eligible(
+        lambda p: is_row_eligible(p['status'], p['filter'], p['id'], p['video'], leases),
+        limit=limit
+    )
+    st = reader.stats
+    print(f"   📑 Sheet scan{f' [{profile.name}]' if MULTI_CHANNEL else ''}: {st['scanned']} rows, {st['eligible']} eligible "
+          f"({st['fetched']} fetched, {st['from_cache']} from snapshot)")
+    return [(channel_row(n, profile.name), row) for n, row in eligible]
+
+def write_row_result(writer, row_num, success, meta_data):
+    """
+    Queues status (and metadata on success) for one processed row.
+    The SheetWriteBuffer merges these into a single batchUpdate.
+    """
+    sheet_name = row_profile(row_num).sheet_name
+    if hasattr(writer, 'for_row'): writer = writer.for_row(row_num)
+    
+    # 1. Update Status (Column AN / 39)
+    status_cell = f"{sheet_name}!{get_col_letter(COL_IDX_STATUS)}{row_num}"
+    writer.write(status_cell, [[meta_data['status']]])
+    
+    # 2. If Successful, Update Metadata Columns (AR, AS, AT, AX)
+    if success:
+        # Range AR:AT (43 to 45) - Filename, Template, Duration
+        start_col = get_col_letter(COL_IDX_FILENAME)
+        end_col = get_col_letter(COL_IDX_DURATION)
+        meta_range = f"{sheet_name}!{start_col}{row_num}:{end_col}{row_num}"
         
-       # 2. If Successful, Update Metadata Columns (AR, AS, AT, AX)
-        if success:
-            # Range AR:AT (43 to 45) - Filename, Template, Duration
-            start_col = get_col_letter(COL_IDX_FILENAME)
-            end_col = get_col_letter(COL_IDX_DURATION)
-            meta_range = f"{CONFIG['SHEET_NAME']}!{start_col}{i+1}:{end_col}{i+1}"
-            
-            meta_values = [[
-                meta_data['filename'],
-                meta_data['template'],
-                meta_data['duration']
-            ]]
-            
-            sheets.spreadsheets().values().update(
-                spreadsheetId=CONFIG['SPREADSHEET_ID'], range=meta_range,
-                valueInputOption='USER_ENTERED', body={'values': meta_values}
-            ).execute()
-            
-            # 3. Update Voice System Used (Column AX / 49)
-            voice_cell = f"{CONFIG['SHEET_NAME']}!{get_col_letter(COL_IDX_VOICE)}{i+1}"
-            sheets.spreadsheets().values().update(
-                spreadsheetId=CONFIG['SPREADSHEET_ID'], range=voice_cell,
-                valueInputOption='USER_ENTERED', body={'values': [[meta_data['voice_system']]]}
-            ).execute()
+        meta_values = [[
+            meta_data['filename'],
+            meta_data['template'],
+            meta_data['duration']
+        ]]
+        writer.write(meta_range, meta_values)
         
-        processed += 1
+        # 3. Update Voice System Used (Column AX / 49)
+        voice_cell = f"{sheet_name}!{get_col_letter(COL_IDX_VOICE)}{row_num}"
+        writer.write(voice_cell, [[meta_data['voice_system']]])
+
+def profile_file(path, profile):
+    """Per-channel variant of a runtime file (data/x.jsonl -> data/x.boards.jsonl) when profiles are set."""
+    if not MULTI_CHANNEL: return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{profile.name}{ext}"
+
+def create_sheet_writer(sheets, profile=None):
+    from sheet_writer import SheetWriteBuffer
+    if MULTI_CHANNEL and profile is None:
+        from channel_profiles import ChannelWriters
+        from sheet_writer import split_journal
+        # Writes left in the single-channel journal belong to one of the profiles' journals now
+        journal = SHEET_WRITES_CONFIG.get('JOURNAL_FILE', 'data/sheet_write_journal.jsonl')
+        split_journal(journal, [(profile_file(journal, p), p.spreadsheet_id, p.sheet_name) for p in PROFILES])
+        return ChannelWriters({p.name: create_sheet_writer(sheets, p) for p in PROFILES})
+    profile = profile or PROFILES[0]
+    return SheetWriteBuffer(
+        sheets, profile.spreadsheet_id,
+        journal_path=profile_file(SHEET_WRITES_CONFIG.get('JOURNAL_FILE', 'data/sheet_write_journal.jsonl'), profile),
+        max_pending=SHEET_WRITES_CONFIG.get('MAX_PENDING', 20),
+        max_delay_sec=SHEET_WRITES_CONFIG.get('MAX_DELAY_SEC', 30),
+        retries=CONFIG.get('API_RETRY_ATTEMPTS', 3),
+        retry_delay=CONFIG.get('API_RETRY_DELAY', 3)
+    )
+
+def create_lease_manager(new_sheets, writer, profile=None):
+    """
+    new_sheets() returns the service object for one manager's heartbeat thread;
+    renewals share the flush lock of the writer that sends the rows' final status.
+    """
+    from row_lease import RowLeaseManager
+    if MULTI_CHANNEL and profile is None:
+        from channel_profiles import ChannelLeases
+        return ChannelLeases({p.name: create_lease_manager(new_sheets, writer.writers[p.name], p) for p in PROFILES})
+    profile = profile or PROFILES[0]
+    return RowLeaseManager(
+        new_sheets(), profile.spreadsheet_id, profile.sheet_name, COL_IDX_STATUS,
+        owner=LEASE_CONFIG.get('OWNER') or None,
+        ttl_sec=LEASE_CONFIG.get('TTL_SEC', 900),
+        heartbeat_sec=LEASE_CONFIG.get('HEARTBEAT_SEC', 120),
+        settle_sec=LEASE_CONFIG.get('SETTLE_SEC', 2),
+        reclaim_expired=LEASE_CONFIG.get('RECLAIM_EXPIRED', True),
+        write_lock=writer.flush_lock
+    )
+
+class LazySheetsService:
+    """Sheets service built on first use, so Google auth and the API client wait until the sheet is read."""
+
+    def __init__(self, build):
+        self._build = build
+        self._service = None
+        self._lock = threading.Lock()
+
+    def spreadsheets(self):
+        with self._lock:
+            if self._service is None:
+                self._service = self._build()
+        return self._service.spreadsheets()
+
+def build_sheets_service(args, creds=None):
+    if args.mock_sheet:
+        from sheets_mock import MockSheetsService
+        return MockSheetsService(path=args.mock_sheet)
+    from googleapiclient.discovery import build
+    return build('sheets', 'v4', credentials=creds)
+
+def get_render_predictor():
+    global _RENDER_PREDICTOR
+    if _RENDER_PREDICTOR is None:
+        from render_predictor import RenderTimePredictor
+        _RENDER_PREDICTOR = RenderTimePredictor(
+            SCHEDULING_CONFIG.get('HISTORY_FILE', 'data/render_history.jsonl'),
+            priors=SCHEDULING_CONFIG.get('PRIOR_SEC'),
+            min_samples=SCHEDULING_CONFIG.get('MIN_SAMPLES', 8)
+        )
+    return _RENDER_PREDICTOR
+
+def measure_source_sec(job):
+    """Lecture video length: from the transcript if we have it, else an ffmpeg header probe."""
+    segments = job.get('transcript')
+    if segments: return round(segments[-1]['end'], 1)
+    try:
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+        return round(ffmpeg_parse_infos(job['temp_vid'])['duration'], 1)
+    except Exception:
+        return None
+
+def record_row_time(job, seconds):
+    """Adds a finished row to the render-time history (training data for the scheduler)."""
+    if job.get('resumed'): return  # Partial run; would skew the estimate low
+    try:
+        script = job.get('script') or {}
+        script_chars = sum(len(v) for v in script.values() if isinstance(v, str))
+        get_render_predictor().record(
+            job['gen_config']['template'], job['class_level'], measure_source_sec(job),
+            script_chars, seconds, source_key=source_key(job), tts_chars=job.get('tts_chars')
+        )
+    except Exception as e:
+        print(f"⚠️ Could not record render time: {e}")
+
+def load_waiting():
+    """{channel: {vid_id: first time seen pending}} from SCHEDULING.WAITING_FILE."""
+    try:
+        with open(SCHEDULING_CONFIG.get('WAITING_FILE', 'data/schedule_waiting.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_waiting(waiting):
+    path = SCHEDULING_CONFIG.get('WAITING_FILE', 'data/schedule_waiting.json')
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + ".tmp", 'w') as f:
+            json.dump(waiting, f)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        print(f"⚠️ Could not save scheduler wait times: {e}")
+
+def schedule_rows(rows, limit=None):
+    """
+    Orders affinity groups by predicted wall time per row.
+        sjf      - cheapest groups first, so a capped batch finishes the most shorts
+        deadline - sjf, then drop groups that would push the batch past DEADLINE_SEC
+                   (one worker's wall time); dropped rows stay pending for the next run
+        fifo     - sheet order
+    A row is ranked by its cost averaged over the template mix (its journaled
+    template if it has one), so ranking doesn't skew the mix; templates are
+    rolled for the selected rows only. Every hour a row has been pending takes
+    AGING_SEC_PER_HOUR off its rank, so expensive rows cannot starve.
+    """
+    rows = order_by_affinity(rows)
+    policy = SCHEDULING_CONFIG.get('POLICY', 'sjf')
+    if policy == 'fifo': return rows[:limit] if limit else rows
+    
+    predictor = get_render_predictor()
+    aging = SCHEDULING_CONFIG.get('AGING_SEC_PER_HOUR', 20)
+    waiting, now = load_waiting(), time.time()
+    seen, saved_templates = {}, {}
+    costed = []
+    for idx, group in enumerate(iter_row_groups(rows)):
+        total, waited = 0.0, 0.0
+        for row_num, row in group:
+            job = read_row_job(row, row_num)
+            if job is None: continue
+            # A row with a journaled script keeps that script's template
+            saved = saved_templates[row_num] = (resume_state(job).get('script') or {}).get('gen_config', {}).get('template')
+            templates = [saved] if saved else TEMPLATE_MIX
+            total += sum(predictor.predict(t, job['class_level'], source_key=source_key(job)) for t in templates) / len(templates)
+            channel = getattr(row_num, 'channel', '') or ''
+            since = seen.setdefault(channel, {})[job['vid_id']] = waiting.get(channel, {}).get(job['vid_id'], now)
+            waited = max(waited, now - since)
+        rank = total / len(group) - aging * waited / 3600
+        costed.append((rank, idx, total, group))
+    costed.sort(key=lambda c: (c[0], c[1]))
+    # Rows no longer among the candidates were generated (or left the queue): forget them
+    waiting.update(seen)
+    save_waiting(waiting)
+    
+    budget = SCHEDULING_CONFIG.get('DEADLINE_SEC', 0) if policy == 'deadline' else 0
+    scheduled, planned_sec = [], 0.0
+    for rank, idx, total, group in costed:
+        if limit and len(scheduled) >= limit: break
+        if budget and scheduled and planned_sec + total > budget: continue
+        scheduled.extend(group)
+        planned_sec += total
+    if limit: scheduled = scheduled[:limit]
+    
+    for row_num, row in scheduled:
+        job = read_row_job(row, row_num)
+        if job is None: continue
+        plan = ROW_PLANS.setdefault(row_num, {'template': saved_templates.get(row_num) or generate_random_config(job['class_level'])['template']})
+        plan['eta'] = predictor.predict(plan['template'], job['class_level'], source_key=source_key(job))
+    
+    print(f"   🗓️ Schedule ({policy}): {len(scheduled)} of {len(rows)} row(s), ~{planned_sec / 60:.0f} min predicted")
+    return scheduled
+
+def order_by_affinity(rows):
+    """
+    Stable reorder so rows sharing a PDF URL or Drive file ID sit next to each other
+    (groups keep the position of their first row).
+    """
+    if not AFFINITY_CONFIG.get('ENABLED', True): return rows
+    
+    parent = list(range(len(rows)))
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    owner = {}
+    for i, (row_num, row) in enumerate(rows):
+        job = read_row_job(row, row_num)
+        for key in (job_affinity_keys(job) if job else ()):
+            if key in owner: parent[find(i)] = find(owner[key])
+            else: owner[key] = i
+    
+    roots = [find(i) for i in range(len(rows))]
+    first = {}
+    for i, root in enumerate(roots): first.setdefault(root, i)
+    return [rows[i] for i in sorted(range(len(rows)), key=lambda i: (first[roots[i]], i))]
+
+def iter_row_groups(rows):
+    """Lazily packs consecutive rows that share inputs into groups (lists of (row_num, row))."""
+    max_size = AFFINITY_CONFIG.get('MAX_GROUP_SIZE', 0)
+    group, keys = [], set()
+    for row_num, row in rows:
+        job = read_row_job(row, row_num)
+        row_keys = job_affinity_keys(job) if job else set()
+        joins = AFFINITY_CONFIG.get('ENABLED', True) and bool(row_keys & keys)
+        if group and (not joins or (max_size and len(group) >= max_size)):
+            yield group
+            group, keys = [], set()
+        group.append((row_num, row))
+        keys |= row_keys
+    if group:
+        yield group
+
+def select_rows(sheets, leases=None):
+    """Rows for this pass: a list, or (with leases) a lazily-claiming iterator."""
+    # Look past MAX_ROWS_TO_PROCESS so the scheduler has cheaper rows to choose from
+    factor = SCHEDULING_CONFIG.get('CANDIDATE_FACTOR', 3) if SCHEDULING_CONFIG.get('POLICY', 'sjf') != 'fifo' else 1
+    if MULTI_CHANNEL:
+        return select_channel_rows(sheets, leases, factor)
+    if leases is None:
+        eligible_rows = schedule_rows(fetch_eligible_rows(sheets, CONFIG['MAX_ROWS_TO_PROCESS'] * factor),
+                                      limit=CONFIG['MAX_ROWS_TO_PROCESS'])
+        print(f"📋 {len(eligible_rows)} row(s) queued for generation")
+        return eligible_rows
+    
+    # Other nodes may take some candidates first, so look further down the sheet
+    factor = max(factor, LEASE_CONFIG.get('CANDIDATE_FACTOR', 3))
+    candidates = fetch_eligible_rows(sheets, CONFIG['MAX_ROWS_TO_PROCESS'] * factor, leases=leases)
+    print(f"📋 {len(candidates)} candidate row(s); claiming as {leases.owner}")
+    return leases.claim_iter(schedule_rows(candidates), CONFIG['STATUS_TO_PROCESS'], limit=CONFIG['MAX_ROWS_TO_PROCESS'])
+
+def select_channel_rows(sheets, leases, factor):
+    """
+    select_rows over every channel profile: each sheet is scheduled on its own,
+    then row groups are merged by the profiles' fair-share WEIGHT.
+    """
+    from channel_profiles import fair_share
+    from row_lease import shard_order
+    limit = CONFIG['MAX_ROWS_TO_PROCESS']
+    if leases is not None: factor = max(factor, LEASE_CONFIG.get('CANDIDATE_FACTOR', 3))
+    
+    queues = {}
+    for profile in PROFILES:
+        rows = schedule_rows(fetch_eligible_rows(sheets, limit * factor, profile, leases), limit=None if leases else limit)
+        if leases is not None: rows = shard_order(rows, leases.owner)
+        queues[profile.name] = list(iter_row_groups(rows))
+    merged = fair_share(queues, {p.name: p.weight for p in PROFILES}, limit=None if leases else limit)
+    
+    if leases is None:
+        counts = {}
+        for row_num, _ in merged:
+            counts[row_num.channel] = counts.get(row_num.channel, 0) + 1
+        shares = ', '.join(f"{name} {counts.get(name, 0)}" for name in queues)
+        print(f"📋 {len(merged)} row(s) queued for generation ({shares})")
+        return merged
+    print(f"📋 {len(merged)} candidate row(s) across {len(queues)} channel(s); claiming as {leases.owner}")
+    return leases.claim_iter(merged, CONFIG['STATUS_TO_PROCESS'], limit=limit)
+
+def print_plan(sheets):
+    """--plan: what a normal run would process, without claiming rows or loading the media stack."""
+    rows = select_rows(sheets)
+    row_w = 12 if MULTI_CHANNEL else 5
+    print(f"\n{'Row':>{row_w}}  {'ID':<14} {'Class':>5}  {'Template':<8} {'ETA':>7}  {'Group':>5}  Resume")
+    for group_no, group in enumerate(iter_row_groups(rows), 1):
+        for row_num, row in group:
+            job = read_row_job(row, row_num)
+            if job is None: continue
+            plan = ROW_PLANS.get(row_num) or {'template': '?'}
+            eta = f"{plan['eta'] / 60:.1f}m" if 'eta' in plan else '-'
+            resume = ', '.join(resume_state(job)) or '-'
+            print(f"{row_label(row_num):>{row_w}}  {job['vid_id'][:14]:<14} {job['class_level'] or '-':>5}  "
+                  f"{plan['template']:<8} {eta:>7}  {group_no:>5}  {resume}")
+    return rows
+
+def print_capacity(sheets):
+    """--capacity: sizes the pending rows against today's TTS, Gemini and render budgets."""
+    import glob
+    from capacity_planner import CapacityPlanner
+    from voice_usage_tracker import VoiceUsageTracker, MONTHLY_QUOTA
+    
+    # Read-only view of the quota state VoiceManager maintains (no TTS clients are created)
+    tracker = VoiceUsageTracker('data')
+    tts_available = {}
+    for path in glob.glob('config/google_tts_account*.json'):
+        account = os.path.splitext(os.path.basename(path))[0].replace('google_tts_', '')
+        tts_available[account] = tracker.quota_state['accounts'].get(account, {}).get('available', MONTHLY_QUOTA)
+    
+    with open(CONFIG['GEMINI_KEYS_FILE']) as f:
+        gemini_keys = len([line for line in f if line.strip()])
+    
+    pending = []
+    for profile in PROFILES:
+        pending += schedule_rows(fetch_eligible_rows(sheets, CONFIG.get('MAX_VIDEOS_TO_SEARCH', 1000), profile))
+    rows = []
+    for row_num, row in pending:
+        job = read_row_job(row, row_num)
+        if job is None or row_num not in ROW_PLANS: continue
+        plan = ROW_PLANS[row_num]
+        rows.append({'row': row_num, 'template': plan['template'], 'class_level': job['class_level'], 'eta': plan.get('eta')})
+    
+    excerpt_chars = PASSAGES_CONFIG.get('MAX_CHARS', 3500) if PASSAGES_CONFIG.get('ENABLED', True) else 8000
+    planner = CapacityPlanner(get_render_predictor(), settings=CAPACITY_CONFIG,
+                              gemini_keys=gemini_keys, tts_available=tts_available, excerpt_chars=excerpt_chars,
+                              gemini_used=get_gemini_usage().today())
+    result = planner.plan(rows)
+    recommended = planner.print_report(result)
+    if recommended < CONFIG['MAX_ROWS_TO_PROCESS']:
+        print(f"   MAX_ROWS_TO_PROCESS is {CONFIG['MAX_ROWS_TO_PROCESS']}; lower it to {recommended} for this run")
+    return result
+
+def prefetch_rows(eligible_rows):
+    """Downloads the next LOOK_AHEAD rows' assets while the current row is processed."""
+    if not PREFETCH_CONFIG.get('ENABLED', True): return eligible_rows
+    from asset_prefetcher import AssetPrefetcher
+    
+    prefetcher = AssetPrefetcher(
+        prefetch_row_assets,
+        look_ahead=PREFETCH_CONFIG.get('LOOK_AHEAD', 2),
+        disk_budget_mb=PREFETCH_CONFIG.get('DISK_BUDGET_MB', 4096),
+        workers=PREFETCH_CONFIG.get('WORKERS', 2),
+        discard_fn=discard_row_assets
+    )
+    return prefetcher.iterate(eligible_rows, read_row_job)
+
+def run_sequential(on_result, eligible_rows):
+    """Original single-process loop: one row at a time in this process."""
+    gemini = GeminiManager()
+    from shorts_engine import ShortsEngine
+    engine = ShortsEngine(CONFIG_FILE)
+    
+    processed = 0
+    for group in iter_row_groups(eligible_rows):
+        process_group(engine, gemini, group, on_result)
+        processed += len(group)
+    return processed
+
+def run_worker_pool(on_result, eligible_rows, num_workers):
+    """
+    Fans row groups out to recycled worker processes; sheet writes stay in this process.
+    Workers never delete downloads: this process holds the refcounts across all
+    in-flight groups and removes a shared file after its last row reports back.
+    """
+    from worker_pool import RowWorkerPool
+    
+    jobs_by_row = {}
+    
+    def groups():
+        for group in iter_row_groups(eligible_rows):
+            jobs = {row_num: read_row_job(row, row_num) for row_num, row in group}
+            jobs_by_row.update({n: j for n, j in jobs.items() if j})
+            retain_assets([j for j in jobs.values() if j])
+            yield group
+    
+    def on_row_result(row_num, success, meta_data):
+        on_result(row_num, success, meta_data)
+        job = jobs_by_row.pop(row_num, None)
+        if job: cleanup_row(job, success=success)
+    
+    pool = RowWorkerPool(
+        num_workers=num_workers,
+        max_jobs_per_worker=POOL_CONFIG.get('MAX_JOBS_PER_WORKER', 4),
+        max_rss_mb=POOL_CONFIG.get('MAX_RSS_MB', 6144),
+        kill_rss_mb=POOL_CONFIG.get('KILL_RSS_MB', 12288),
+        on_result=on_row_result,
+        context_fn=lambda group: {n: ROW_PLANS[n] for n, _ in group if n in ROW_PLANS}
+    )
+    return pool.run(groups())
+
+def run_pipeline(on_result, eligible_rows):
+    """Cross-row staged pipeline (download -> script -> TTS -> render) with bounded queues."""
+    from batch_pipeline import StagedPipeline
+    
+    gemini = GeminiManager()
+    from shorts_engine import ShortsEngine
+    engine = ShortsEngine(CONFIG_FILE)
+    
+    pipeline = StagedPipeline(engine, gemini, PIPELINE_CONFIG, on_result=on_result)
+    return pipeline.run(eligible_rows)
+
+def main(argv=None):
+    args = parse_args(argv)
+    for d in list(DIRS.values()) + [p.output_dir for p in PROFILES]: os.makedirs(d, exist_ok=True)
+    os.makedirs("temp", exist_ok=True)
+    
+    print("🚀 Starting NCERT QuickPrep Shorts Generator")
+    if not (args.plan or args.capacity):
+        prune_row_journals()
+        gc_artifacts()
+        prune_passages()
+        get_gemini_usage().prune()
+    # --- CHANGED SECTION START ---
+    # Use the new authenticate function (on first sheet access; --plan/--capacity
+    # still need the credentials, as they read the sheet)
+    sheets_creds = None
+    def connect_sheets():
+        nonlocal sheets_creds
+        if not args.mock_sheet and sheets_creds is None:
+            sheets_creds = authenticate(
+                CONFIG['SHEETS_SCOPES'], 
+                CONFIG['SHEETS_TOKEN_FILE'], 
+                "Google Sheets"
+            )
+        # Build the service object using the credentials
+        return build_sheets_service(args, sheets_creds)
+    sheets = LazySheetsService(connect_sheets)
+    
+    if args.plan or args.capacity:
+        # No writer/leases: a dry run must not touch the sheet
+        if args.plan: print_plan(sheets)
+        if args.capacity: print_capacity(sheets)
+        return
+    
+    writer = create_sheet_writer(sheets)
+    
+    leases = None
+    if args.lease:
+        # Own service object: the heartbeat thread must not share an HTTP client with the writer
+        leases = create_lease_manager(lambda: LazySheetsService(connect_sheets) if not args.mock_sheet else sheets, writer)
+        leases.start()
+    
+    def on_result(row_num, success, meta_data):
+        write_row_result(writer, row_num, success, meta_data)
+        if leases and not leases.release(row_num):
+            print(f"⚠️ Row {row_num} finished after its lease was taken over; result written anyway")
+    
+    if args.daemon:
+        from generator_daemon import GeneratorDaemon
+        try:
+            GeneratorDaemon(sheets, on_result, writer=writer, leases=leases, settings=DAEMON_CONFIG).serve_forever()
+        finally:
+            if leases: leases.stop()
+            writer.close()
+            release_all_assets()
+        return
+    
+    eligible_rows = prefetch_rows(select_rows(sheets, leases))
+    
+    try:
+        if args.pipeline:
+            print("🏭 Staged pipeline mode")
+            processed = run_pipeline(on_result, eligible_rows)
+        elif args.workers > 1:
+            print(f"🧵 Worker pool mode: {args.workers} processes")
+            processed = run_worker_pool(on_result, eligible_rows, args.workers)
+        else:
+            processed = run_sequential(on_result, eligible_rows)
+    finally:
+        if leases: leases.stop()
+        writer.close()
+        release_all_assets()
     
     print(f"\n✨ Processed {processed} videos!")
+    readers = resource_summary()
+    if readers: print(readers)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
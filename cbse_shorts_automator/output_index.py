@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+File: output_index.py
+Persistent index of output filenames: (output dir, base name) -> highest
+version handed out.
+
+Replaces probing shorts/{base}_V1.mp4, _V2.mp4, ... until a free name turns
+up. A version is reserved inside a BEGIN IMMEDIATE transaction, so worker
+processes and nodes sharing the directory never get the same name. On first
+use the index is seeded with one scan of the output directory; afterwards a
+reservation is an indexed lookup plus one stat of the proposed file (in case
+something was copied in by hand), independent of how many shorts exist.
+Each output directory (channel profiles have their own) is seeded and
+versioned separately in the same database.
+"""
+
+import os
+import re
+import time
+
+from sqlite_index import SQLiteIndex
+
+class OutputIndex(SQLiteIndex):
+    """
+    Usage:
+        index = OutputIndex('data/output_index.sqlite3', 'shorts')
+        version = index.reserve('Motion_quiz_gravity_0042')   # -> 3 (_V1, _V2 already exist)
+    """
+
+    def __init__(self, db_path='data/output_index.sqlite3', output_dir='shorts', ext='.mp4', timeout=30):
+        self.db_path = db_path
+        self.output_dir = output_dir
+        self.dir_key = os.path.normpath(output_dir)
+        self.ext = ext
+        self.timeout = timeout
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        conn = self._connect()
+        try:
+            columns = [r[1] for r in conn.execute("PRAGMA table_info(versions)")]
+            if columns and 'output_dir' not in columns:
+                # Pre-directory schema: drop it, every directory is re-seeded from disk
+                conn.execute("DROP TABLE versions")
+                conn.execute("DELETE FROM meta WHERE key = 'seeded'")
+            conn.execute("CREATE TABLE IF NOT EXISTS versions (output_dir TEXT NOT NULL, base TEXT NOT NULL, "
+                         "max_version INTEGER NOT NULL, PRIMARY KEY (output_dir, base))")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        finally:
+            conn.close()
+        self._seed()
+
+    def _seed(self):
+        """One-time import of the versions already on disk (per output directory)."""
+        seeded_key = f"seeded:{self.dir_key}"
+
+        def seed(conn):
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (seeded_key,)).fetchone():
+                return {}
+            pattern = re.compile(r"^(?P<base>.+)_V(?P<version>\d+)" + re.escape(self.ext) + "$")
+            found = {}
+            if os.path.isdir(self.output_dir):
+                for entry in os.scandir(self.output_dir):
+                    m = pattern.match(entry.name)
+                    if m:
+                        base, version = m.group('base'), int(m.group('version'))
+                        found[base] = max(found.get(base, 0), version)
+            conn.executemany(
+                "INSERT INTO versions (output_dir, base, max_version) VALUES (?, ?, ?) "
+                "ON CONFLICT(output_dir, base) DO UPDATE SET max_version = MAX(max_version, excluded.max_version)",
+                [(self.dir_key, base, version) for base, version in found.items()]
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (seeded_key, str(int(time.time()))))
+            return found
+
+        found = self._transaction(seed)
+        if found:
+            print(f"   🗂️ Output index seeded with {len(found)} base name(s) from {self.output_dir}/")
+
+    def reserve(self, base):
+        """
+        Hands out the next free version for base; never the same one twice.
+
+        Returns:
+            int: Version number (1 for a new base name)
+        """
+        def bump(conn):
+            row = conn.execute("SELECT max_version FROM versions WHERE output_dir = ? AND base = ?",
+                               (self.dir_key, base)).fetchone()
+            version = (row[0] if row else 0) + 1
+            while os.path.exists(os.path.join(self.output_dir, f"{base}_V{version}{self.ext}")):
+                version += 1
+            conn.execute(
+                "INSERT INTO versions (output_dir, base, max_version) VALUES (?, ?, ?) "
+                "ON CONFLICT(output_dir, base) DO UPDATE SET max_version = excluded.max_version",
+                (self.dir_key, base, version)
+            )
+            return version
+        return self._transaction(bump)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+File: passage_index.py
+Per-chapter passage index, so a prompt carries a few relevant passages
+instead of the first 8000 characters of the PDF.
+
+Built once per chapter (keyed by the sha256 of the extracted text):
+- The text is split into sections at heading-like lines ("3.2 Ohm's Law",
+  short ALL-CAPS lines) and each section into passages of about
+  PASSAGE_CHARS, ending on a sentence boundary.
+- Front matter (ISBN, reprint and copyright lines, table of contents) and
+  noise (few letters) are flagged and never selected.
+- Every passage gets a TF-IDF density score within its chapter: specific,
+  rare terms (names, dates, formulas) score above generic prose.
+
+Per short, select() picks passages up to MAX_CHARS: the least-used first (so
+successive shorts of a chapter rotate through it), best score within a tier,
+and each further pick traded off against its similarity to the ones already
+taken (MMR), preferring sections not covered yet. The picks are only claimed
+(uses + 1) by claim() once the script call that carried them succeeded; until
+then they are reserved in memory, so parallel rows of a chapter in this
+process still get different passages and a failed call burns none.
+The prompt receives them in chapter order under their section headings.
+
+prune() drops chapters neither built nor used within MAX_AGE_DAYS.
+"""
+
+import os
+import re
+import math
+import time
+import bisect
+import hashlib
+import threading
+from collections import Counter
+
+from sqlite_index import SQLiteIndex
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z'-]+|\d+(?:\.\d+)?")
+_NUMBERED_HEADING = re.compile(r"^(?:\d+(?:\.\d+){1,3}\.?|\d+\.|[IVX]+\.|Activity\s+\d+(?:\.\d+)*|Example\s+\d+(?:\.\d+)*)\s+[A-Z]")
+_FRONT_MATTER = re.compile(r"ISBN|Reprint|Rationalised|©|All rights reserved|First Edition|CONTENTS|Foreword|Preface", re.IGNORECASE)
+_SENTENCE_END = ('.', '?', '!', ':', ';')
+STOP_WORDS = {
+    'the', 'a', 'an', 'and', 'or', 'of', 'to', 'in', 'on', 'for', 'is', 'are', 'was', 'were', 'be', 'been',
+    'it', 'its', 'this', 'that', 'these', 'those', 'with', 'as', 'by', 'at', 'from', 'which', 'what', 'when',
+    'we', 'you', 'they', 'he', 'she', 'his', 'her', 'their', 'our', 'can', 'will', 'has', 'have', 'had', 'not',
+    'but', 'if', 'so', 'then', 'than', 'also', 'such', 'there', 'here', 'into', 'more', 'some', 'all', 'one',
+}
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def terms(text):
+    return [w.lower() for w in _WORD.findall(text) if w.lower() not in STOP_WORDS and len(w) > 1]
+
+def is_heading(line):
+    line = line.strip()
+    if not line or len(line) > 80 or len(line.split()) > 10 or line.endswith(_SENTENCE_END):
+        return False
+    if _NUMBERED_HEADING.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) >= 4 and all(c.isupper() for c in letters) and len(line.split()) <= 8
+
+def split_passages(text, page_offsets=None, passage_chars=700):
+    """
+    Returns:
+        list: dicts {section, start, page, text} in chapter order
+    """
+    passages = []
+    section, lines, start, offset = '', [], 0, 0
+
+    def flush():
+        body = ''
+        for line in lines:
+            # Re-join hyphenated line breaks; other line breaks become spaces
+            body = body[:-1] + line if body.endswith('-') else (body + ' ' + line if body else line)
+        if body.strip():
+            page = bisect.bisect_right(page_offsets, start) if page_offsets else None
+            passages.append({'section': section, 'start': start, 'page': page, 'text': body.strip()})
+
+    for raw in text.split('\n'):
+        line = raw.strip()
+        if is_heading(line):
+            flush()
+            section, lines, start = line, [], offset
+        elif line:
+            if not lines: start = offset
+            lines.append(line)
+            if sum(len(l) for l in lines) >= passage_chars and line.endswith(_SENTENCE_END):
+                flush()
+                lines = []
+        offset += len(raw) + 1
+    flush()
+    return passages
+
+def is_noise(passage):
+    body = passage['text']
+    letters = sum(c.isalpha() for c in body)
+    return (len(body) < 80 or letters / max(len(body), 1) < 0.55
+            or bool(_FRONT_MATTER.search(body) or _FRONT_MATTER.search(passage['section'])))
+
+class PassageIndex(SQLiteIndex):
+    """
+    Usage:
+        index = PassageIndex('data/passages.sqlite3')
+        excerpt, picks = index.select(pdf_text, page_offsets, max_chars=3500)
+        prompt = prompter.create_prompt(pdf_text, class_level, template, focused_text=excerpt)
+        index.claim(picks, owner='V12')      # Script call succeeded
+        index.release(picks)                 # ... or failed: passages go back unused
+    """
+
+    def __init__(self, db_path='data/passages.sqlite3', passage_chars=700, diversity=0.5, timeout=30):
+        self.db_path = db_path
+        self.passage_chars = passage_chars
+        self.diversity = diversity
+        self.timeout = timeout
+        self._reserved = Counter()  # (doc, idx) -> picks handed out but not claimed or released yet
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        conn = self._connect()
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS chapters (doc TEXT PRIMARY KEY, passages INTEGER NOT NULL, built REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS passages (doc TEXT NOT NULL, idx INTEGER NOT NULL, section TEXT, "
+                         "start INTEGER, page INTEGER, text TEXT NOT NULL, score REAL NOT NULL, skip INTEGER NOT NULL, "
+                         "uses INTEGER NOT NULL DEFAULT 0, last_used REAL, last_owner TEXT, PRIMARY KEY (doc, idx))")
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+    def build(self, text, page_offsets=None):
+        """Indexes a chapter once; returns its doc key."""
+        doc = text_hash(text)
+        conn = self._connect()
+        try:
+            if conn.execute("SELECT 1 FROM chapters WHERE doc = ?", (doc,)).fetchone():
+                return doc
+        finally:
+            conn.close()
+
+        passages = split_passages(text, page_offsets, self.passage_chars)
+        bags = [Counter(terms(p['text'])) for p in passages]
+        df = Counter(t for bag in bags for t in bag)
+        n = max(len(passages), 1)
+        rows = []
+        for i, (p, bag) in enumerate(zip(passages, bags)):
+            idf = sum(math.log(1 + n / df[t]) for t in bag)
+            score = idf / math.sqrt(max(sum(bag.values()), 1))
+            rows.append((doc, i, p['section'], p['start'], p['page'], p['text'], score, int(is_noise(p))))
+
+        def insert(conn):
+            if conn.execute("SELECT 1 FROM chapters WHERE doc = ?", (doc,)).fetchone():
+                return
+            conn.executemany("INSERT INTO passages (doc, idx, section, start, page, text, score, skip) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT INTO chapters VALUES (?, ?, ?)", (doc, len(rows), time.time()))
+        self._transaction(insert)
+        return doc
+
+    # ------------------------------------------------------------------
+    # Select
+    # ------------------------------------------------------------------
+    def select(self, text, page_offsets=None, max_chars=3500):
+        """
+        Picks a diverse set of passages for one short and reserves them until claim() or release().
+
+        Returns:
+            tuple: (excerpt, picks) - passages in chapter order under their section headings
+                   ('' if the chapter has none usable) and the (doc, idxs) handle to claim
+        """
+        doc = self.build(text, page_offsets)
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT idx, section, page, text, score, uses FROM passages "
+                                "WHERE doc = ? AND skip = 0", (doc,)).fetchall()
+        finally:
+            conn.close()
+
+        with self._lock:
+            # Reserved picks count as used, so a parallel row rotates past them
+            rows = [r[:5] + (r[5] + self._reserved[(doc, r[0])],) for r in rows]
+            chosen = sorted(self._choose(rows, max_chars), key=lambda r: r[0])
+            self._reserved.update((doc, r[0]) for r in chosen)
+        picks = (doc, [r[0] for r in chosen])
+
+        blocks, section = [], None
+        for idx, sec, page, body, score, uses in chosen:
+            if sec != section:
+                blocks.append(f"## {sec or 'Introduction'}" + (f" (page {page})" if page else ''))
+                section = sec
+            blocks.append(body)
+        return '\n\n'.join(blocks), picks
+
+    def claim(self, picks, owner=None):
+        """Records the picks of select() as used (call once the prompt carrying them succeeded)."""
+        doc, idxs = picks
+        now = time.time()
+        self._transaction(lambda conn: conn.executemany(
+            "UPDATE passages SET uses = uses + 1, last_used = ?, last_owner = ? WHERE doc = ? AND idx = ?",
+            [(now, owner, doc, idx) for idx in idxs]))
+        self.release(picks)
+
+    def release(self, picks):
+        """Drops the in-memory reservation of picks (claimed or not)."""
+        doc, idxs = picks
+        with self._lock:
+            self._reserved.subtract((doc, idx) for idx in idxs)
+            self._reserved = +self._reserved
+
+    def _choose(self, rows, max_chars):
+        if not rows:
+            return []
+        bags = {r[0]: Counter(terms(r[3])) for r in rows}
+        top = max(r[4] for r in rows) or 1.0
+        chosen, sections, used_chars = [], set(), 0
+        # Least-used tier first: successive shorts of a chapter rotate through it
+        for uses in sorted({r[5] for r in rows}):
+            tier = [r for r in rows if r[5] == uses]
+            while tier:
+                def mmr(r):
+                    overlap = max((self._cosine(bags[r[0]], bags[c[0]]) for c in chosen), default=0.0)
+                    fresh_section = 0.0 if r[1] in sections else 0.1
+                    return r[4] / top + fresh_section - self.diversity * overlap
+                best = max(tier, key=mmr)
+                tier.remove(best)
+                # Section heading line + blank lines count against the budget too
+                cost = len(best[3]) + (0 if best[1] in sections else len(best[1] or '') + 16)
+                if used_chars + cost > max_chars:
+                    if chosen: continue
+                    best = best[:3] + (best[3][:max_chars],) + best[4:]
+                chosen.append(best)
+                sections.add(best[1])
+                used_chars += cost
+            if used_chars >= max_chars * 0.8:
+                break
+        return chosen
+
+    # ------------------------------------------------------------------
+    # Prune
+    # ------------------------------------------------------------------
+    def prune(self, max_age_sec):
+        """Deletes chapters neither built nor used within max_age_sec. Returns how many."""
+        cutoff = time.time() - max_age_sec
+
+        def drop(conn):
+            docs = [r[0] for r in conn.execute(
+                "SELECT c.doc FROM chapters c WHERE MAX(c.built, COALESCE("
+                "(SELECT MAX(p.last_used) FROM passages p WHERE p.doc = c.doc), 0)) < ?", (cutoff,))]
+            for doc in docs:
+                conn.execute("DELETE FROM passages WHERE doc = ?", (doc,))
+                conn.execute("DELETE FROM chapters WHERE doc = ?", (doc,))
+            return len(docs)
+        return self._transaction(drop)
+
+    @staticmethod
+    def _cosine(a, b):
+        dot = sum(v * b.get(t, 0) for t, v in a.items())
+        if not dot:
+            return 0.0
+        return dot / (math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values())))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+File: pdf_text.py
+Chapter PDF text extraction, cached by PDF content.
+
+The cleaned text (newline runs collapsed, as before) and the offset of every
+page in it are stored in the ArtifactStore under the PDF's content hash, so a
+repeat row for the same chapter (or the same chapter behind another URL)
+skips extraction entirely. A miss extracts serially for short chapters and
+splits the pages over a spawn process pool for large books (PyMuPDF releases
+no GIL, so threads would not help); every worker opens its own read-only
+handle and closes it when done. Inside a daemonic process (a RowWorkerPool
+worker) children cannot be started, so extraction stays serial there.
+"""
+
+import os
+import re
+import json
+import tempfile
+import multiprocessing as mp
+import concurrent.futures
+
+# Bump when the cleaning rules change, so older cached text is not reused
+PDF_TEXT_VERSION = 1
+
+def _extract_pages(path, start, stop):
+    """Worker: raw text of pages [start, stop)."""
+    import fitz
+    with fitz.open(path) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+def _page_count(path):
+    import fitz
+    with fitz.open(path) as doc:
+        return doc.page_count
+
+def join_pages(pages):
+    """
+    Cleans and concatenates page texts exactly like re.sub(r'\\n+', '\\n', ''.join(pages)).
+
+    Returns:
+        tuple: (text, offsets) with offsets[i] = start of page i in text
+    """
+    parts, offsets, length = [], [], 0
+    ends_with_newline = False
+    for raw in pages:
+        page = re.sub(r'\n+', '\n', raw)
+        if ends_with_newline and page.startswith('\n'):
+            page = page[1:]  # A newline run across the page break collapses too
+        offsets.append(length)
+        parts.append(page)
+        length += len(page)
+        if page: ends_with_newline = page.endswith('\n')
+    return ''.join(parts), offsets
+
+class PDFTextExtractor:
+    """
+    Usage:
+        extractor = PDFTextExtractor(store=ArtifactStore('data/artifacts'))
+        text, pages = extractor.extract('temp/V12.pdf')   # pages: offset of each page in text
+    """
+
+    def __init__(self, store=None, workers=4, parallel_min_pages=40):
+        self.store = store
+        self.workers = max(1, workers)
+        self.parallel_min_pages = parallel_min_pages
+
+    def extract(self, path):
+        key = self.store.key('pdf_text', files=[path], version=PDF_TEXT_VERSION) if self.store else None
+        hit = self.store.lookup(key) if key else None
+        if hit:
+            with open(hit[0], encoding='utf-8') as f:
+                cached = json.load(f)
+            print(f"   ⚡ PDF text from cache ({len(cached['pages'])} pages)")
+            return cached['text'], cached['pages']
+
+        text, pages = join_pages(self._extract_raw(path))
+        if key:
+            self._save(key, text, pages)
+        return text, pages
+
+    def _extract_raw(self, path):
+        count = _page_count(path)
+        workers = min(self.workers, count)
+        if count < self.parallel_min_pages or workers < 2 or mp.current_process().daemon:
+            # Daemonic processes may not have children
+            return _extract_pages(path, 0, count)
+
+        # Contiguous page ranges, one per worker, reassembled in order
+        step = -(-count // workers)
+        ranges = [(start, min(start + step, count)) for start in range(0, count, step)]
+        print(f"   📄 Extracting {count} pages over {len(ranges)} processes")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=len(ranges), mp_context=mp.get_context('spawn')) as pool:
+            chunks = pool.map(_extract_pages, [path] * len(ranges), *zip(*ranges))
+            return [page for chunk in chunks for page in chunk]
+
+    def _save(self, key, text, pages):
+        fd, tmp = tempfile.mkstemp(suffix='.json', dir=self.store.root)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'text': text, 'pages': pages}, f, ensure_ascii=False)
+            self.store.save(key, tmp, stage='pdf_text', meta={'pages': len(pages), 'chars': len(text)})
+        finally:
+            os.remove(tmp)
@@ -75,11 +75,15 @@ class PromptManager:
             - SPOKEN (_spoken): How it sounds. Use the Phonetic rules from Rule #2 (e.g., H two O, x squared, Delta T, 30 degrees Celsius).
         """
 
-    def create_prompt(self, pdf_text, class_level=None, template='quiz'):
-        """Constructs the final prompt based on the template type."""
+    def create_prompt(self, pdf_text, class_level=None, template='quiz', focused_text=None):
+        """
+        Constructs the final prompt based on the template type.
+        focused_text: passages picked for this short (PassageIndex.select); the
+        first 8000 chars of the chapter when omitted.
+        """
         
         # Limit text context to avoid token overflow
-        focused_text = pdf_text[:8000]
+        focused_text = focused_text or pdf_text[:8000]
         base = self.get_base_context(focused_text, class_level)
         
         if template == 'quiz':
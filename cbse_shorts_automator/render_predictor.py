@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+File: render_predictor.py
+Predicts a row's wall time from our own run history.
+
+Every successful row appends one line to data/render_history.jsonl:
+    {"template", "class_level", "source_sec", "script_chars", "seconds", "source_key", "tts_chars", "ts"}
+Per template, a least-squares fit of
+    seconds ~ 1 + source_minutes + script_kchars + class_level
+is used once MIN_SAMPLES runs exist; below that the template's mean, and
+with no history at all the PRIOR_SEC table. Unknown inputs at schedule
+time are filled from history: source duration by Drive file id (lecture
+videos repeat across rows and runs), script length by the template median.
+"""
+
+import os
+import json
+import time
+import threading
+
+DEFAULT_PRIORS = {'quiz': 300.0, 'fact': 180.0, 'tip': 180.0}
+
+def _least_squares(X, y, ridge=1e-3):
+    """
+    Solves (X'X + ridge*I) b = X'y by Gaussian elimination. Four features only,
+    so no numpy import is needed in the scheduling process. The small ridge
+    term (not applied to the intercept) keeps the fit stable when a feature
+    barely varies, e.g. a single class level.
+
+    Returns:
+        list: Coefficients, or None if the system is singular
+    """
+    n = len(X[0])
+    A = [[sum(row[i] * row[j] for row in X) + (ridge if i == j and i > 0 else 0.0) for j in range(n)]
+         + [sum(row[i] * t for row, t in zip(X, y))] for i in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(A[r][col]))
+        if abs(A[pivot][col]) < 1e-12:
+            return None
+        A[col], A[pivot] = A[pivot], A[col]
+        for r in range(n):
+            if r != col:
+                f = A[r][col] / A[col][col]
+                A[r] = [a - f * c for a, c in zip(A[r], A[col])]
+    return [A[i][n] / A[i][i] for i in range(n)]
+
+class RenderTimePredictor:
+    """
+    Usage:
+        predictor = RenderTimePredictor('data/render_history.jsonl')
+        eta = predictor.predict('quiz', class_level=10, source_key='1AbC...')
+        predictor.record('quiz', 10, source_sec=1800, script_chars=900, seconds=412, source_key='1AbC...')
+    """
+
+    def __init__(self, history_path='data/render_history.jsonl', priors=None,
+                 min_samples=8, max_history=2000):
+        self.history_path = history_path
+        self.priors = dict(DEFAULT_PRIORS, **(priors or {}))
+        self.min_samples = min_samples
+        self.max_history = max_history
+        self.lock = threading.Lock()
+        self._records = None
+        self._models = {}
+
+    # ------------------------------------------------------------------
+    # History
+    # ------------------------------------------------------------------
+    def _load(self):
+        if self._records is not None:
+            return self._records
+        records = []
+        if os.path.exists(self.history_path):
+            with open(self.history_path, 'r') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        self._records = records[-self.max_history:]
+        return self._records
+
+    def record(self, template, class_level, source_sec, script_chars, seconds, source_key=None, tts_chars=None):
+        entry = {'template': template, 'class_level': class_level, 'source_sec': source_sec,
+                 'script_chars': script_chars, 'seconds': round(seconds, 1),
+                 'source_key': source_key, 'tts_chars': tts_chars, 'ts': int(time.time())}
+        os.makedirs(os.path.dirname(self.history_path) or '.', exist_ok=True)
+        # One short O_APPEND write per line, so pool workers can share the file
+        with self.lock:
+            with open(self.history_path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+            self._load().append(entry)
+            self._models.pop(template, None)
+
+    def history(self):
+        """Recorded rows, oldest first (also read by capacity_planner)."""
+        with self.lock:
+            return list(self._load())
+
+    def source_duration(self, source_key):
+        if not source_key:
+            return None
+        for r in reversed(self._load()):
+            if r.get('source_key') == source_key and r.get('source_sec'):
+                return r['source_sec']
+        return None
+
+    @staticmethod
+    def _median(values):
+        values = sorted(v for v in values if v)
+        return values[len(values) // 2] if values else None
+
+    def expected_script_chars(self, template):
+        return self._median(r.get('script_chars') for r in self._load() if r.get('template') == template) or 900
+
+    def typical_source_sec(self):
+        return self._median(r.get('source_sec') for r in self._load()) or 1800
+
+    # ------------------------------------------------------------------
+    # Model
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _features(class_level, source_sec, script_chars):
+        return [1.0, (source_sec or 0) / 60.0, (script_chars or 0) / 1000.0, float(class_level or 0)]
+
+    def _fit(self, template):
+        if template in self._models:
+            return self._models[template]
+
+        rows = [r for r in self._load() if r.get('template') == template and r.get('seconds')]
+        model = None
+        if len(rows) >= self.min_samples:
+            X = [self._features(r.get('class_level'), r.get('source_sec'), r.get('script_chars')) for r in rows]
+            y = [r['seconds'] for r in rows]
+            coef = _least_squares(X, y)
+            model = ('linear', coef) if coef else ('mean', sum(y) / len(y))
+        elif rows:
+            model = ('mean', sum(r['seconds'] for r in rows) / len(rows))
+        self._models[template] = model
+        return model
+
+    def predict(self, template, class_level=None, source_sec=None, script_chars=None, source_key=None):
+        """
+        Returns:
+            float: Estimated wall time of one row in seconds
+        """
+        with self.lock:
+            model = self._fit(template)
+            if model is None:
+                return self.priors.get(template, max(self.priors.values()))
+            if model[0] == 'mean':
+                return model[1]
+
+            if source_sec is None:
+                source_sec = self.source_duration(source_key) or self.typical_source_sec()
+            if script_chars is None:
+                script_chars = self.expected_script_chars(template)
+            x = self._features(class_level, source_sec, script_chars)
+            estimate = sum(c * v for c, v in zip(model[1], x))
+            # A linear fit can undershoot far outside the training range
+            return max(estimate, 0.25 * self.priors.get(template, 60.0))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+File: resource_scope.py
+Deterministic cleanup of moviepy file readers (one ffmpeg process each).
+
+Every AudioFileClip / VideoFileClip keeps an ffmpeg reader process and its
+pipes open until the clip is closed or garbage collected. A short opens many
+of them: 9 voice tracks, 20+ SFX, the music bed, the source video (and a new
+reader process on every backwards seek). Inside a ResourceScope every file
+clip opened by the thread is registered, and every reader process it spawns
+is counted. When the scope ends, a clip still open and a reader process still
+running that no open clip owns are both leaks (the template never closed
+them); they are counted first, then the clips are closed in reverse order and
+whatever reader process is left is killed.
+
+    with ResourceScope(vid_id) as scope:
+        template.generate(...)
+    scope.stats   # {'clips': 14, 'spawned': 23, 'leaked': 0}
+
+Registration patches moviepy once per process (install()); threads without an
+active scope are not affected.
+"""
+
+import threading
+
+_state = threading.local()
+_installed = False
+_install_lock = threading.Lock()
+
+def current_scope():
+    return getattr(_state, 'scope', None)
+
+def _wrap_init(cls):
+    original = cls.__init__
+    def __init__(self, *args, **kwargs):
+        original(self, *args, **kwargs)
+        scope = current_scope()
+        if scope is not None:
+            scope.track(self)
+    cls.__init__ = __init__
+
+def _wrap_initialize(cls):
+    original = cls.initialize
+    def initialize(self, *args, **kwargs):
+        original(self, *args, **kwargs)
+        scope = current_scope()
+        if scope is not None and getattr(self, 'proc', None) is not None:
+            scope.spawned(self.proc)
+    cls.initialize = initialize
+
+def install():
+    """Hooks clip construction and reader (re)starts of moviepy's ffmpeg readers."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from moviepy.audio.io.AudioFileClip import AudioFileClip
+        from moviepy.video.io.VideoFileClip import VideoFileClip
+        from moviepy.audio.io.readers import FFMPEG_AudioReader
+        from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+        _wrap_init(AudioFileClip)
+        _wrap_init(VideoFileClip)
+        _wrap_initialize(FFMPEG_AudioReader)
+        _wrap_initialize(FFMPEG_VideoReader)
+        _installed = True
+
+class ResourceScope:
+    """
+    Usage:
+        with ResourceScope('V12') as scope:
+            clip = AudioFileClip(path)     # tracked automatically
+            scope.track(other)             # anything else with a close()
+        print(scope.stats)
+    """
+
+    # Process-wide counters over every scope, for the end-of-batch summary
+    totals = {'scopes': 0, 'clips': 0, 'spawned': 0, 'leaked': 0}
+    _totals_lock = threading.Lock()
+
+    def __init__(self, name, debug=False):
+        self.name = name
+        self.debug = debug
+        self.clips = []
+        self.procs = []
+        self.stats = None
+        self._outer = None
+
+    def track(self, resource):
+        """Registers anything with a close() (clips, writers) to be closed with the scope."""
+        self.clips.append(resource)
+        return resource
+
+    def spawned(self, proc):
+        self.procs.append(proc)
+
+    @staticmethod
+    def _is_open(clip):
+        # moviepy file clips drop their reader in close()
+        return getattr(clip, 'reader', None) is not None
+
+    @staticmethod
+    def _reader_procs(clip):
+        readers = [getattr(clip, 'reader', None), getattr(getattr(clip, 'audio', None), 'reader', None)]
+        return [r.proc for r in readers if getattr(r, 'proc', None) is not None]
+
+    # ------------------------------------------------------------------
+    # Cleanup
+    # ------------------------------------------------------------------
+    def close(self):
+        """
+        Counts what the template left open, closes tracked clips (newest first),
+        then kills reader processes still running.
+
+        Returns:
+            dict: {'clips', 'spawned', 'leaked'}; leaked = clips never closed plus
+                  reader processes still running without an open clip
+        """
+        clips, self.clips = self.clips, []
+        open_clips = [c for c in clips if self._is_open(c)]
+        owned = {id(p) for c in open_clips for p in self._reader_procs(c)}
+        stray = [p for p in self.procs if p.poll() is None and id(p) not in owned]
+
+        for clip in reversed(clips):
+            try:
+                clip.close()
+            except Exception as e:
+                if self.debug: print(f"⚠️ Could not close {type(clip).__name__}: {e}")
+
+        for p in self.procs:
+            if p.poll() is not None:
+                continue
+            try:
+                p.kill()
+                p.wait(timeout=5)
+            except Exception:
+                pass
+
+        leaked = len(open_clips) + len(stray)
+        self.stats = {'clips': len(clips), 'spawned': len(self.procs), 'leaked': leaked}
+        self.procs = []
+        with ResourceScope._totals_lock:
+            ResourceScope.totals['scopes'] += 1
+            for k, v in self.stats.items():
+                ResourceScope.totals[k] += v
+        if leaked or self.debug:
+            print(f"   🧹 {self.name}: closed {self.stats['clips']} clip(s), "
+                  f"{self.stats['spawned']} ffmpeg reader(s) spawned, {self.stats['leaked']} leaked "
+                  f"({len(open_clips)} clip(s) left open, {len(stray)} stray reader(s))")
+        return self.stats
+
+    def __enter__(self):
+        install()
+        self._outer = current_scope()
+        _state.scope = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _state.scope = self._outer
+        self.close()
+        return False
+
+def resource_summary():
+    """One line over every scope of this process, or None when nothing ran in one."""
+    t = ResourceScope.totals
+    if not t['scopes']:
+        return None
+    return (f"🧹 ffmpeg readers: {t['spawned']} spawned over {t['scopes']} render(s), "
+            f"{t['clips']} clip(s) closed, {t['leaked']} leaked")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+File: row_journal.py
+Per-row checkpoint journal, so a crashed or failed row resumes where it stopped.
+
+One JSON file per short: data/journal/{vid_id}.json
+    {"inputs": "<pdf_url>|<vid_url>", "updated": 1700000000,
+     "stages": {"downloaded": {...}, "script": {...}, "tts": {"hook": "temp/..mp3", ...},
+                "clip": {"cuts": [[start, len], ...]}, "audio_mix": {...}, "render": {...}},
+     "temp_files": ["temp/..mp3", ...]}
+
+Every update rewrites the file atomically (tmp + fsync + rename), so a kill at
+any point leaves the previous complete state. The journal is deleted when the
+row succeeds; failed rows keep it (and their temp files) for the next attempt,
+and journals untouched for MAX_AGE_HOURS are pruned together with the temp
+files they list.
+"""
+
+import os
+import json
+import time
+import threading
+
+class RowJournal:
+    """
+    Usage:
+        journal = RowJournal('data/journal', job['vid_id'], inputs=f"{pdf_url}|{vid_url}")
+        script = journal.get('script')           # None -> stage still has to run
+        journal.done('script', {...})
+        journal.done_item('tts', 'hook', path, temp_file=True)
+        journal.finish()                         # row succeeded
+    """
+
+    def __init__(self, journal_dir, vid_id, inputs=''):
+        self.path = os.path.join(journal_dir, f"{vid_id}.json")
+        self.inputs = inputs
+        self.lock = threading.Lock()
+        os.makedirs(journal_dir, exist_ok=True)
+
+        self.state = self._read(self.path)
+        if self.state and self.state.get('inputs') != inputs:
+            # Row now points at another PDF/video: nothing recorded is valid any more
+            print(f"   ♻️ Journal for {vid_id} is for other inputs; starting fresh")
+            self.state = None
+        if not self.state:
+            self.state = {'inputs': inputs, 'stages': {}, 'temp_files': []}
+
+    @staticmethod
+    def _read(path):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self):
+        self.state['updated'] = int(time.time())
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+    def completed(self):
+        with self.lock:
+            return list(self.state['stages'])
+
+    def get(self, stage):
+        with self.lock:
+            return self.state['stages'].get(stage)
+
+    def done(self, stage, data=None, temp_files=()):
+        """Records a finished stage; temp_files are deleted if the journal is ever pruned."""
+        with self.lock:
+            self.state['stages'][stage] = data if data is not None else {}
+            self._add_temp_files(temp_files)
+            self._write()
+
+    def done_item(self, stage, key, value, temp_file=False):
+        """Records one finished piece of a multi-part stage (e.g. one TTS segment)."""
+        with self.lock:
+            self.state['stages'].setdefault(stage, {})[key] = value
+            if temp_file:
+                self._add_temp_files([value])
+            self._write()
+
+    def forget(self, stage):
+        with self.lock:
+            if self.state['stages'].pop(stage, None) is not None:
+                self._write()
+
+    def _add_temp_files(self, paths):
+        for p in paths:
+            if p and p not in self.state['temp_files']:
+                self.state['temp_files'].append(p)
+
+    def finish(self):
+        """Row succeeded: the journal is no longer needed."""
+        with self.lock:
+            for p in (self.path, self.path + ".tmp"):
+                if os.path.exists(p):
+                    os.remove(p)
+
+    @classmethod
+    def peek(cls, journal_dir, vid_id, inputs=''):
+        """Read-only look at a row's finished stages ({} if none or recorded for other inputs)."""
+        state = cls._read(os.path.join(journal_dir, f"{vid_id}.json")) or {}
+        return state.get('stages', {}) if state.get('inputs') == inputs else {}
+
+    # ------------------------------------------------------------------
+    # Housekeeping
+    # ------------------------------------------------------------------
+    @classmethod
+    def prune(cls, journal_dir, max_age_sec, keep=None):
+        """
+        Deletes journals not updated for max_age_sec, plus the temp files they list.
+
+        Args:
+            keep: Optional callable(path) -> True for files that must survive (still in use)
+
+        Returns:
+            int: Number of journals removed
+        """
+        if not os.path.isdir(journal_dir):
+            return 0
+        removed = 0
+        now = time.time()
+        for name in os.listdir(journal_dir):
+            path = os.path.join(journal_dir, name)
+            if not name.endswith('.json'):
+                continue
+            state = cls._read(path) or {}
+            if now - state.get('updated', os.path.getmtime(path)) < max_age_sec:
+                continue
+            for p in state.get('temp_files', []):
+                if keep and keep(p):
+                    continue
+                if os.path.exists(p):
+                    try: os.remove(p)
+                    except OSError: pass
+            os.remove(path)
+            removed += 1
+        return removed
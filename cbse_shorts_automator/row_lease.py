@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+File: row_lease.py
+Lease-based row claiming so several generator nodes can share one sheet.
+
+A node claims a row by writing "Claimed by <owner> until <UTC expiry>" into
+the status column, waiting SETTLE_SEC and reading the cell back: only the
+node whose lease is still there owns the row. Held leases are renewed by a
+heartbeat thread while the row renders; a node that dies simply stops
+renewing, and once the expiry passes the row is eligible again for anyone.
+
+There is no coordinator. Each node walks the eligible rows starting at an
+offset derived from its owner id, so nodes mostly try different rows first
+and claim collisions stay rare. Sheets has no compare-and-set, so the
+settle/read-back only narrows the race; the heartbeat re-checks ownership
+and reports a lost lease instead of silently overwriting another node.
+
+Renewals share a lock with this node's status writer (write_lock, the
+SheetWriteBuffer's flush lock), so a row's final status cannot be flushed
+between a renewal's read and its write and then be overwritten by a lease.
+"""
+
+import os
+import re
+import time
+import zlib
+import socket
+import threading
+from datetime import datetime, timezone
+
+LEASE_PREFIX = "Claimed by"
+_LEASE_RE = re.compile(r"^Claimed by (?P<owner>\S+) until (?P<until>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z)$")
+
+def default_owner():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def format_lease(owner, expires_at):
+    until = datetime.fromtimestamp(expires_at, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return f"{LEASE_PREFIX} {owner} until {until}"
+
+def parse_lease(status):
+    """
+    Returns:
+        tuple: (owner, expires_at_epoch) or None if the cell is not a lease
+    """
+    m = _LEASE_RE.match((status or "").strip())
+    if not m:
+        return None
+    until = datetime.strptime(m.group('until'), "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    return m.group('owner'), until.timestamp()
+
+def is_expired_lease(status, now=None):
+    lease = parse_lease(status)
+    return lease is not None and lease[1] <= (now or time.time())
+
+def shard_order(rows, owner):
+    """Rotates the candidate list by a per-owner offset so nodes start on different rows."""
+    rows = list(rows)
+    if not rows:
+        return rows
+    offset = zlib.crc32(owner.encode()) % len(rows)
+    return rows[offset:] + rows[:offset]
+
+class RowLeaseManager:
+    """
+    Usage:
+        leases = RowLeaseManager(sheets, SPREADSHEET_ID, "Sheet1", status_col_idx=39,
+                                 write_lock=writer.flush_lock)
+        leases.start()
+        for row_num, row in leases.claim_iter(candidates, "Not Generated", limit=10):
+            ...process...
+            leases.release(row_num)   # after the final status has been queued
+        leases.stop()                 # hands unfinished rows back
+    """
+
+    def __init__(self, sheets, spreadsheet_id, sheet_name, status_col_idx, owner=None,
+                 ttl_sec=900, heartbeat_sec=120, settle_sec=2.0, reclaim_expired=True, write_lock=None):
+        """
+        Args:
+            sheets: Sheets API service (use a separate instance from other threads' writers)
+            spreadsheet_id: Target spreadsheet
+            sheet_name: Tab name
+            status_col_idx: 0-based column holding status / lease
+            owner: Unique node id (defaults to hostname-pid)
+            ttl_sec: Lease lifetime; other nodes may reclaim after this
+            heartbeat_sec: Renewal interval (keep well below ttl_sec)
+            settle_sec: Wait between writing a claim and reading it back
+            reclaim_expired: Treat rows whose lease expired (a dead node's) as pending again
+            write_lock: Lock the status writer holds while flushing (SheetWriteBuffer.flush_lock)
+        """
+        self.sheets = sheets
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_name = sheet_name
+        self.status_col_idx = status_col_idx
+        self.owner = owner or default_owner()
+        self.ttl_sec = ttl_sec
+        self.heartbeat_sec = heartbeat_sec
+        self.settle_sec = settle_sec
+        self.reclaim_expired = reclaim_expired
+
+        # row_num -> (lease string currently in the cell, status to restore on stop)
+        self.held = {}
+        self.lost = set()
+        self.lock = threading.RLock()
+        self.api_lock = threading.Lock()
+        self.write_lock = write_lock or threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Cell I/O
+    # ------------------------------------------------------------------
+    def _cell(self, row_num):
+        from sheet_reader import col_letter
+        return f"{self.sheet_name}!{col_letter(self.status_col_idx)}{row_num}"
+
+    def _read_cells(self, row_nums):
+        ranges = [self._cell(n) for n in row_nums]
+        with self.api_lock:
+            res = self.sheets.spreadsheets().values().batchGet(
+                spreadsheetId=self.spreadsheet_id, ranges=ranges
+            ).execute()
+        out = {}
+        for n, vr in zip(row_nums, res.get('valueRanges', [])):
+            values = vr.get('values', [])
+            out[n] = str(values[0][0]).strip() if values and values[0] else ""
+        return out
+
+    def _write_cells(self, updates):
+        if not updates:
+            return
+        body = {
+            'valueInputOption': 'RAW',
+            'data': [{'range': self._cell(n), 'values': [[v]]} for n, v in updates.items()]
+        }
+        with self.api_lock:
+            self.sheets.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id, body=body
+            ).execute()
+
+    # ------------------------------------------------------------------
+    # Claiming
+    # ------------------------------------------------------------------
+    def is_claimable(self, status, pending_status):
+        if status.lower() == pending_status.lower():
+            return True
+        return self.reclaim_expired and is_expired_lease(status)
+
+    def claim(self, row_num, pending_status):
+        """
+        Tries to take the lease on one row.
+
+        Returns:
+            bool: True if this node now owns the row
+        """
+        current = self._read_cells([row_num])[row_num]
+        if not self.is_claimable(current, pending_status):
+            return False
+
+        lease = format_lease(self.owner, time.time() + self.ttl_sec)
+        self._write_cells({row_num: lease})
+        time.sleep(self.settle_sec)
+
+        # Last writer wins; whoever reads their own lease back owns the row
+        if self._read_cells([row_num])[row_num] != lease:
+            print(f"   🤝 Row {row_num} claimed by another node")
+            return False
+
+        with self.lock:
+            self.held[row_num] = (lease, pending_status)
+        print(f"   🔒 Claimed row {row_num} as {self.owner}")
+        return True
+
+    def claim_iter(self, rows, pending_status, limit=None):
+        """
+        Lazily claims rows from a candidate list, in this node's shard order.
+        Claiming happens as the consumer asks for the next row, so rows are
+        never held long before work on them starts.
+
+        Yields:
+            (row_num, row) for each row this node owns
+        """
+        claimed = 0
+        for row_num, row in shard_order(rows, self.owner):
+            if limit is not None and claimed >= limit:
+                return
+            try:
+                ok = self.claim(row_num, pending_status)
+            except Exception as e:
+                print(f"⚠️ Claim failed for row {row_num}: {e}")
+                continue
+            if ok:
+                claimed += 1
+                yield row_num, row
+
+    def release(self, row_num):
+        """
+        Stops renewing a finished row. The final status write replaces the lease.
+
+        Returns:
+            bool: False if the lease had been lost to another node meanwhile
+        """
+        with self.lock:
+            self.held.pop(row_num, None)
+            if row_num in self.lost:
+                self.lost.discard(row_num)
+                return False
+        return True
+
+    # ------------------------------------------------------------------
+    # Heartbeat
+    # ------------------------------------------------------------------
+    def renew(self):
+        """Extends every held lease that still carries this node's name."""
+        with self.lock:
+            if not self.held:
+                return
+
+        # No status flush between the read and the write below
+        with self.write_lock:
+            with self.lock:
+                rows = dict(self.held)
+            current = self._read_cells(list(rows))
+            with self.lock:
+                updates = {}
+                for n, (lease, pending_status) in rows.items():
+                    if n not in self.held:
+                        continue  # Released meanwhile: its final status replaces the lease
+                    if current.get(n) != lease:
+                        print(f"⚠️ Lease on row {n} lost (now '{current.get(n)}')")
+                        self.held.pop(n, None)
+                        self.lost.add(n)
+                        continue
+                    updates[n] = format_lease(self.owner, time.time() + self.ttl_sec)
+                # Written while holding the lock, so release() cannot slip in before the write
+                self._write_cells(updates)
+                for n, lease in updates.items():
+                    self.held[n] = (lease, self.held[n][1])
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_sec):
+            try:
+                self.renew()
+            except Exception as e:
+                # A missed heartbeat is fine as long as the next one lands before expiry
+                print(f"⚠️ Lease heartbeat failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._heartbeat_loop, name="row-lease-heartbeat", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the heartbeat and hands rows that never finished back to the queue."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+        with self.lock:
+            rows = dict(self.held)
+            self.held.clear()
+        if not rows:
+            return
+        try:
+            with self.write_lock:
+                current = self._read_cells(list(rows))
+                restore = {n: pending for n, (lease, pending) in rows.items() if current.get(n) == lease}
+                self._write_cells(restore)
+            if restore:
+                print(f"   🔓 Released {len(restore)} unfinished row lease(s)")
+        except Exception as e:
+            print(f"⚠️ Could not release leases ({e}); they expire in {self.ttl_sec}s")
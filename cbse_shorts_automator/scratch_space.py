@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+File: scratch_space.py
+Managed scratch space for intermediates under DIRS['TEMP'].
+
+Every intermediate (voice tracks, moviepy's temp audio, transcript caches) is
+registered in a SQLite index with the job that owns it. Cleanup deletes the
+owner's indexed paths instead of globbing the directory.
+
+- An owner is "held" while a live process is working on it (pid recorded);
+  held owners are never evicted. Owners of crashed processes and of failed
+  rows kept for a resume (checkpoint journal) are evictable.
+- Per-job quota: registering past JOB_QUOTA_MB raises ScratchQuotaExceeded,
+  so one runaway row fails instead of filling the disk.
+- Global quota: past TOTAL_QUOTA_MB, the least-recently-used artifacts of
+  evictable owners are deleted until usage is back under LOW_WATER of it.
+Files found in the scratch directory when the index is first created are
+adopted as evictable, so leftovers from before the index are reclaimed too
+(except in-flight downloads and writes: *.part, *.part.json, *.tmp).
+
+RAM tier: small, short-lived intermediates (voice tracks, moviepy's temp
+audio, the Remotion assets) are placed under RAM_DIR (/dev/shm) when the file
+is expected to be below RAM_MAX_FILE_MB and the tmpfs keeps RAM_MIN_FREE_MB
+free afterwards; otherwise they fall back to the disk root. Both tiers share
+the index, so ownership, quotas and eviction are the same.
+"""
+
+import os
+import time
+
+from sqlite_index import SQLiteIndex
+
+# Partial files of a download or write still in progress (never adopted)
+IN_FLIGHT_SUFFIXES = ('.part', '.part.json', '.tmp')
+
+class ScratchQuotaExceeded(Exception):
+    pass
+
+class ScratchSpace(SQLiteIndex):
+    """
+    Usage:
+        scratch = ScratchSpace('temp', 'data/scratch_index.sqlite3')
+        path = scratch.place(f"{owner}_hook.mp3", expected_bytes=1 << 20)   # RAM tier if it fits
+        scratch.register(path, owner)              # after the file is written; holds owner for this process
+        scratch.release_owner(owner)               # row done: delete its files, drop the hold
+    """
+
+    def __init__(self, root='temp', db_path='data/scratch_index.sqlite3', job_quota_mb=4096,
+                 total_quota_mb=20480, low_water=0.8, ram_dir=None, ram_max_file_mb=64,
+                 ram_min_free_mb=256, timeout=30):
+        self.root = root
+        self.db_path = db_path
+        self.job_quota = int(job_quota_mb * 1024 * 1024) if job_quota_mb else 0
+        self.total_quota = int(total_quota_mb * 1024 * 1024) if total_quota_mb else 0
+        self.low_water = low_water
+        self.timeout = timeout
+        os.makedirs(root, exist_ok=True)
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.ram_max_file = int(ram_max_file_mb * 1024 * 1024)
+        self.ram_min_free = int(ram_min_free_mb * 1024 * 1024)
+        self.ram_dir = self._init_ram_dir(ram_dir)
+
+        conn = self._connect()
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS artifacts (path TEXT PRIMARY KEY, owner TEXT NOT NULL, "
+                         "bytes INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS artifacts_owner ON artifacts (owner)")
+            conn.execute("CREATE INDEX IF NOT EXISTS artifacts_lru ON artifacts (last_used)")
+            conn.execute("CREATE TABLE IF NOT EXISTS holds (owner TEXT PRIMARY KEY, pid INTEGER NOT NULL, since REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        finally:
+            conn.close()
+        self._adopt_existing()
+
+    @classmethod
+    def from_config(cls, root, settings):
+        """Builds the scratch space described by the SCRATCH config block."""
+        return cls(
+            root, settings.get('DB_FILE', 'data/scratch_index.sqlite3'),
+            job_quota_mb=settings.get('JOB_QUOTA_MB', 4096),
+            total_quota_mb=settings.get('TOTAL_QUOTA_MB', 20480),
+            low_water=settings.get('LOW_WATER', 0.8),
+            ram_dir=settings.get('RAM_DIR'),
+            ram_max_file_mb=settings.get('RAM_MAX_FILE_MB', 64),
+            ram_min_free_mb=settings.get('RAM_MIN_FREE_MB', 256)
+        )
+
+    @staticmethod
+    def _init_ram_dir(ram_dir):
+        if not ram_dir or not os.path.isdir(os.path.dirname(ram_dir.rstrip('/')) or '/'):
+            return None
+        try:
+            os.makedirs(ram_dir, exist_ok=True)
+        except OSError:
+            return None
+        return ram_dir if os.access(ram_dir, os.W_OK) else None
+
+    def _adopt_existing(self):
+        def adopt(conn):
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'adopted'").fetchone():
+                return 0
+            now = time.time()
+            rows = []
+            for entry in os.scandir(self.root):
+                if entry.is_file() and not entry.name.endswith(IN_FLIGHT_SUFFIXES):
+                    st = entry.stat()
+                    rows.append((entry.path, 'orphan', st.st_size, now, st.st_mtime))
+            conn.executemany("INSERT OR IGNORE INTO artifacts VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('adopted', ?)", (str(int(now)),))
+            return len(rows)
+        adopted = self._transaction(adopt)
+        if adopted:
+            print(f"   🧹 Scratch index adopted {adopted} existing file(s) in {self.root}/")
+
+    @staticmethod
+    def _pid_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    # ------------------------------------------------------------------
+    # Owners
+    # ------------------------------------------------------------------
+    def hold(self, owner):
+        self._transaction(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO holds VALUES (?, ?, ?)", (owner, os.getpid(), time.time())))
+
+    def unhold(self, owner):
+        """Keeps the owner's files but lets them be evicted (e.g. a failed row kept for resume)."""
+        self._transaction(lambda conn: conn.execute("DELETE FROM holds WHERE owner = ?", (owner,)))
+
+    def release_owner(self, owner, delete=True):
+        """Deletes every file registered to owner (an index query, no glob) and drops its hold."""
+        def release(conn):
+            paths = [r[0] for r in conn.execute("SELECT path FROM artifacts WHERE owner = ?", (owner,))]
+            conn.execute("DELETE FROM artifacts WHERE owner = ?", (owner,))
+            conn.execute("DELETE FROM holds WHERE owner = ?", (owner,))
+            return paths
+        paths = self._transaction(release)
+        if delete:
+            for p in paths:
+                self._unlink(p)
+        return len(paths)
+
+    # ------------------------------------------------------------------
+    # Artifacts
+    # ------------------------------------------------------------------
+    def ram_path(self, name, expected_bytes=0):
+        """Path on the RAM tier, or None when it is off, the file is too big or tmpfs is short."""
+        if not self.ram_dir or expected_bytes > self.ram_max_file:
+            return None
+        try:
+            st = os.statvfs(self.ram_dir)
+        except OSError:
+            return None
+        if st.f_bavail * st.f_frsize - expected_bytes < self.ram_min_free:
+            return None
+        return os.path.join(self.ram_dir, name)
+
+    def place(self, name, expected_bytes=0):
+        """Path for a new intermediate: RAM tier when it fits, else the disk root."""
+        return self.ram_path(name, expected_bytes) or os.path.join(self.root, name)
+
+    def register(self, path, owner, hold=True):
+        """
+        Records (or re-sizes) an artifact. Call again after the file grows.
+        hold=False for caches no particular row is working on (evictable at once).
+
+        Raises:
+            ScratchQuotaExceeded: owner is over the per-job quota
+        """
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        now = time.time()
+
+        def upsert(conn):
+            conn.execute(
+                "INSERT INTO artifacts VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET owner = excluded.owner, bytes = excluded.bytes, last_used = excluded.last_used",
+                (path, owner, size, now, now)
+            )
+            if hold:
+                conn.execute("INSERT OR REPLACE INTO holds VALUES (?, ?, ?)", (owner, os.getpid(), now))
+            owner_bytes = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM artifacts WHERE owner = ?", (owner,)).fetchone()[0]
+            total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM artifacts").fetchone()[0]
+            return owner_bytes, total
+        owner_bytes, total = self._transaction(upsert)
+
+        if self.job_quota and owner_bytes > self.job_quota:
+            raise ScratchQuotaExceeded(
+                f"{owner} uses {owner_bytes / 1048576:.0f} MB of scratch (quota {self.job_quota / 1048576:.0f} MB)")
+        if self.total_quota and total > self.total_quota:
+            self.reclaim(int(self.total_quota * self.low_water))
+        return path
+
+    def touch(self, path):
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE artifacts SET last_used = ? WHERE path = ?", (time.time(), path)))
+
+    def forget(self, path):
+        """Drops the index entry of a file someone else already deleted."""
+        self._transaction(lambda conn: conn.execute("DELETE FROM artifacts WHERE path = ?", (path,)))
+
+    def discard(self, path):
+        self.forget(path)
+        self._unlink(path)
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️ Could not delete scratch file {path}: {e}")
+
+    # ------------------------------------------------------------------
+    # Quotas
+    # ------------------------------------------------------------------
+    def usage(self, owner=None):
+        conn = self._connect()
+        try:
+            if owner is None:
+                return conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM artifacts").fetchone()[0]
+            return conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM artifacts WHERE owner = ?", (owner,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def reclaim(self, target_bytes):
+        """
+        Evicts least-recently-used artifacts of owners no live process holds
+        until usage is at most target_bytes.
+
+        Returns:
+            int: Bytes freed
+        """
+        def evict(conn):
+            holds = conn.execute("SELECT owner, pid FROM holds").fetchall()
+            dead = [o for o, pid in holds if not self._pid_alive(pid)]
+            conn.executemany("DELETE FROM holds WHERE owner = ?", [(o,) for o in dead])
+            held = {o for o, _ in holds} - set(dead)
+
+            total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM artifacts").fetchone()[0]
+            victims = []
+            for path, owner, size in conn.execute("SELECT path, owner, bytes FROM artifacts ORDER BY last_used"):
+                if total <= target_bytes:
+                    break
+                if owner in held:
+                    continue
+                victims.append(path)
+                total -= size
+            conn.executemany("DELETE FROM artifacts WHERE path = ?", [(p,) for p in victims])
+            return victims, total
+
+        before = self.usage()
+        victims, after = self._transaction(evict)
+        for p in victims:
+            self._unlink(p)
+        if victims:
+            print(f"   🧹 Scratch: evicted {len(victims)} file(s), {(before - after) / 1048576:.0f} MB freed")
+        return before - after
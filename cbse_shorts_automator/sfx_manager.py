@@ -4,12 +4,23 @@ Handles the mixing and timing of sound effects.
 """
 import os
 import random  # <--- NEW
+import threading
 from moviepy.editor import AudioFileClip
+from moviepy.audio.AudioClip import AudioArrayClip
 from moviepy.audio.fx.all import audio_normalize # <--- NEW
 
 class SFXManager:
-    def __init__(self, config_dir='config/sfx'):
+    def __init__(self, config_dir='config/sfx', cache_decoded=False):
+        """
+        Args:
+            config_dir: Folder with the SFX files
+            cache_decoded: Keep each file decoded (and normalized) in memory, so a quiz's
+                           12 ticks or a long-lived engine don't re-run ffmpeg per use
+        """
         self.config_dir = config_dir
+        self.cache_decoded = cache_decoded
+        self._decoded = {}
+        self._lock = threading.Lock()
         # Map logical names to filenames
         self.assets = {
             # Quiz Assets
@@ -48,12 +59,8 @@ class SFXManager:
             if not os.path.exists(path): return None
 
         try:
-            clip = AudioFileClip(path)
-            
-            # 1. NORMALIZE (Equalize volume across different files)
-            try:
-                clip = clip.fx(audio_normalize)
-            except Exception: pass # Fallback if normalization fails
+            # 1. LOAD + NORMALIZE (Equalize volume across different files)
+            clip = self._load(path)
 
             # 2. APPLY MIXING RULES (Adjust relative to normalized 0dB)
             if name == 'whoosh': volume *= 0.15      # Reduced for normalized audio
@@ -73,6 +80,43 @@ class SFXManager:
             print(f"⚠️ SFX Load Error ({name}): {e}")
             return None
 
+    def _normalize(self, clip):
+        try:
+            return clip.fx(audio_normalize)
+        except Exception:
+            return clip # Fallback if normalization fails
+
+    def _load(self, path):
+        if not self.cache_decoded:
+            return self._normalize(AudioFileClip(path))
+
+        with self._lock:
+            clip = self._decoded.get(path)
+            if clip is None:
+                src = AudioFileClip(path)
+                try:
+                    clip = AudioArrayClip(src.to_soundarray(fps=src.fps), fps=src.fps)
+                finally:
+                    src.close()
+                clip = self._normalize(clip)
+                self._decoded[path] = clip
+        # set_start()/volumex() return copies, so the cached clip is never mutated
+        return clip
+
+    def preload(self):
+        """Decodes every known SFX file up front (daemon warm-up)."""
+        if not self.cache_decoded:
+            return 0
+        for asset in self.assets.values():
+            for filename in (asset if isinstance(asset, list) else [asset]):
+                path = os.path.join(self.config_dir, filename)
+                if os.path.exists(path):
+                    try:
+                        self._load(path)
+                    except Exception as e:
+                        print(f"⚠️ SFX preload failed ({filename}): {e}")
+        return len(self._decoded)
+
     def generate_quiz_sfx(self, timings):
         """
         Generates the standard SFX layer for a Quiz.
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+File: shared_assets.py
+Reference counts and download locks for files several rows share.
+
+Rows that point at the same chapter PDF or the same Drive video get the same
+download path (see main_shorts_generator.read_row_job). A row group retains
+its paths before the first row starts; each row's cleanup releases them and
+only the last release lets the file (and its transcript cache) be deleted.
+Per-path locks stop two threads from downloading the same file at once.
+"""
+
+import threading
+import collections
+
+class SharedAssets:
+    """
+    Usage:
+        assets = SharedAssets()
+        assets.retain([pdf_path, vid_path])       # once per row that will use them
+        with assets.path_lock(vid_path):
+            ...download if missing...
+        if assets.release(vid_path): os.remove(vid_path)
+    """
+
+    def __init__(self):
+        self.refs = collections.Counter()
+        self.locks = {}
+        self._lock = threading.Lock()
+
+    def retain(self, paths):
+        with self._lock:
+            for p in paths:
+                self.refs[p] += 1
+
+    def release(self, path):
+        """
+        Drops one reference.
+
+        Returns:
+            bool: True if this was the last reference (caller may delete it);
+                False while others hold it, or if it was never retained
+        """
+        with self._lock:
+            count = self.refs.get(path, 0)
+            if count == 0:
+                return False
+            if count > 1:
+                self.refs[path] = count - 1
+                return False
+            del self.refs[path]
+            return True
+
+    def is_held(self, path):
+        with self._lock:
+            return self.refs.get(path, 0) > 0
+
+    def held_paths(self):
+        with self._lock:
+            return list(self.refs)
+
+    def clear(self):
+        with self._lock:
+            self.refs.clear()
+
+    def path_lock(self, path):
+        with self._lock:
+            lock = self.locks.get(path)
+            if lock is None:
+                lock = self.locks[path] = threading.Lock()
+            return lock
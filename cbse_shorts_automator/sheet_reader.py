@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+File: sheet_reader.py
+Column-projected, incremental reads of the generator sheet.
+
+Instead of pulling A:{last_col} for every row, the reader:
+1. Fetches only the filter columns (status, filter, ID, video) with one batchGet.
+2. Decides eligibility from that projection.
+3. Pulls full rows only for eligible rows whose projection changed since the
+   last run (or whose cached copy is older than SNAPSHOT_MAX_AGE_SEC),
+   merged into as few A{n}:{last}{m} ranges as possible.
+The projection and the full eligible rows are cached in a local snapshot file.
+"""
+
+import os
+import json
+import time
+
+def col_letter(n):
+    """Converts 0-based index to A, B, ... AA, AB format"""
+    s = ""
+    while n >= 0:
+        s = chr(n % 26 + 65) + s
+        n = n // 26 - 1
+    return s
+
+def _merge_row_spans(row_nums):
+    """[3,4,5,9,10] -> [(3,5), (9,10)]"""
+    spans = []
+    for n in sorted(row_nums):
+        if spans and n == spans[-1][1] + 1:
+            spans[-1][1] = n
+        else:
+            spans.append([n, n])
+    return [tuple(s) for s in spans]
+
+class ProjectedSheetReader:
+    """
+    Usage:
+        reader = ProjectedSheetReader(sheets, SPREADSHEET_ID, "Sheet1",
+                                      filter_cols={'status': 39, 'id': 13, ...}, last_col_idx=45)
+        rows = reader.read_eligible(lambda proj: proj['status'] == 'not generated', limit=10)
+    """
+
+    def __init__(self, sheets, spreadsheet_id, sheet_name, filter_cols, last_col_idx,
+                 snapshot_path='data/sheet_snapshot.json', max_age_sec=6 * 3600, header_rows=1):
+        """
+        Args:
+            sheets: Sheets API service
+            spreadsheet_id: Spreadsheet to read
+            sheet_name: Tab name
+            filter_cols: {name: 0-based column index} used for eligibility
+            last_col_idx: Last column (0-based) needed in a full row
+            snapshot_path: Local cache of the previous read
+            max_age_sec: Re-read a cached full row after this long even if unchanged
+            header_rows: Rows to skip at the top
+        """
+        self.sheets = sheets
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_name = sheet_name
+        self.filter_cols = dict(filter_cols)
+        self.last_col_idx = last_col_idx
+        self.snapshot_path = snapshot_path
+        self.max_age_sec = max_age_sec
+        self.header_rows = header_rows
+        self.stats = {}
+
+    # ------------------------------------------------------------------
+    # Snapshot
+    # ------------------------------------------------------------------
+    def _snapshot_key(self):
+        return f"{self.spreadsheet_id}/{self.sheet_name}"
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return {}
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        entry = data.get(self._snapshot_key(), {})
+        # Column mapping changed -> cached projections are meaningless
+        if entry.get('filter_cols') != self.filter_cols or entry.get('last_col_idx') != self.last_col_idx:
+            return {}
+        return entry.get('rows', {})
+
+    def _save_snapshot(self, rows):
+        data = {}
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+        data[self._snapshot_key()] = {
+            'filter_cols': self.filter_cols,
+            'last_col_idx': self.last_col_idx,
+            'saved_at': time.time(),
+            'rows': rows
+        }
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.snapshot_path)
+
+    # ------------------------------------------------------------------
+    # API reads
+    # ------------------------------------------------------------------
+    def read_projection(self):
+        """
+        Returns:
+            dict: {row_num: {name: value}} for every data row (1-based sheet rows)
+        """
+        names = list(self.filter_cols.keys())
+        first = self.header_rows + 1
+        ranges = [f"{self.sheet_name}!{col_letter(self.filter_cols[n])}{first}:{col_letter(self.filter_cols[n])}"
+                  for n in names]
+        res = self.sheets.spreadsheets().values().batchGet(
+            spreadsheetId=self.spreadsheet_id, ranges=ranges, majorDimension='COLUMNS'
+        ).execute()
+
+        columns = {}
+        for name, vr in zip(names, res.get('valueRanges', [])):
+            values = vr.get('values', [])
+            columns[name] = values[0] if values else []
+
+        n_rows = max((len(c) for c in columns.values()), default=0)
+        projection = {}
+        for i in range(n_rows):
+            proj = {}
+            for name in names:
+                col = columns.get(name, [])
+                proj[name] = str(col[i]).strip() if i < len(col) else ""
+            projection[first + i] = proj
+        return projection
+
+    def read_rows(self, row_nums):
+        """
+        Fetches full rows (A..last_col) for the given sheet row numbers.
+
+        Returns:
+            dict: {row_num: [values]}
+        """
+        if not row_nums:
+            return {}
+        last = col_letter(self.last_col_idx)
+        spans = _merge_row_spans(row_nums)
+        ranges = [f"{self.sheet_name}!A{a}:{last}{b}" for a, b in spans]
+        res = self.sheets.spreadsheets().values().batchGet(
+            spreadsheetId=self.spreadsheet_id, ranges=ranges
+        ).execute()
+
+        wanted = set(row_nums)
+        rows = {}
+        for (a, b), vr in zip(spans, res.get('valueRanges', [])):
+            values = vr.get('values', [])
+            for offset, n in enumerate(range(a, b + 1)):
+                if n in wanted:
+                    rows[n] = values[offset] if offset < len(values) else []
+        return rows
+
+    # ------------------------------------------------------------------
+    # Main entry
+    # ------------------------------------------------------------------
+    def read_eligible(self, is_eligible, limit=None):
+        """
+        Args:
+            is_eligible: Callable(projection_dict) -> bool
+            limit: Max rows to return (sheet order)
+
+        Returns:
+            list: [(row_num, row_values), ...]
+        """
+        projection = self.read_projection()
+        cached = self._load_snapshot()
+        now = time.time()
+
+        eligible = [n for n in sorted(projection) if is_eligible(projection[n])]
+        if limit is not None:
+            eligible = eligible[:limit]
+
+        to_fetch = []
+        rows = {}
+        for n in eligible:
+            entry = cached.get(str(n))
+            fresh = (entry and entry.get('proj') == projection[n] and entry.get('row') is not None
+                     and now - entry.get('fetched_at', 0) < self.max_age_sec)
+            if fresh:
+                rows[n] = entry['row']
+            else:
+                to_fetch.append(n)
+
+        fetched = self.read_rows(to_fetch)
+        rows.update(fetched)
+
+        # Keep projections for every row, full rows only for the eligible ones
+        new_snapshot = {}
+        for n, proj in projection.items():
+            entry = {'proj': proj}
+            if n in fetched:
+                entry.update(row=fetched[n], fetched_at=now)
+            elif n in rows:
+                old = cached.get(str(n), {})
+                entry.update(row=old.get('row'), fetched_at=old.get('fetched_at', now))
+            new_snapshot[str(n)] = entry
+        self._save_snapshot(new_snapshot)
+
+        self.stats = {'scanned': len(projection), 'eligible': len(eligible),
+                      'fetched': len(fetched), 'from_cache': len(eligible) - len(fetched)}
+        return [(n, rows.get(n, [])) for n in eligible]
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+File: sheet_writer.py
+Write-behind buffer for Google Sheets cell updates.
+
+All pending writes (status, AR:AT metadata, voice column...) are merged into a
+single spreadsheets().values().batchUpdate call, flushed when MAX_PENDING
+ranges are queued, when the oldest write is MAX_DELAY_SEC old, or on close().
+
+Durability: every write is appended (and fsync'ed) to a local journal before
+it is buffered. The journal is only compacted after a successful batchUpdate,
+and any entries left over from a crashed run are replayed on the next start.
+"""
+
+import os
+import json
+import time
+import threading
+
+def split_journal(src_path, routes):
+    """
+    Moves the entries of a shared journal into per-channel journals (switching
+    to CHANNEL_PROFILES changes the journal path); entries no route claims stay
+    in src_path, which is removed once empty.
+
+    Args:
+        routes: [(journal_path, spreadsheet_id, sheet_name)]; the first route whose
+                spreadsheet and tab match an entry's range takes it
+
+    Returns:
+        int: Entries moved
+    """
+    if not os.path.exists(src_path):
+        return 0
+    moved, kept = {}, []
+    with open(src_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Torn last line from a crash mid-append
+            rng = entry.get('range', '')
+            tab = rng.split('!', 1)[0].strip("'") if '!' in rng else None
+            dest = next((path for path, spreadsheet_id, sheet_name in routes
+                         if entry.get('spreadsheet_id') == spreadsheet_id and tab in (None, sheet_name)), None)
+            if dest is None or os.path.abspath(dest) == os.path.abspath(src_path):
+                kept.append(line)
+            else:
+                moved.setdefault(dest, []).append(line)
+    if not moved:
+        return 0
+
+    # Append first: a crash in between replays an entry twice, never loses it
+    for dest, lines in moved.items():
+        os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+        with open(dest, 'a') as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    if kept:
+        tmp = src_path + ".tmp"
+        with open(tmp, 'w') as f:
+            f.write("\n".join(kept) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, src_path)
+    else:
+        os.remove(src_path)
+    count = sum(len(lines) for lines in moved.values())
+    print(f"♻️ Moved {count} unflushed sheet write(s) from {src_path} to the channel journals")
+    return count
+
+class SheetWriteBuffer:
+    """
+    Usage:
+        writer = SheetWriteBuffer(sheets, CONFIG['SPREADSHEET_ID'])
+        writer.write("Sheet1!AN12", [["generated"]])
+        ...
+        writer.close()   # final flush
+    """
+
+    def __init__(self, sheets, spreadsheet_id, journal_path='data/sheet_write_journal.jsonl',
+                 max_pending=20, max_delay_sec=30, retries=3, retry_delay=3,
+                 value_input_option='USER_ENTERED'):
+        """
+        Args:
+            sheets: Sheets API service (googleapiclient build('sheets', 'v4'))
+            spreadsheet_id: Target spreadsheet
+            journal_path: Append-only journal of not-yet-confirmed writes
+            max_pending: Flush once this many distinct ranges are queued
+            max_delay_sec: Flush once the oldest queued write is this old
+            retries: batchUpdate attempts per flush
+            retry_delay: Seconds between attempts
+        """
+        self.sheets = sheets
+        self.spreadsheet_id = spreadsheet_id
+        self.journal_path = journal_path
+        self.max_pending = max_pending
+        self.max_delay_sec = max_delay_sec
+        self.retries = max(1, retries)
+        self.retry_delay = retry_delay
+        self.value_input_option = value_input_option
+
+        # range -> (seq, values); a later write to the same range replaces the earlier one
+        self.pending = {}
+        self.oldest_ts = None
+        self.seq = 0
+        # Journal lines of other spreadsheets: carried over on every rewrite, never sent from here
+        self.foreign = []
+        self.lock = threading.RLock()
+        self.flush_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(journal_path) or '.', exist_ok=True)
+        self._replay_journal()
+
+        self._stop = threading.Event()
+        self._timer = threading.Thread(target=self._timer_loop, name="sheet-write-behind", daemon=True)
+        self._timer.start()
+
+    # ------------------------------------------------------------------
+    # Journal
+    # ------------------------------------------------------------------
+    def _append_journal(self, entry):
+        with open(self.journal_path, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_journal(self):
+        """Compacts the journal down to the writes that are still unconfirmed."""
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, 'w') as f:
+            for line in self.foreign:
+                f.write(line + "\n")
+            for rng, (seq, values) in sorted(self.pending.items(), key=lambda kv: kv[1][0]):
+                f.write(json.dumps({'spreadsheet_id': self.spreadsheet_id, 'seq': seq,
+                                    'range': rng, 'values': values}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.journal_path)
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        recovered = 0
+        with open(self.journal_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line from a crash mid-append
+                if entry.get('spreadsheet_id') != self.spreadsheet_id:
+                    self.foreign.append(line)
+                    continue
+                self.seq = max(self.seq, entry.get('seq', 0))
+                self.pending[entry['range']] = (entry.get('seq', 0), entry['values'])
+                recovered += 1
+
+        if self.foreign:
+            print(f"⚠️ Sheet journal holds {len(self.foreign)} write(s) for another spreadsheet; leaving them untouched")
+        if recovered:
+            print(f"♻️ Replaying {len(self.pending)} unflushed sheet write(s) from {self.journal_path}")
+            self.oldest_ts = time.time()
+            self.flush()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def write(self, range_a1, values):
+        """
+        Queues one range update (A1 notation, 2D values list).
+        Flushes immediately when the size threshold is reached.
+        """
+        with self.lock:
+            self.seq += 1
+            entry = {'spreadsheet_id': self.spreadsheet_id, 'seq': self.seq,
+                     'range': range_a1, 'values': values}
+            self._append_journal(entry)
+            self.pending[range_a1] = (self.seq, values)
+            if self.oldest_ts is None:
+                self.oldest_ts = time.time()
+            should_flush = len(self.pending) >= self.max_pending
+
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """
+        Sends every pending write in one batchUpdate.
+
+        Returns:
+            bool: True if nothing is left pending
+        """
+        with self.flush_lock:
+            with self.lock:
+                if not self.pending:
+                    return True
+                batch = dict(self.pending)
+
+            body = {
+                'valueInputOption': self.value_input_option,
+                'data': [{'range': rng, 'values': values}
+                         for rng, (seq, values) in sorted(batch.items(), key=lambda kv: kv[1][0])]
+            }
+
+            for attempt in range(self.retries):
+                try:
+                    if attempt > 0:
+                        time.sleep(self.retry_delay)
+                    self.sheets.spreadsheets().values().batchUpdate(
+                        spreadsheetId=self.spreadsheet_id, body=body
+                    ).execute()
+                    break
+                except Exception as e:
+                    print(f"⚠️ Sheet batchUpdate failed ({attempt+1}/{self.retries}): {e}")
+            else:
+                # Still journaled; the next flush (or next run) retries
+                return False
+
+            with self.lock:
+                # Drop only what was sent; newer writes to the same range stay queued
+                for rng, (seq, _) in batch.items():
+                    current = self.pending.get(rng)
+                    if current and current[0] == seq:
+                        del self.pending[rng]
+                self.oldest_ts = time.time() if self.pending else None
+                self._rewrite_journal()
+            print(f"   📤 Sheet: flushed {len(batch)} range(s) in one batchUpdate")
+            return not self.pending
+
+    def _timer_loop(self):
+        while not self._stop.wait(1.0):
+            with self.lock:
+                due = self.oldest_ts is not None and time.time() - self.oldest_ts >= self.max_delay_sec
+            if due:
+                self.flush()
+
+    def close(self):
+        """Stops the timer and flushes whatever is still pending."""
+        self._stop.set()
+        self._timer.join(timeout=5)
+        if not self.flush():
+            print(f"⚠️ {len(self.pending)} sheet write(s) kept in {self.journal_path} for the next run")
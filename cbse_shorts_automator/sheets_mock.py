@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+File: sheets_mock.py
+Local stand-in for the Google Sheets v4 values API.
+
+Implements the subset the generator uses:
+    spreadsheets().values().get / update / batchGet / batchUpdate (...).execute()
+on an in-memory grid. With a backing JSON file, every call re-reads and
+writes the file under an exclusive lock, so several generator processes
+(e.g. lease-claiming "nodes") can share one fake sheet.
+
+Usage:
+    sheets = MockSheetsService(path="data/mock_sheet.json")
+    main_shorts_generator.main(["--mock-sheet", "data/mock_sheet.json"])
+"""
+
+import os
+import re
+import json
+import time
+import random
+import threading
+
+_A1 = re.compile(r"^(?:(?P<sheet>'[^']+'|[^!]+)!)?(?P<c1>[A-Z]+)?(?P<r1>\d+)?(?::(?P<c2>[A-Z]+)?(?P<r2>\d+)?)?$")
+
+def _col_index(letters):
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n - 1
+
+def parse_a1(range_a1):
+    """
+    'Sheet1!B2:D5' -> ('Sheet1', row0, col0, row1, col1) with 0-based inclusive bounds.
+    Open ends (e.g. 'A:AT', 'AN2:AN') come back as None.
+    """
+    m = _A1.match(range_a1.strip())
+    if not m:
+        raise ValueError(f"Unsupported A1 range: {range_a1}")
+    sheet = (m.group('sheet') or 'Sheet1').strip("'")
+    c1 = _col_index(m.group('c1')) if m.group('c1') else 0
+    r1 = int(m.group('r1')) - 1 if m.group('r1') else 0
+    if m.group('c2') is None and m.group('r2') is None and ':' not in range_a1:
+        return sheet, r1, c1, r1, c1  # Single cell
+    c2 = _col_index(m.group('c2')) if m.group('c2') else None
+    r2 = int(m.group('r2')) - 1 if m.group('r2') else None
+    return sheet, r1, c1, r2, c2
+
+class _Request:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self):
+        return self._fn()
+
+class _Values:
+    def __init__(self, service):
+        self.s = service
+
+    def get(self, spreadsheetId, range, majorDimension='ROWS', **kwargs):
+        return _Request(lambda: self.s._get(range, majorDimension))
+
+    def batchGet(self, spreadsheetId, ranges, majorDimension='ROWS', **kwargs):
+        return _Request(lambda: {'spreadsheetId': spreadsheetId,
+                                 'valueRanges': [self.s._get(r, majorDimension) for r in ranges]})
+
+    def update(self, spreadsheetId, range, body, valueInputOption='RAW', **kwargs):
+        return _Request(lambda: self.s._update([(range, body.get('values', []))]))
+
+    def batchUpdate(self, spreadsheetId, body, **kwargs):
+        data = [(d['range'], d.get('values', [])) for d in body.get('data', [])]
+        return _Request(lambda: self.s._update(data))
+
+class _Spreadsheets:
+    def __init__(self, service):
+        self._values = _Values(service)
+
+    def values(self):
+        return self._values
+
+class MockSheetsService:
+    """
+    In-memory (optionally file-backed) fake of build('sheets', 'v4').
+
+    Args:
+        grid: Initial rows for the default tab ({'Sheet1': [[...], ...]} or a plain list)
+        path: Optional JSON file to persist/share the grid
+        latency: (min, max) seconds of simulated network delay per call
+    """
+
+    def __init__(self, grid=None, path=None, latency=(0.0, 0.0)):
+        self.path = path
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = []
+        if isinstance(grid, list):
+            grid = {'Sheet1': grid}
+        self.tabs = grid or {}
+        if path and os.path.exists(path) and grid is None:
+            self.tabs = self._read_file()
+        elif path:
+            self._write_file()
+
+    def spreadsheets(self):
+        return _Spreadsheets(self)
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+    def _read_file(self):
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {'Sheet1': data}
+
+    def _write_file(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.tabs, f)
+        os.replace(tmp, self.path)
+
+    def _locked(self, fn, write):
+        if self.latency[1] > 0:
+            time.sleep(random.uniform(*self.latency))
+        with self.lock:
+            if not self.path:
+                return fn()
+            import fcntl
+            with open(self.path + ".lock", 'w') as lf:
+                fcntl.flock(lf, fcntl.LOCK_EX)
+                try:
+                    self.tabs = self._read_file()
+                    result = fn()
+                    if write:
+                        self._write_file()
+                    return result
+                finally:
+                    fcntl.flock(lf, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # Operations
+    # ------------------------------------------------------------------
+    def _get(self, range_a1, major='ROWS'):
+        def op():
+            self.calls.append(('get', range_a1))
+            sheet, r1, c1, r2, c2 = parse_a1(range_a1)
+            rows = self.tabs.get(sheet, [])
+            last_row = len(rows) - 1 if r2 is None else min(r2, len(rows) - 1)
+            out = []
+            for r in range(r1, last_row + 1):
+                row = rows[r]
+                end = len(row) - 1 if c2 is None else min(c2, len(row) - 1)
+                out.append([str(v) for v in row[c1:end + 1]])
+            # Sheets trims trailing empty cells/rows
+            out = [self._rstrip(r) for r in out]
+            while out and not out[-1]:
+                out.pop()
+            if major == 'COLUMNS':
+                width = max((len(r) for r in out), default=0)
+                cols = [[r[i] if i < len(r) else "" for r in out] for i in range(width)]
+                out = [self._rstrip(c) for c in cols]
+            return {'range': range_a1, 'majorDimension': major, 'values': out} if out else \
+                   {'range': range_a1, 'majorDimension': major}
+        return self._locked(op, write=False)
+
+    @staticmethod
+    def _rstrip(values):
+        values = list(values)
+        while values and values[-1] in ("", None):
+            values.pop()
+        return values
+
+    def _update(self, data):
+        def op():
+            cells = 0
+            for range_a1, values in data:
+                self.calls.append(('update', range_a1))
+                sheet, r1, c1, _, _ = parse_a1(range_a1)
+                rows = self.tabs.setdefault(sheet, [])
+                for dr, vals in enumerate(values):
+                    r = r1 + dr
+                    while len(rows) <= r:
+                        rows.append([])
+                    row = rows[r]
+                    for dc, v in enumerate(vals):
+                        c = c1 + dc
+                        while len(row) <= c:
+                            row.append("")
+                        row[c] = v
+                        cells += 1
+            return {'totalUpdatedCells': cells}
+        return self._locked(op, write=True)
+
+    def cell(self, sheet, row_num, col_idx):
+        """Test helper: value at 1-based row, 0-based column."""
+        rows = self.tabs.get(sheet, [])
+        if row_num - 1 < len(rows) and col_idx < len(rows[row_num - 1]):
+            return rows[row_num - 1][col_idx]
+        return ""
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+File: shorts_config.py
+Per-short random configuration (template, theme, voice, styles).
+Kept free of moviepy/whisper imports so the scheduler and --plan can use it
+without loading the media stack; shorts_engine re-exports both names.
+"""
+
+import random
+from voice_config import get_random_google_voice, get_random_edge_voice
+
+# Theme configurations
+THEMES = {
+    'energetic_yellow': {
+        'bg_color': (15, 23, 42), 'highlight': '#FACC15', 'correct': '#22C55E', 'name': 'Energetic Yellow',
+        'music_mood': 'energetic'
+    },
+    'calm_blue': {
+        'bg_color': (13, 27, 42), 'highlight': '#38BDF8', 'correct': '#34D399', 'name': 'Calm Blue',
+        'music_mood': 'calm'
+    },
+    'vibrant_purple': {
+        'bg_color': (24, 7, 45), 'highlight': '#E879F9', 'correct': '#A78BFA', 'name': 'Vibrant Purple',
+        'music_mood': 'funky'
+    },
+    'fresh_green': {
+        'bg_color': (7, 36, 19), 'highlight': '#84CC16', 'correct': '#4ADE80', 'name': 'Fresh Green',
+        'music_mood': 'calm'
+    },
+    'classic_red': {
+        'bg_color': (28, 25, 23), 'highlight': '#FB923C', 'correct': '#F87171', 'name': 'Classic Red',
+        'music_mood': 'energetic'
+    }
+}
+
+def random_voice_name():
+    """Same pick as VoiceManager.get_random_voice_name(), without importing the TTS engines."""
+    try:
+        return get_random_google_voice()
+    except Exception:
+        return get_random_edge_voice()
+
+def generate_random_config(class_level=None, template=None):
+    """template: pre-assigned by the scheduler (render-time prediction); random otherwise"""
+    templates = ['quiz', 'fact', 'tip']
+    themes = list(THEMES.keys())
+    opening_styles = ['countdown', 'montage', 'mystery']
+    
+    config = {
+        'template': template or random.choice(templates),
+        'voice': random_voice_name(),
+        'theme': random.choice(themes),
+        'cta_style': random.choice(['persistent', 'bookend', 'both']),
+        'opening_style': random.choice(opening_styles),
+        'class_level': class_level or random.randint(6, 12),
+        'retention_strategy': random.choice(['cliffhanger', 'teaser', 'curiosity'])
+    }
+    return config
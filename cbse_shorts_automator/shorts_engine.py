@@ -11,6 +11,7 @@ import json
 import random
 import textwrap
 import glob
+import concurrent.futures
 from moviepy.editor import (
     VideoFileClip, TextClip, CompositeVideoClip, 
     AudioFileClip, ColorClip, CompositeAudioClip,
@@ -19,38 +20,24 @@ from moviepy.editor import (
 
 from moviepy.audio.fx.all import audio_normalize
 from voice_manager import VoiceManager
+from sfx_manager import SFXManager
 from effects_manager import EffectsManager 
 from visual_effects_quiz import FPS
-
-# Theme configurations
-THEMES = {
-    'energetic_yellow': {
-        'bg_color': (15, 23, 42), 'highlight': '#FACC15', 'correct': '#22C55E', 'name': 'Energetic Yellow',
-        'music_mood': 'energetic'
-    },
-    'calm_blue': {
-        'bg_color': (13, 27, 42), 'highlight': '#38BDF8', 'correct': '#34D399', 'name': 'Calm Blue',
-        'music_mood': 'calm'
-    },
-    'vibrant_purple': {
-        'bg_color': (24, 7, 45), 'highlight': '#E879F9', 'correct': '#A78BFA', 'name': 'Vibrant Purple',
-        'music_mood': 'funky'
-    },
-    'fresh_green': {
-        'bg_color': (7, 36, 19), 'highlight': '#84CC16', 'correct': '#4ADE80', 'name': 'Fresh Green',
-        'music_mood': 'calm'
-    },
-    'classic_red': {
-        'bg_color': (28, 25, 23), 'highlight': '#FB923C', 'correct': '#F87171', 'name': 'Classic Red',
-        'music_mood': 'energetic'
-    }
-}
+from stage_timeout import wait_futures
+from resource_scope import ResourceScope
+# Light config helpers live in shorts_config (importable without moviepy); re-exported here
+from shorts_config import THEMES, generate_random_config
 
 FONT_REGULAR = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
 FONT_BOLD = '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'
 WIDTH = 1080
 HEIGHT = 1920
 
+# Size estimates that decide whether an intermediate goes to the RAM scratch tier
+VOICE_TRACK_BYTES = 1 << 20          # one TTS segment
+AUDIO_BYTES_PER_SEC = 32 * 1024      # mixed aac/mp3 at 128-256 kbps
+VIDEO_BYTES_PER_SEC = 1 << 20        # 1080x1920 libx264 source clip
+
 class ShortsEngine:
     def __init__(self, config_path='config/generator_config.json'):
         if not os.path.exists('config'): os.makedirs('config')
@@ -69,6 +56,8 @@ class ShortsEngine:
         self.logo_path = 'config/logo.png'
         
         self.music_dir = 'config/music'
+        # Channel profiles switch these per render (apply_branding)
+        self.default_branding = {'channel_name': self.channel_name, 'logo_path': self.logo_path, 'music_dir': self.music_dir}
         if not os.path.exists(self.music_dir):
             os.makedirs(self.music_dir)
             for mood in ['energetic', 'calm', 'funky']:
@@ -78,11 +67,136 @@ class ShortsEngine:
         self.fx_manager = EffectsManager()
 
         self.voice_manager = VoiceManager()
+        
+        # One SFX manager per engine; decoded clips are reused across shorts
+        self.sfx_manager = SFXManager(cache_decoded=True)
 
         import moviepy.config as mpconf
         temp_dir = self.config['DIRS']['TEMP']
         os.makedirs(temp_dir, exist_ok=True)
-        mpconf.TEMP_DIR = temp_dir 
+
+        # Scratch index: temp files are registered per short and released by owner, not by glob
+        scratch_cfg = self.config.get('SCRATCH', {})
+        self.scratch = None
+        from video_processor import VideoProcessor
+        if scratch_cfg.get('ENABLED', True):
+            from scratch_space import ScratchSpace
+            self.scratch = ScratchSpace.from_config(temp_dir, scratch_cfg)
+            VideoProcessor.scratch = self.scratch
+            if self.scratch.ram_dir: print(f"   ⚡ RAM scratch tier: {self.scratch.ram_dir}")
+        mpconf.TEMP_DIR = (self.scratch and self.scratch.ram_dir) or temp_dir
+        # Remotion public files per short (vid_id -> paths), oldest first; each short has its own
+        # paths, so concurrent workers never overwrite each other's scenario
+        self.public_assets = {}
+        self.keep_public_shorts = max(1, scratch_cfg.get('KEEP_PUBLIC_SHORTS', 4))
+
+        # Content-addressed store: TTS segments and transcripts are reused whenever their inputs repeat
+        artifacts_cfg = self.config.get('ARTIFACTS', {})
+        self.artifacts = None
+        if artifacts_cfg.get('ENABLED', True):
+            from artifact_store import ArtifactStore
+            self.artifacts = ArtifactStore(artifacts_cfg.get('ROOT', 'data/artifacts'))
+            VideoProcessor.artifacts = self.artifacts
+
+        # Slide OCR (VIDEO_PROCESSING.ENABLE_OCR): keywords also match on-screen text, one OCR per slide
+        from slide_ocr import SlideOCR
+        VideoProcessor.slide_ocr = SlideOCR.from_config(self.config.get('VIDEO_PROCESSING', {}))
+
+    def synthesize_track(self, text, path, voice_key, provider='google'):
+        """
+        Writes one TTS segment to path. The same text, voice and provider are served
+        from the artifact store instead of calling TTS again.
+        
+        Returns:
+            str: Voice system used (also left in voice_manager.last_used_system)
+        """
+        key = self.artifacts.key('tts', text=text, voice=voice_key, provider=provider) if self.artifacts else None
+        meta = self.artifacts.fetch(key, path) if key else None
+        if meta is not None:
+            self.voice_manager.last_used_system = meta.get('system')
+            return meta.get('system')
+        
+        clip = self.voice_manager.generate_audio_with_specific_voice(text, path, voice_key, provider=provider)
+        if clip is not None: clip.close()
+        system = self.voice_manager.last_used_system
+        # A fallback voice (Google quota spent -> Edge) is not what the key asked for; don't cache it
+        if key and system and (not provider or system.lower().startswith(provider.lower())):
+            self.artifacts.save(key, path, stage='tts', meta={'system': system})
+        return system
+
+    def temp_path(self, name, expected_bytes=0):
+        """Path for an intermediate: RAM tier when enabled and it fits, else DIRS['TEMP']."""
+        if self.scratch: return self.scratch.place(name, expected_bytes)
+        return os.path.join(self.config['DIRS']['TEMP'], name)
+
+    def write_public_asset(self, public_path, vid_id, write, expected_bytes=0):
+        """
+        Produces an asset the Remotion project reads from public_path. With room on
+        the RAM tier, write(path) targets tmpfs and public_path becomes a symlink
+        to it; otherwise write(public_path) writes in place.
+
+        public_path is per short (named by vid_id). This engine keeps the public
+        files of its last KEEP_PUBLIC_SHORTS shorts for their Remotion renders;
+        the first asset of a newer short frees the oldest.
+        """
+        os.makedirs(os.path.dirname(public_path), exist_ok=True)
+        if vid_id not in self.public_assets:
+            while len(self.public_assets) >= self.keep_public_shorts:
+                self.release_public_assets(next(iter(self.public_assets)))
+            self.public_assets[vid_id] = []
+        if public_path not in self.public_assets[vid_id]:
+            self.public_assets[vid_id].append(public_path)
+        ram = self.scratch.ram_path(f"{vid_id}_{os.path.basename(public_path)}", expected_bytes) if self.scratch else None
+        if ram:
+            try:
+                write(ram)
+            except OSError as e:
+                print(f"   ⚠️ RAM tier write failed ({e}); writing to disk")
+                if os.path.exists(ram): os.remove(ram)
+                ram = None
+        if not ram:
+            # Never write through a link left by an earlier run
+            if os.path.islink(public_path): os.remove(public_path)
+            write(public_path)
+            return public_path
+        # Not held: Remotion reads it after the row is done; freed with the short's other
+        # public files (release_public_assets) or by LRU eviction
+        self.scratch.register(ram, f"assets:{vid_id}", hold=False)
+        link = public_path + ".link"
+        if os.path.lexists(link): os.remove(link)
+        os.symlink(os.path.abspath(ram), link)
+        os.replace(link, public_path)
+        return public_path
+
+    def release_public_assets(self, vid_id):
+        """Deletes the Remotion public files of short vid_id and their RAM copies (call once its render is done)."""
+        if self.scratch: self.scratch.release_owner(f"assets:{vid_id}")
+        for path in self.public_assets.pop(vid_id, []):
+            if os.path.lexists(path): os.remove(path)
+
+    def track_temp_file(self, path, vid_id):
+        """Registers an intermediate of short vid_id (call once the file is written, again after it grows)."""
+        if self.scratch: self.scratch.register(path, vid_id)
+        return path
+
+    def release_temp_files(self, vid_id, audio_files=(), keep=False):
+        """
+        Deletes the intermediates of short vid_id.
+        keep=True leaves them on disk for a resumed attempt; they become evictable.
+        """
+        if self.scratch:
+            if keep: self.scratch.unhold(vid_id)
+            else: self.scratch.release_owner(vid_id)
+            return
+        if keep: return
+        # No index: fall back to matching file names
+        temp_dir = self.config['DIRS']['TEMP']
+        for f in audio_files:
+            if os.path.exists(f): os.remove(f)
+        for pattern in [f'{temp_dir}/{vid_id}*', f'{vid_id}*TEMP_*']:
+            for temp_file in glob.glob(pattern):
+                try: os.remove(temp_file)
+                except OSError: pass
 
     def get_theme(self, theme_name='energetic_yellow'):
         return THEMES.get(theme_name, THEMES['energetic_yellow'])
@@ -110,14 +224,25 @@ class ShortsEngine:
         # and just render the raw clip directly.
         
         print(f"🎬 Rendering final video to: {output_path}")
-        video_clip.write_videofile(
-            output_path,
-            fps=FPS,
-            codec='libx264',
-            audio_codec='aac',
-            threads=4,
-            preset='ultrafast' # Keeps the speed gain
-        )
+        # moviepy's temp audio goes to the scratch dir (default: cwd), owned by this short
+        vid_id = os.path.basename(output_path).split('.')[0]
+        # Registered up front so a crashed render's file is still owned; re-measured once written
+        temp_audio = self.track_temp_file(self.temp_path(f"{vid_id}_TEMP_MPY_wvf_snd.m4a", AUDIO_BYTES_PER_SEC * video_clip.duration), vid_id)
+        try:
+            video_clip.write_videofile(
+                output_path,
+                temp_audiofile=temp_audio,
+                fps=FPS,
+                codec='libx264',
+                audio_codec='aac',
+                threads=4,
+                preset='ultrafast' # Keeps the speed gain
+            )
+        finally:
+            if self.scratch:
+                # moviepy deletes it after a successful mux; otherwise record its real size
+                if os.path.exists(temp_audio): self.track_temp_file(temp_audio, vid_id)
+                else: self.scratch.forget(temp_audio)
 
     def create_outro(self, duration, cta_text="SUBSCRIBE FOR MORE!"):
         bg_color = (255, 255, 255) 
@@ -504,33 +629,68 @@ class ShortsEngine:
         if not hasattr(clip, 'duration') or not clip.duration: return clip
         return clip.resize(lambda t: 1.0 + (zoom_factor - 1.0) * (t / clip.duration))
 
+    def get_template(self, t_type):
+        #if t_type == 'quiz': from template_quiz import QuizTemplate; return QuizTemplate(self)
+        if t_type == 'quiz': from template_quiz_json_generator import QuizTemplate; return QuizTemplate(self)
+        elif t_type == 'fact': from template_fact import FactTemplate; return FactTemplate(self)
+        elif t_type == 'tip': from template_tip import TipTemplate; return TipTemplate(self)
+        else: raise ValueError(f"Unknown template: {t_type}")
+
+    def synthesize_voice_tracks(self, script, config, output_path, max_workers=5, existing=None, on_track=None):
+        """
+        Pre-renders every voice track the template needs, using the same paths and
+        voice the template would use. Passing the result as config['voice_tracks']
+        lets generate_short skip TTS entirely (used by the staged pipeline).
+        
+        Args:
+            existing: {key: mp3_path} finished by an earlier attempt; reused if the file is still there
+            on_track: Optional callback(key, mp3_path) after each newly synthesized track
+        
+        Returns:
+            tuple: (tracks: {key: mp3_path}, voice_system: str or None)
+        """
+        template = self.get_template(config.get('template', 'quiz'))
+        tasks = template.voice_tasks(script)
+        voice_key = config.get('voice') or self.voice_manager.get_random_voice_name()
+        vid_id = os.path.basename(output_path).split('.')[0]
+        
+        def synthesize(key, text):
+            path = self.temp_path(f"{vid_id}_{key}.mp3", VOICE_TRACK_BYTES)
+            system = self.synthesize_track(text, path, voice_key, provider=template.VOICE_PROVIDER)
+            self.track_temp_file(path, vid_id)
+            return key, path, system
+        
+        tracks = {k: p for k, p in (existing or {}).items() if k in tasks and os.path.exists(p)}
+        if tracks: print(f"   ♻️ Reusing {len(tracks)} of {len(tasks)} voice track(s)")
+        voice_system = None
+        # No blocking shutdown: a hung TTS call must not hold the stage past its deadline
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = [executor.submit(synthesize, k, t) for k, t in tasks.items() if k not in tracks]
+            for future in wait_futures(futures):
+                key, path, voice_system = future.result()
+                tracks[key] = path
+                if on_track: on_track(key, path)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return tracks, voice_system
+
+    def apply_branding(self, branding=None):
+        """Channel name, logo and music library of the short being rendered (None = config defaults)."""
+        branding = dict(self.default_branding, **(branding or {}))
+        self.channel_name = branding['channel_name']
+        self.logo_path = branding['logo_path']
+        self.music_dir = branding['music_dir']
+
     def generate_short(self, video_path, pdf_path, script, config, output_path, class_level=None):
         try:
-            t_type = config.get('template', 'quiz')
-            #if t_type == 'quiz': from template_quiz import QuizTemplate; template = QuizTemplate(self)
-            if t_type == 'quiz': from template_quiz_json_generator import QuizTemplate; template = QuizTemplate(self)
-            elif t_type == 'fact': from template_fact import FactTemplate; template = FactTemplate(self)
-            elif t_type == 'tip': from template_tip import TipTemplate; template = TipTemplate(self)
-            else: raise ValueError(f"Unknown template: {t_type}")
-            
-            result = template.generate(video_path, script, config, output_path)
-            return {'success': True, 'output_path': output_path, 'duration': result.get('duration', 0)}
+            self.apply_branding(config.get('branding'))
+            template = self.get_template(config.get('template', 'quiz'))
+            # Every clip the template opens is closed (and its ffmpeg reader reaped) when the scope ends
+            with ResourceScope(os.path.basename(output_path).split('.')[0]) as scope:
+                result = template.generate(video_path, script, config, output_path)
+            return {'success': True, 'output_path': output_path, 'duration': result.get('duration', 0),
+                    'resources': scope.stats}
         except Exception as e:
             import traceback; traceback.print_exc()
             return {'success': False, 'error': str(e)}
-
-def generate_random_config(class_level=None):
-    templates = ['quiz', 'fact', 'tip']
-    themes = list(THEMES.keys())
-    opening_styles = ['countdown', 'montage', 'mystery']
-    
-    config = {
-        'template': random.choice(templates),
-        'voice': VoiceManager.get_random_voice_name(),
-        'theme': random.choice(themes),
-        'cta_style': random.choice(['persistent', 'bookend', 'both']),
-        'opening_style': random.choice(opening_styles),
-        'class_level': class_level or random.randint(6, 12),
-        'retention_strategy': random.choice(['cliffhanger', 'teaser', 'curiosity'])
-    }
-    return config
\ No newline at end of file
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+File: slide_ocr.py
+On-screen text index for lecture videos (VIDEO_PROCESSING.ENABLE_OCR).
+
+Lecture videos are mostly static slides, so frames are not OCR'd one by one.
+Frames are sampled at OCR_SAMPLE_FPS as 160x90 grayscale thumbnails, decoded
+and scaled by one ffmpeg process (no per-frame work in Python; without ffmpeg,
+OpenCV seeks to each sample time instead). A full frame is decoded only for
+the samples that get OCR'd. A slide change is more than OCR_CHANGE_THRESHOLD (a fraction) of
+its pixels differing visibly from the current slide's thumbnail (one new line
+of text on an otherwise identical slide is about 2%). Each slide is OCR'd
+once, on the first sample after its transition has settled (so fades are not
+read half-blended).
+Consecutive slides with the same text (animation build steps) are merged.
+
+    [{"start": 12.0, "end": 47.0, "text": "6.2 Nutrition in plants ..."}, ...]
+
+The index is cached like the transcript (temp JSON + ArtifactStore by video
+content hash), and VideoProcessor.find_best_timestamp matches keywords against
+it alongside the Whisper text.
+
+OCR runs locally with Tesseract (pytesseract); without it the index is off.
+"""
+
+import re
+import subprocess
+
+from stage_timeout import check_deadline
+
+THUMB_SIZE = (160, 90)
+PIXEL_DELTA = 25  # Grey levels; below this a pixel difference is compression noise
+
+_ocr_checked = None
+
+def ocr_available():
+    """True when pytesseract and the tesseract binary are installed (checked once)."""
+    global _ocr_checked
+    if _ocr_checked is None:
+        try:
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            _ocr_checked = True
+        except Exception:
+            _ocr_checked = False
+            print("⚠️ ENABLE_OCR is on but Tesseract/pytesseract is not installed; slide OCR disabled")
+    return _ocr_checked
+
+def find_on_slides(slides, keyword, after):
+    """Earliest time >= after at which keyword is on screen, or None."""
+    keyword = keyword.lower()
+    for slide in slides:
+        if slide['end'] > after and keyword in slide['text'].lower():
+            return max(slide['start'], after)
+    return None
+
+class SlideOCR:
+    """
+    Usage:
+        ocr = SlideOCR.from_config(CONFIG['VIDEO_PROCESSING'])   # None when off or no OCR engine
+        slides = ocr.build('temp/V12.mp4')
+        t = find_on_slides(slides, 'chlorophyll', after=30.0)
+    """
+
+    def __init__(self, sample_fps=1.0, change_threshold=0.01, min_slide_sec=1.5, lang='eng', max_width=1600):
+        self.sample_fps = sample_fps
+        self.change_threshold = change_threshold
+        self.min_slide_sec = min_slide_sec
+        self.lang = lang
+        self.max_width = max_width
+
+    @classmethod
+    def from_config(cls, settings):
+        if not settings.get('ENABLE_OCR') or not ocr_available():
+            return None
+        return cls(
+            sample_fps=settings.get('OCR_SAMPLE_FPS', 1.0),
+            change_threshold=settings.get('OCR_CHANGE_THRESHOLD', 0.01),
+            min_slide_sec=settings.get('OCR_MIN_SLIDE_SEC', 1.5),
+            lang=settings.get('OCR_LANG', 'eng')
+        )
+
+    def params(self):
+        """Settings that change the index (part of its artifact key)."""
+        return {'sample_fps': self.sample_fps, 'threshold': self.change_threshold,
+                'min_slide_sec': self.min_slide_sec, 'lang': self.lang}
+
+    # ------------------------------------------------------------------
+    # OCR
+    # ------------------------------------------------------------------
+    def read_text(self, frame):
+        import cv2
+        import pytesseract
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if gray.shape[1] > self.max_width:
+            scale = self.max_width / gray.shape[1]
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        text = pytesseract.image_to_string(binary, lang=self.lang)
+        return re.sub(r'\s+', ' ', text).strip()
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _changed(a, b):
+        """Fraction of thumbnail pixels that differ visibly."""
+        import cv2
+        return float((cv2.absdiff(a, b) > PIXEL_DELTA).mean())
+
+    @staticmethod
+    def _frame_at(cap, t):
+        """Full frame at t seconds (seek + decode), or None past the end."""
+        import cv2
+        cap.set(cv2.CAP_PROP_POS_MSEC, t * 1000.0)
+        ok, frame = cap.read()
+        return frame if ok else None
+
+    def _ffmpeg_samples(self, video_path):
+        """(t, thumbnail) at sample_fps, decoded and scaled by ffmpeg (ImportError/OSError: no ffmpeg)."""
+        import numpy as np
+        from moviepy.config import get_setting
+        w, h = THUMB_SIZE
+        cmd = [get_setting('FFMPEG_BINARY'), '-v', 'error', '-nostdin', '-i', video_path, '-an', '-sn',
+               '-vf', f"fps={self.sample_fps},scale={w}:{h}:flags=area,format=gray",
+               '-f', 'rawvideo', '-pix_fmt', 'gray', '-']
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+        def read():
+            i = 0
+            try:
+                while True:
+                    buf = proc.stdout.read(w * h)
+                    if len(buf) < w * h:
+                        break
+                    yield i / self.sample_fps, np.frombuffer(buf, np.uint8).reshape(h, w)
+                    i += 1
+            finally:
+                proc.kill()
+                proc.wait()
+                proc.stdout.close()
+            if i == 0 and proc.returncode != 0:
+                raise IOError(f"ffmpeg could not decode {video_path} for OCR")
+        return read()
+
+    def _seek_samples(self, cap, duration):
+        """(t, thumbnail) at sample_fps by seeking, when ffmpeg is not available."""
+        import cv2
+        t = 0.0
+        while t < duration:
+            frame = self._frame_at(cap, t)
+            if frame is None:
+                break
+            yield t, cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), THUMB_SIZE, interpolation=cv2.INTER_AREA)
+            t += 1.0 / self.sample_fps
+
+    def build(self, video_path):
+        """
+        Returns:
+            list: {'start', 'end', 'text'} per slide with on-screen text, in time order
+        """
+        import cv2
+
+        # Random access to full frames, only for the samples that get OCR'd
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise IOError(f"Cannot open video for OCR: {video_path}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        duration = (cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0) / fps
+
+        try:
+            samples = self._ffmpeg_samples(video_path)
+        except (ImportError, OSError):
+            samples = self._seek_samples(cap, duration or float('inf'))
+
+        slides = []            # {'start', 'text'}; end filled in afterwards
+        current = None         # slide being watched: {'start', 'ref', 'at', 'text'}
+        prev_thumb = None
+        last_t = 0.0
+
+        def finish(slide):
+            if slide['text'] is None:
+                frame = self._frame_at(cap, slide['at'])
+                slide['text'] = self.read_text(frame) if frame is not None else ''
+            slides.append({'start': slide['start'], 'text': slide['text']})
+
+        try:
+            for t, thumb in samples:
+                check_deadline()
+                changed = current is None or (
+                    self._changed(thumb, current['ref']) > self.change_threshold
+                    and t - current['start'] >= self.min_slide_sec)
+                if changed:
+                    if current: finish(current)
+                    current = {'start': t, 'ref': thumb, 'at': t, 'text': None}
+                elif current['text'] is None and prev_thumb is not None \
+                        and self._changed(thumb, prev_thumb) < self.change_threshold / 4:
+                    # Transition settled: read this frame, compare later samples against it
+                    frame = self._frame_at(cap, t)
+                    if frame is not None:
+                        current.update(ref=thumb, text=self.read_text(frame))
+                prev_thumb = thumb
+                last_t = t
+            if current: finish(current)
+        finally:
+            samples.close()
+            cap.release()
+
+        duration = duration or last_t + 1.0 / self.sample_fps
+        index = []
+        for i, slide in enumerate(slides):
+            end = slides[i + 1]['start'] if i + 1 < len(slides) else duration
+            if index and index[-1]['text'] == slide['text']:
+                index[-1]['end'] = end  # Same slide, next build step
+            else:
+                index.append({'start': slide['start'], 'end': end, 'text': slide['text']})
+        return [s for s in index if s['text']]
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+File: sqlite_index.py
+Shared SQLite access for the local indexes (output_index, scratch_space,
+artifact_store, passage_index).
+
+One short-lived connection per call, in autocommit mode, so an index object is
+safe to use from several threads and spawned workers. Read-modify-write goes
+through _transaction(), which takes the write lock up front (BEGIN IMMEDIATE):
+concurrent writers queue on the busy timeout instead of failing to upgrade a
+read lock.
+"""
+
+import sqlite3
+
+class SQLiteIndex:
+    """
+    Usage:
+        class OutputIndex(SQLiteIndex):
+            def __init__(self, db_path, timeout=30):
+                self.db_path, self.timeout = db_path, timeout
+            def reserve(self, base):
+                return self._transaction(lambda conn: ...)
+    """
+
+    db_path = None
+    timeout = 30
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+
+    def _transaction(self, fn):
+        """Runs fn(conn) inside BEGIN IMMEDIATE ... COMMIT (rolled back if it raises); returns its result."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            if conn.in_transaction: conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+File: stage_timeout.py
+Wall-clock budgets for row stages, with hard cancellation of their child processes.
+
+    with stage_deadline('render', 1800):
+        engine.generate_short(...)
+
+While a deadline is active in a thread, every subprocess that thread starts
+(moviepy's ffmpeg readers/writers, ImageMagick `convert`, Whisper's ffmpeg
+decode, a Node CLI) gets its own session, so it and anything it spawns form
+one process group. When the budget runs out, the watchdog:
+1. marks the stage expired (check_deadline() / wait_futures() raise StageTimeout),
+2. SIGTERMs the stage's process groups, SIGKILLs them after KILL_GRACE_SEC;
+   the blocked pipe read/write in moviepy fails right away,
+3. if the stage thread is still inside the block after the grace period
+   (stuck in Python code, e.g. waiting on a hung TTS websocket), raises
+   StageTimeout in that thread asynchronously.
+Whatever the stage raises after expiry surfaces as StageTimeout, so the row is
+marked failed with a clear status and the batch moves on.
+
+Subprocess tracking patches subprocess.Popen once per process (install());
+threads without an active deadline are not affected.
+"""
+
+import os
+import time
+import ctypes
+import signal
+import threading
+import subprocess
+import concurrent.futures
+
+class StageTimeout(Exception):
+    pass
+
+_state = threading.local()
+_installed = False
+_install_lock = threading.Lock()
+
+def current_deadline():
+    return getattr(_state, 'deadline', None)
+
+class _TrackedPopen(subprocess.Popen):
+    """Popen that puts children of a deadline-bound thread in their own session and registers them."""
+
+    def __init__(self, *args, **kwargs):
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check()
+            kwargs['start_new_session'] = True
+        super().__init__(*args, **kwargs)
+        if deadline is not None:
+            deadline.track(self)
+
+def install():
+    """Routes subprocess.Popen (also used by moviepy, whisper and subprocess.run) through _TrackedPopen."""
+    global _installed
+    with _install_lock:
+        if not _installed:
+            subprocess.Popen = _TrackedPopen
+            _installed = True
+
+def _kill_group(pid, sig):
+    try:
+        os.killpg(pid, sig)  # Session leader: pgid == pid
+    except (ProcessLookupError, PermissionError):
+        pass
+
+class StageDeadline:
+    """
+    Usage:
+        with StageDeadline('voice', 300) as deadline:
+            ...
+            deadline.check()        # cooperative cancellation point
+    """
+
+    def __init__(self, stage, seconds, kill_grace_sec=5.0):
+        self.stage = stage
+        self.seconds = seconds
+        self.kill_grace_sec = kill_grace_sec
+        self.expired = False
+        self.procs = []
+        self.lock = threading.Lock()
+        self._timer = None
+        self._thread_id = None
+        self._outer = None
+        self._inside = False
+
+    @property
+    def message(self):
+        return f"{self.stage} stage timed out after {self.seconds:g}s"
+
+    def remaining(self):
+        return max(0.0, self.ends_at - time.time())
+
+    def check(self):
+        if self.expired:
+            raise StageTimeout(self.message)
+
+    def track(self, proc):
+        with self.lock:
+            self.procs.append(proc)
+            expired = self.expired
+        if expired:
+            _kill_group(proc.pid, signal.SIGKILL)
+
+    # ------------------------------------------------------------------
+    # Watchdog
+    # ------------------------------------------------------------------
+    def _expire(self):
+        with self.lock:
+            if not self._inside:
+                return
+            self.expired = True
+            procs = [p for p in self.procs if p.poll() is None]
+        print(f"⏰ {self.message}; stopping {len(procs)} child process group(s)")
+        for p in procs:
+            _kill_group(p.pid, signal.SIGTERM)
+
+        deadline = time.time() + self.kill_grace_sec
+        while time.time() < deadline and any(p.poll() is None for p in procs):
+            time.sleep(0.1)
+        for p in procs:
+            if p.poll() is None:
+                _kill_group(p.pid, signal.SIGKILL)
+
+        # Still inside the block: interrupt the stage thread's Python code
+        time.sleep(self.kill_grace_sec)
+        with self.lock:
+            if self._inside:
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self._thread_id), ctypes.py_object(StageTimeout))
+
+    def __enter__(self):
+        install()
+        self.ends_at = time.time() + self.seconds
+        self._thread_id = threading.get_ident()
+        self._outer = current_deadline()
+        _state.deadline = self
+        self._inside = True
+        self._timer = threading.Timer(self.seconds, self._expire)
+        self._timer.daemon = True
+        self._timer.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self.lock:
+            self._inside = False
+            if self.expired:
+                # Drop an async StageTimeout that was queued but not delivered yet
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self._thread_id), None)
+        self._timer.cancel()
+        _state.deadline = self._outer
+        if self.expired:
+            if exc_type is not None and issubclass(exc_type, StageTimeout) and exc.args:
+                return False
+            # Killed children (EOF, broken ffmpeg pipe) or the bare async StageTimeout: report the real cause
+            raise StageTimeout(self.message) from exc
+        return False
+
+class _NoDeadline:
+    def __enter__(self): return None
+    def __exit__(self, *exc): return False
+
+def stage_deadline(stage, seconds, kill_grace_sec=5.0):
+    """StageDeadline, or a no-op context when seconds is 0/None."""
+    if not seconds:
+        return _NoDeadline()
+    return StageDeadline(stage, seconds, kill_grace_sec)
+
+def check_deadline():
+    """Cooperative cancellation point: raises StageTimeout if this thread's stage ran out of time."""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
+
+def wait_futures(futures, timeout=None):
+    """
+    as_completed() bounded by the thread's stage deadline (and timeout, if given).
+
+    Yields:
+        Completed futures
+
+    Raises:
+        StageTimeout: The budget ran out with futures still pending
+    """
+    deadline = current_deadline()
+    limit = deadline.remaining() if deadline is not None else None
+    if timeout is not None:
+        limit = timeout if limit is None else min(limit, timeout)
+    try:
+        for future in concurrent.futures.as_completed(futures, timeout=limit):
+            yield future
+    except concurrent.futures.TimeoutError:
+        for f in futures:
+            f.cancel()
+        raise StageTimeout(deadline.message if deadline is not None else f"Timed out after {timeout:g}s")
+
+def run_subprocess_with_timeout(cmd, timeout, kill_grace_sec=5.0, **kwargs):
+    """
+    subprocess.run for long external tools (Node/Remotion CLI, ffmpeg): the
+    command runs in its own process group, which is killed as a whole on timeout.
+
+    Returns:
+        subprocess.CompletedProcess
+
+    Raises:
+        StageTimeout: The command did not finish within timeout seconds
+    """
+    kwargs.setdefault('start_new_session', True)
+    proc = subprocess.Popen(cmd, **kwargs)
+    try:
+        out, err = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill_group(proc.pid, signal.SIGTERM)
+        try:
+            proc.wait(timeout=kill_grace_sec)
+        except subprocess.TimeoutExpired:
+            _kill_group(proc.pid, signal.SIGKILL)
+            proc.wait()
+        raise StageTimeout(f"{cmd[0] if isinstance(cmd, (list, tuple)) else cmd} timed out after {timeout:g}s")
+    return subprocess.CompletedProcess(proc.args, proc.returncode, out, err)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+File: task_graph.py
+Small dependency-graph executor for the steps of ONE row.
+
+Each task declares the tasks it needs; a task starts as soon as all of its
+inputs are ready, so independent steps (e.g. Whisper transcription and the
+Gemini call) run concurrently. The first failure stops new tasks from being
+scheduled and is re-raised once the running ones finish.
+"""
+
+import time
+import concurrent.futures
+
+class TaskGraph:
+    """
+    Usage:
+        graph = TaskGraph("row 12")
+        graph.add('pdf', download_pdf)
+        graph.add('text', extract_text, deps=['pdf'])
+        graph.add('script', make_script, deps=['text'])
+        results = graph.run(max_workers=3)
+
+    Each task function is called with its dependencies' results as positional
+    arguments, in the order the deps were declared.
+    """
+
+    def __init__(self, name="graph"):
+        self.name = name
+        self.tasks = {}
+        self.order = []
+        self.timings = {}
+
+    def add(self, name, fn, deps=()):
+        if name in self.tasks:
+            raise ValueError(f"Task '{name}' already defined")
+        for dep in deps:
+            if dep not in self.tasks:
+                raise ValueError(f"Task '{name}' depends on unknown task '{dep}' (declare deps first)")
+        self.tasks[name] = (fn, list(deps))
+        self.order.append(name)
+        return self
+
+    def _timed(self, name, fn, args):
+        start = time.time()
+        try:
+            return fn(*args)
+        finally:
+            self.timings[name] = time.time() - start
+
+    def run(self, max_workers=4):
+        """
+        Executes the graph.
+
+        Returns:
+            dict: {task_name: result}
+
+        Raises:
+            The first exception raised by any task.
+        """
+        results = {}
+        remaining = list(self.order)
+        running = {}
+        error = None
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                   thread_name_prefix=f"graph-{self.name}") as executor:
+            while remaining or running:
+                # Launch every task whose inputs are all available
+                if error is None:
+                    for name in list(remaining):
+                        fn, deps = self.tasks[name]
+                        if all(d in results for d in deps):
+                            args = [results[d] for d in deps]
+                            running[executor.submit(self._timed, name, fn, args)] = name
+                            remaining.remove(name)
+
+                if not running:
+                    break
+
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        if error is None:
+                            error = e
+                            print(f"   ❌ [{self.name}] '{name}' failed: {e}")
+
+        if error is not None:
+            raise error
+        return results
+
+    def summary(self):
+        """One-line timing summary, in declaration order."""
+        return ", ".join(f"{n}={self.timings[n]:.1f}s" for n in self.order if n in self.timings)
@@ -16,7 +16,6 @@ from moviepy.editor import VideoFileClip, CompositeVideoClip, CompositeAudioClip
 from voice_manager import VoiceManager
 from karaoke_manager import KaraokeManager
 from video_processor import VideoProcessor
-from sfx_manager import SFXManager  # <--- NEW IMPORT
 from usp_content_variations import USPContent
 from visual_effects_quiz import QuizVisualEffects
 from visual_effects_quiz import res_scale, set_resolution, WIDTH, HEIGHT
@@ -141,8 +140,26 @@ def validate_layout():
 
 
 class QuizTemplate:
+    VOICE_PROVIDER = 'edge'
+
     def __init__(self, engine):
         self.engine = engine
+
+    @staticmethod
+    def voice_tasks(script):
+        """Voice track key -> spoken text (shared with ShortsEngine.synthesize_voice_tracks)."""
+        return {
+            'hook': script['hook_spoken'],
+            'question': script['question_spoken'],
+            'opt_a': f"A: {script['opt_a_spoken']}",
+            'opt_b': f"B: {script['opt_b_spoken']}",
+            'opt_c': f"C: {script['opt_c_spoken']}",
+            'opt_d': f"D: {script['opt_d_spoken']}",
+            'think': "Think fast!",
+            # SEPARATED: Explanation and CTA are now distinct files
+            'explanation': f"The answer is {script['correct_opt']}! {script['explanation_spoken']}",
+            'cta': script['cta_spoken']
+        }
     
     def generate(self, video_path, script, config, output_path):
         print("📝 Generating Quiz Template (Parallel Processing)...")
@@ -182,7 +199,7 @@ class QuizTemplate:
         print(f"   🎤 Using voice: {selected_voice_key} (consistent across all segments)")
         video_proc = VideoProcessor(temp_dir=self.engine.config['DIRS']['TEMP'])
         karaoke_mgr = KaraokeManager(voice_mgr, self.engine.config['DIRS']['TEMP'])
-        sfx_mgr = SFXManager() # <--- NEW INITIALIZATION
+        sfx_mgr = self.engine.sfx_manager # Shared, keeps decoded SFX between shorts
         
         vid_id = os.path.basename(output_path).split('.')[0]
         temp_dir = self.engine.config['DIRS']['TEMP']
@@ -190,24 +207,17 @@ class QuizTemplate:
         
         # 1. Parallel Audio Generation
         print("   🎙️  Synthesizing 8 voiceover tracks...")
-        audio_tasks = {
-            'hook': script['hook_spoken'],
-            'question': script['question_spoken'],
-            'opt_a': f"A: {script['opt_a_spoken']}",
-            'opt_b': f"B: {script['opt_b_spoken']}",
-            'opt_c': f"C: {script['opt_c_spoken']}",
-            'opt_d': f"D: {script['opt_d_spoken']}",
-            'think': "Think fast!",
-            # SEPARATED: Explanation and CTA are now distinct files
-            'explanation': f"The answer is {script['correct_opt']}! {script['explanation_spoken']}",
-            'cta': script['cta_spoken']
-        }
+        audio_tasks = self.voice_tasks(script)
         
         generated_audio_paths = {}
+        pre_rendered = config.get('voice_tracks') or {}
 
         def generate_single_audio(key, text):
+            # Tracks already synthesized upstream (staged pipeline) are reused as-is
+            if key in pre_rendered and os.path.exists(pre_rendered[key]):
+                return key, pre_rendered[key]
             path = f"{temp_dir}/{vid_id}_{key}.mp3"
-            voice_mgr.generate_audio_with_specific_voice(text, path, selected_voice_key, provider='edge')
+            voice_mgr.generate_audio_with_specific_voice(text, path, selected_voice_key, provider=self.VOICE_PROVIDER)
             return key, path
 
         #with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
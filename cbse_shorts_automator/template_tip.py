@@ -12,7 +12,8 @@ from moviepy.editor import CompositeVideoClip, CompositeAudioClip, TextClip, Aud
 from voice_manager import VoiceManager
 from karaoke_manager import KaraokeManager
 from video_processor import VideoProcessor
-from sfx_manager import SFXManager  # <--- NEW IMPORT
+from stage_timeout import wait_futures
+from shorts_engine import VOICE_TRACK_BYTES
 
 WIDTH = 1080
 HEIGHT = 1920
@@ -24,8 +25,21 @@ def hex_to_rgb(hex_color):
     return hex_color
 
 class TipTemplate:
+    VOICE_PROVIDER = 'google'
+
     def __init__(self, engine):
         self.engine = engine
+
+    @staticmethod
+    def voice_tasks(script):
+        """Voice track key -> spoken text (shared with ShortsEngine.synthesize_voice_tracks)."""
+        return {
+            'hook': script['hook_spoken'],
+            'title': script['tip_title'],
+            'content': script['tip_spoken'], # Content moved to parallel
+            'bonus': script['bonus'],
+            'cta': script['cta_spoken']
+        }
     
     def generate(self, video_path, script, config, output_path):
         print("📝 Generating Tip Template (Parallel Processing)...")
@@ -39,7 +53,7 @@ class TipTemplate:
         print(f"   🎤 Using voice: {selected_voice_key} (consistent across all segments)")
         video_proc = VideoProcessor(temp_dir=self.engine.config['DIRS']['TEMP'])
         karaoke_mgr = KaraokeManager(voice_mgr, self.engine.config['DIRS']['TEMP'])
-        sfx_mgr = SFXManager() # <--- NEW INITIALIZATION
+        sfx_mgr = self.engine.sfx_manager # Shared, keeps decoded SFX between shorts
         
         vid_id = os.path.basename(output_path).split('.')[0]
         temp_dir = self.engine.config['DIRS']['TEMP']
@@ -48,27 +62,29 @@ class TipTemplate:
         
         # 1. Parallel Audio (Unified)
         print("   🎙️  Synthesizing voiceover tracks...")
-        audio_tasks = {
-            'hook': script['hook_spoken'],
-            'title': script['tip_title'],
-            'content': script['tip_spoken'], # Content moved to parallel
-            'bonus': script['bonus'],
-            'cta': script['cta_spoken']
-        }
+        audio_tasks = self.voice_tasks(script)
         
         generated_audio_paths = {}
+        pre_rendered = config.get('voice_tracks') or {}
 
         def generate_single_audio(key, text):
-            path = f"{temp_dir}/{vid_id}_{key}.mp3"
-            voice_mgr.generate_audio_with_specific_voice(text, path, selected_voice_key, provider='google')
-            return key, path
+            # Tracks already synthesized upstream (staged pipeline) are reused as-is
+            if key in pre_rendered and os.path.exists(pre_rendered[key]):
+                return key, pre_rendered[key]
+            path = self.engine.temp_path(f"{vid_id}_{key}.mp3", VOICE_TRACK_BYTES)
+            self.engine.synthesize_track(text, path, selected_voice_key, provider=self.VOICE_PROVIDER)
+            return key, self.engine.track_temp_file(path, vid_id)
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+        # No blocking shutdown: a hung TTS call must not hold the render past its stage deadline
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=5)
+        try:
             futures = [executor.submit(generate_single_audio, k, t) for k, t in audio_tasks.items()]
-            for future in concurrent.futures.as_completed(futures):
+            for future in wait_futures(futures):
                 k, path = future.result()
                 generated_audio_paths[k] = path
                 audio_files.append(path)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
         
         # Load all clips from the parallel generation dict
         aud_hook = AudioFileClip(generated_audio_paths['hook'])
@@ -104,7 +120,11 @@ class TipTemplate:
         
         # 3. Visuals
         print(f"   🧠 AI Watching video to find relevant clips ({int(total_dur)}s)...")
-        src_vid = video_proc.prepare_video_for_short(video_path, total_dur, script=script, width=WIDTH)
+        checkpoint = config.get('checkpoint')
+        saved_clip = checkpoint.get('clip') if checkpoint else None
+        src_vid = video_proc.prepare_video_for_short(video_path, total_dur, script=script, width=WIDTH,
+                                                     cut_plan=saved_clip and saved_clip['cuts'])
+        if checkpoint: checkpoint.done('clip', {'cuts': video_proc.last_cut_plan})
         src_vid = src_vid.set_position(('center', 0))
         bg = self.engine.create_background(config.get('theme'), total_dur, video_clip=src_vid)
         clips = [bg, src_vid]
@@ -214,16 +234,13 @@ class TipTemplate:
         final_audio = self.engine.add_background_music(CompositeAudioClip(full_audio_stack), total_dur)
         final_raw = CompositeVideoClip(clips, size=(WIDTH, HEIGHT)).set_audio(final_audio)
         
+        rendered = False
         try:
             self.engine.render_with_effects(final_raw, script, output_path)
+            rendered = True
         finally:
             if self.engine.config.get('DELETE_TEMP_FILES', True):
-                import glob
-                for f in audio_files:
-                    if os.path.exists(f): os.remove(f)
-                for pattern in [f'{temp_dir}/{vid_id}*', f'{vid_id}*TEMP_*']:
-                    for temp_file in glob.glob(pattern):
-                        try: os.remove(temp_file)
-                        except: pass
+                # A failed render keeps its voice tracks for the resumed attempt (checkpoint journal)
+                self.engine.release_temp_files(vid_id, audio_files, keep=not rendered and checkpoint is not None)
 
         return {'duration': total_dur}
\ No newline at end of file
@@ -16,10 +16,12 @@ from main_shorts_generator import (
     GeminiManager, 
     download_file, 
     download_drive_video, 
-    parse_class_level
+    parse_class_level,
+    STAGE_TIMEOUTS_CONFIG
 )
 from shorts_engine import ShortsEngine
 from voice_manager import VoiceManager
+from stage_timeout import StageTimeout, run_subprocess_with_timeout
 
 # --- CONFIGURATION ---
 	
@@ -180,6 +182,7 @@ def run_full_test():
         # 1. Define your variables
      # Replace with your desired path
     comp_id = "NCERT-Shorts-V3"
+    vid_id = os.path.basename(output_path).split('.')[0]
     entry_point = "src/index.ts"
     project_dir = "visual_engine_v3"
 
@@ -192,16 +195,26 @@ def run_full_test():
         comp_id, 
         output_path, 
         "--enable-multiprocess-on-linux", 
+        # The quiz template writes one scenario per short
+        f"--props={json.dumps({'scenarioFile': f'scenarios/{vid_id}.json'})}",
         
     ]  
 
-    # 3. Execute
+    # 3. Execute (same RENDER_SEC budget as a row; a hung Node/Chromium tree is killed as a group)
     try:
         print(f"🚀 Starting Remotion render: {comp_id}...")
-        subprocess.run(command, cwd=project_dir,check=True)
+        run_subprocess_with_timeout(
+            command, STAGE_TIMEOUTS_CONFIG.get('RENDER_SEC', 1800),
+            kill_grace_sec=STAGE_TIMEOUTS_CONFIG.get('KILL_GRACE_SEC', 5), cwd=project_dir
+        ).check_returncode()
         print("✅ Render completed successfully!")
     except subprocess.CalledProcessError as e:
         print(f"❌ Render failed with error code {e.returncode}")
+    except StageTimeout as e:
+        print(f"❌ Render aborted: {e}")
+    finally:
+        # The RAM-tier copies of this short's Remotion assets are no longer needed
+        engine.release_public_assets(vid_id)
 
 
 
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+File: test_drive_downloader.py
+Purpose: Tests for DriveDownloader (download_cache.py) against a local HTTP Range
+         server that stands in for the Drive endpoint and fails chosen pieces.
+Run: python -m unittest test_drive_downloader
+"""
+
+import os
+import base64
+import hashlib
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from artifact_store import ArtifactStore
+from download_cache import DriveDownloader
+
+PIECE = 64 * 1024
+DATA = bytes((i * 7 + i // 251) % 256 for i in range(5 * PIECE + 1000))
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """GET with Range/206, ETag and X-Goog-Hash; answers 500 for the pieces in server.fail."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        body, status, headers = server.data, 200, {'ETag': '"v1"', 'X-Goog-Hash': server.goog_hash}
+        rng = self.headers.get('Range')
+        if rng:
+            start, _, end = rng.split('=', 1)[1].partition('-')
+            start, end = int(start), min(int(end or len(body) - 1), len(body) - 1)
+            with server.lock:
+                server.ranges.append((start, end))
+                if server.fail.get(start, 0) > 0:
+                    server.fail[start] -= 1
+                    self.send_error(500)
+                    return
+            body, status = body[start:end + 1], 206
+            headers['Content-Range'] = f"bytes {start}-{end}/{len(server.data)}"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def md5_header(data):
+    return "crc32c=AAAAAA==,md5=" + base64.b64encode(hashlib.md5(data).digest()).decode()
+
+class DriveDownloaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+        self.server.data, self.server.goog_hash = DATA, md5_header(DATA)
+        self.server.fail, self.server.ranges, self.server.lock = {}, [], threading.Lock()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.save_path = os.path.join(self.tmp.name, "V1.mp4")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def downloader(self, store=None, retries=1):
+        return DriveDownloader(store=store, base_url=f"http://127.0.0.1:{self.server.server_port}/uc",
+                               connections=3, parallel_min_mb=0.01, piece_mb=PIECE / (1024 * 1024),
+                               retries=retries)
+
+    def piece_requests(self):
+        with self.server.lock:
+            return sorted(start for start, end in self.server.ranges if end > 0)
+
+    def test_failed_pieces_resume_from_sidecar(self):
+        self.server.fail = {PIECE: 1, 3 * PIECE: 1}
+        with self.assertRaises(IOError):
+            self.downloader().fetch_drive("FILE1", self.save_path)
+        self.assertFalse(os.path.exists(self.save_path))
+        self.assertTrue(os.path.exists(self.save_path + ".part"))
+        self.assertTrue(os.path.exists(self.save_path + ".part.json"))
+
+        self.server.ranges.clear()
+        self.assertEqual(self.downloader().fetch_drive("FILE1", self.save_path), 'downloaded')
+        self.assertEqual(self.piece_requests(), [PIECE, 3 * PIECE])   # Only the failed pieces again
+        with open(self.save_path, 'rb') as f:
+            self.assertEqual(f.read(), DATA)
+        self.assertFalse(os.path.exists(self.save_path + ".part"))
+        self.assertFalse(os.path.exists(self.save_path + ".part.json"))
+
+    def test_retries_within_one_fetch(self):
+        self.server.fail = {2 * PIECE: 1}
+        self.assertEqual(self.downloader(retries=2).fetch_drive("FILE1", self.save_path), 'downloaded')
+        with open(self.save_path, 'rb') as f:
+            self.assertEqual(f.read(), DATA)
+
+    def test_md5_mismatch_discards_download(self):
+        self.server.goog_hash = md5_header(b"something else")
+        with self.assertRaises(IOError):
+            self.downloader().fetch_drive("FILE1", self.save_path)
+        for path in (self.save_path, self.save_path + ".part", self.save_path + ".part.json"):
+            self.assertFalse(os.path.exists(path))
+
+    def test_second_fetch_is_cached(self):
+        store = ArtifactStore(os.path.join(self.tmp.name, "artifacts"))
+        self.assertEqual(self.downloader(store).fetch_drive("FILE1", self.save_path), 'downloaded')
+        self.server.ranges.clear()
+        other = os.path.join(self.tmp.name, "V1-again.mp4")
+        self.assertEqual(self.downloader(store).fetch_drive("FILE1", other), 'cached')
+        self.assertEqual(self.server.ranges, [])
+        with open(other, 'rb') as f:
+            self.assertEqual(f.read(), DATA)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+File: test_passage_index.py
+Purpose: Unit tests for passage selection, claiming and pruning (passage_index.py).
+Run: python -m unittest test_passage_index
+"""
+
+import os
+import time
+import tempfile
+import unittest
+
+from passage_index import PassageIndex
+
+SECTIONS = ["1.1 Light", "1.2 Reflection", "1.3 Refraction", "1.4 Lenses"]
+
+def chapter(seed=''):
+    parts = []
+    for n, heading in enumerate(SECTIONS):
+        parts.append(heading)
+        for k in range(3):
+            parts.append(f"{seed}Passage {n}-{k} on {heading.split()[1].lower()} covers mirror{n} angle{k} "
+                         f"focus{n}{k} and the ray diagram drawn for case {n * 3 + k} in this chapter.")
+    return '\n'.join(parts)
+
+class PassageIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = PassageIndex(os.path.join(self.tmp.name, "passages.sqlite3"), passage_chars=100)
+        self.text = chapter()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def uses(self, doc):
+        conn = self.index._connect()
+        try:
+            return dict(conn.execute("SELECT idx, uses FROM passages WHERE doc = ?", (doc,)).fetchall())
+        finally:
+            conn.close()
+
+    def test_select_claims_nothing_until_claim(self):
+        excerpt, (doc, idxs) = self.index.select(self.text, max_chars=400)
+        self.assertTrue(excerpt and idxs)
+        self.assertEqual(set(self.uses(doc).values()), {0})
+        self.index.claim((doc, idxs), owner='V1')
+        self.assertTrue(all(self.uses(doc)[i] == 1 for i in idxs))
+        self.assertEqual(+self.index._reserved, {})
+
+    def test_reserved_picks_rotate_and_release_returns_them(self):
+        first = self.index.select(self.text, max_chars=400)[1]
+        second = self.index.select(self.text, max_chars=400)[1]
+        self.assertFalse(set(first[1]) & set(second[1]))   # Parallel row gets other passages
+        self.index.release(first)
+        self.index.release(second)
+        self.assertEqual(set(self.uses(first[0]).values()), {0})
+        self.assertEqual(self.index.select(self.text, max_chars=400)[1], first)
+
+    def test_prune_drops_only_stale_chapters(self):
+        stale_doc = self.index.build(chapter('Old '))
+        fresh_doc = self.index.build(self.text)
+        conn = self.index._connect()
+        try:
+            conn.execute("UPDATE chapters SET built = ? WHERE doc = ?", (time.time() - 10 * 86400, stale_doc))
+        finally:
+            conn.close()
+        self.assertEqual(self.index.prune(5 * 86400), 1)
+        self.assertEqual(self.uses(stale_doc), {})
+        self.assertTrue(self.uses(fresh_doc))
+        self.assertEqual(self.index.prune(5 * 86400), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+File: test_pdf_text.py
+Purpose: Tests for chapter PDF text extraction (pdf_text.py), including extraction
+         inside a daemonic worker process (RowWorkerPool) where no pool can be started.
+Run: python -m unittest test_pdf_text
+"""
+
+import os
+import tempfile
+import unittest
+import multiprocessing as mp
+
+import pdf_text
+from pdf_text import PDFTextExtractor
+
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+PAGES = 60
+
+def make_pdf(path, pages=PAGES):
+    with fitz.open() as doc:
+        for i in range(pages):
+            doc.new_page().insert_text((72, 72), f"Page {i} text")
+        doc.save(path)
+
+def _fake_pages(path, start, stop):
+    return [f"page {i}\n" for i in range(start, stop)]
+
+def _extract_in_child(path, fake, queue):
+    """Daemon process target: extract with a pool-sized workload and report the outcome."""
+    if fake:
+        pdf_text._page_count = lambda p: PAGES
+        pdf_text._extract_pages = _fake_pages
+    try:
+        text, pages = PDFTextExtractor(workers=4, parallel_min_pages=10).extract(path)
+        queue.put(('ok', text, pages))
+    except Exception as e:
+        queue.put(('error', repr(e), None))
+
+def run_in_daemon(path, fake):
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_extract_in_child, args=(path, fake, queue), daemon=True)
+    proc.start()
+    try:
+        return queue.get(timeout=60)
+    finally:
+        proc.join(10)
+
+class PDFTextTest(unittest.TestCase):
+
+    def test_daemon_process_extracts_serially(self):
+        status, text, pages = run_in_daemon("unused.pdf", fake=True)
+        self.assertEqual(status, 'ok', text)
+        self.assertEqual(len(pages), PAGES)
+        self.assertIn("page 59", text)
+
+    @unittest.skipUnless(fitz, "PyMuPDF is not installed")
+    def test_pool_and_serial_agree(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "chapter.pdf")
+            make_pdf(path)
+            serial = PDFTextExtractor(workers=1).extract(path)
+            pooled = PDFTextExtractor(workers=4, parallel_min_pages=10).extract(path)
+            self.assertEqual(serial, pooled)
+            status, text, pages = run_in_daemon(path, fake=False)
+            self.assertEqual(status, 'ok', text)
+            self.assertEqual((text, pages), serial)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+File: test_row_lease.py
+Purpose: Unit tests for row leases (row_lease.py) against the local sheet mock.
+Run: python -m unittest test_row_lease
+"""
+
+import os
+import time
+import tempfile
+import threading
+import unittest
+
+from row_lease import RowLeaseManager, format_lease, parse_lease
+from sheets_mock import MockSheetsService
+
+STATUS_COL = 2
+PENDING = "Not Generated"
+
+def make_grid(statuses):
+    rows = [["ID", "Video", "Status"]]
+    for i, status in enumerate(statuses):
+        rows.append([f"V{i + 1}", f"https://drive/{i + 1}", status])
+    return rows
+
+class RowLeaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sheets = MockSheetsService(make_grid([PENDING, PENDING, "generated"]))
+
+    def manager(self, owner, sheets=None, **kwargs):
+        kwargs.setdefault('settle_sec', 0)
+        return RowLeaseManager(sheets or self.sheets, "SHEET", "Sheet1", STATUS_COL, owner=owner, **kwargs)
+
+    def status(self, row_num):
+        return self.sheets.cell("Sheet1", row_num, STATUS_COL)
+
+    # ------------------------------------------------------------------
+    # Acquire
+    # ------------------------------------------------------------------
+    def test_claim_writes_own_lease(self):
+        leases = self.manager("node-a", ttl_sec=600)
+        self.assertTrue(leases.claim(2, PENDING))
+        owner, expires_at = parse_lease(self.status(2))
+        self.assertEqual(owner, "node-a")
+        self.assertAlmostEqual(expires_at, time.time() + 600, delta=5)
+        self.assertIn(2, leases.held)
+
+    def test_claim_skips_finished_and_live_leased_rows(self):
+        a, b = self.manager("node-a"), self.manager("node-b")
+        self.assertFalse(a.claim(4, PENDING))            # "generated"
+        self.assertTrue(a.claim(2, PENDING))
+        self.assertFalse(b.claim(2, PENDING))            # a's lease is still live
+        self.assertEqual(parse_lease(self.status(2))[0], "node-a")
+
+    def test_claim_iter_respects_limit(self):
+        leases = self.manager("node-a")
+        rows = [(2, ["V1"]), (3, ["V2"]), (4, ["V3"])]
+        claimed = [n for n, _ in leases.claim_iter(rows, PENDING, limit=1)]
+        self.assertEqual(len(claimed), 1)
+        self.assertIn(claimed[0], (2, 3))
+
+    def test_nodes_sharing_file_backed_sheet(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sheet.json")
+            MockSheetsService(make_grid([PENDING]), path=path)
+            a = self.manager("node-a", sheets=MockSheetsService(path=path))
+            b = self.manager("node-b", sheets=MockSheetsService(path=path))
+            self.assertTrue(a.claim(2, PENDING))
+            self.assertFalse(b.claim(2, PENDING))
+
+    # ------------------------------------------------------------------
+    # Expire
+    # ------------------------------------------------------------------
+    def test_expired_lease_is_reclaimed(self):
+        self.sheets._update([("Sheet1!C2", [[format_lease("dead-node", time.time() - 1)]])])
+        leases = self.manager("node-b")
+        self.assertTrue(leases.is_claimable(self.status(2), PENDING))
+        self.assertTrue(leases.claim(2, PENDING))
+        self.assertEqual(parse_lease(self.status(2))[0], "node-b")
+
+    def test_expired_lease_kept_without_reclaim(self):
+        self.sheets._update([("Sheet1!C2", [[format_lease("dead-node", time.time() - 1)]])])
+        leases = self.manager("node-b", reclaim_expired=False)
+        self.assertFalse(leases.claim(2, PENDING))
+        self.assertEqual(parse_lease(self.status(2))[0], "dead-node")
+
+    # ------------------------------------------------------------------
+    # Renew
+    # ------------------------------------------------------------------
+    def test_renew_extends_held_lease(self):
+        leases = self.manager("node-a", ttl_sec=60)
+        leases.claim(2, PENDING)
+        first = parse_lease(self.status(2))[1]
+        leases.ttl_sec = 3600
+        leases.renew()
+        renewed = parse_lease(self.status(2))[1]
+        self.assertGreater(renewed, first + 3000)
+        self.assertEqual(leases.held[2][0], self.status(2))
+        self.assertTrue(leases.release(2))
+
+    def test_renew_detects_lost_lease(self):
+        leases = self.manager("node-a")
+        leases.claim(2, PENDING)
+        self.sheets._update([("Sheet1!C2", [[format_lease("node-b", time.time() + 600)]])])
+        leases.renew()
+        self.assertNotIn(2, leases.held)
+        self.assertEqual(parse_lease(self.status(2))[0], "node-b")  # Not overwritten
+        self.assertFalse(leases.release(2))
+
+    def test_renew_skips_row_released_after_snapshot(self):
+        leases = self.manager("node-a")
+        leases.claim(2, PENDING)
+        read = leases._read_cells
+
+        def read_then_finish(row_nums):
+            current = read(row_nums)
+            # Row finishes between the heartbeat's read and its write
+            self.sheets._update([("Sheet1!C2", [["generated"]])])
+            leases.release(2)
+            return current
+        leases._read_cells = read_then_finish
+        leases.renew()
+        self.assertEqual(self.status(2), "generated")
+
+    def test_renew_and_status_flush_are_serialized(self):
+        write_lock = threading.Lock()
+        leases = self.manager("node-a", write_lock=write_lock)
+        leases.claim(2, PENDING)
+        read = leases._read_cells
+
+        def flush_final_status():
+            with write_lock:      # What SheetWriteBuffer.flush holds
+                self.sheets._update([("Sheet1!C2", [["generated"]])])
+
+        flusher = threading.Thread(target=flush_final_status)
+        def read_then_flush(row_nums):
+            current = read(row_nums)
+            flusher.start()
+            flusher.join(0.2)     # Blocked until renew has written
+            return current
+        leases._read_cells = read_then_flush
+        leases.renew()
+        flusher.join()
+        self.assertEqual(self.status(2), "generated")
+
+    def test_heartbeat_renews_in_background(self):
+        leases = self.manager("node-a", ttl_sec=60, heartbeat_sec=0.05)
+        leases.claim(2, PENDING)
+        first = self.status(2)
+        leases.ttl_sec = 3600
+        leases.start()
+        try:
+            deadline = time.time() + 5
+            while self.status(2) == first and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            leases._stop.set()
+        self.assertNotEqual(self.status(2), first)
+        self.assertEqual(parse_lease(self.status(2))[0], "node-a")
+
+    def test_stop_hands_unfinished_rows_back(self):
+        leases = self.manager("node-a").start()
+        leases.claim(2, PENDING)
+        leases.claim(3, PENDING)
+        leases.release(3)
+        self.sheets._update([("Sheet1!C3", [["generated"]])])
+        leases.stop()
+        self.assertEqual(self.status(2), PENDING)
+        self.assertEqual(self.status(3), "generated")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+File: test_sheets_mock.py
+Purpose: Unit tests for the local Sheets stand-in (sheets_mock.py).
+Run: python -m unittest test_sheets_mock
+"""
+
+import os
+import tempfile
+import unittest
+
+from sheets_mock import MockSheetsService, parse_a1
+
+class MockSheetsTest(unittest.TestCase):
+
+    def test_parse_a1(self):
+        self.assertEqual(parse_a1("Sheet1!B2"), ("Sheet1", 1, 1, 1, 1))
+        self.assertEqual(parse_a1("'My Tab'!B2:D5"), ("My Tab", 1, 1, 4, 3))
+        self.assertEqual(parse_a1("Sheet1!A:AT"), ("Sheet1", 0, 0, None, 45))
+        self.assertEqual(parse_a1("Sheet1!AN2:AN"), ("Sheet1", 1, 39, None, 39))
+
+    def test_get_trims_like_sheets(self):
+        sheets = MockSheetsService([["a", "b", ""], ["c", "", ""], ["", "", ""]])
+        res = sheets.spreadsheets().values().get(spreadsheetId="S", range="Sheet1!A1:C3").execute()
+        self.assertEqual(res['values'], [["a", "b"], ["c"]])
+        res = sheets.spreadsheets().values().get(spreadsheetId="S", range="Sheet1!A1:B2",
+                                                 majorDimension='COLUMNS').execute()
+        self.assertEqual(res['values'], [["a", "c"], ["b"]])
+        self.assertNotIn('values', sheets.spreadsheets().values().get(spreadsheetId="S", range="Sheet1!C1:C3").execute())
+
+    def test_batch_update_then_batch_get(self):
+        sheets = MockSheetsService([["ID", "Status"]])
+        body = {'data': [{'range': "Sheet1!B3", 'values': [["done"]]},
+                         {'range': "Sheet1!A2:B2", 'values': [["V1", "pending"]]}]}
+        res = sheets.spreadsheets().values().batchUpdate(spreadsheetId="S", body=body).execute()
+        self.assertEqual(res['totalUpdatedCells'], 3)
+        res = sheets.spreadsheets().values().batchGet(spreadsheetId="S", ranges=["Sheet1!B2", "Sheet1!B3"]).execute()
+        self.assertEqual([vr['values'] for vr in res['valueRanges']], [[["pending"]], [["done"]]])
+        self.assertEqual(sheets.cell("Sheet1", 3, 1), "done")
+
+    def test_file_backed_instances_share_writes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sheet.json")
+            first = MockSheetsService([["ID", "Status"], ["V1", "pending"]], path=path)
+            second = MockSheetsService(path=path)
+            first.spreadsheets().values().update(spreadsheetId="S", range="Sheet1!B2",
+                                                 body={'values': [["claimed"]]}).execute()
+            res = second.spreadsheets().values().get(spreadsheetId="S", range="Sheet1!B2").execute()
+            self.assertEqual(res['values'], [["claimed"]])
+
+if __name__ == "__main__":
+    unittest.main()
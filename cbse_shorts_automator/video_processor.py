@@ -13,20 +13,42 @@ import warnings
 from moviepy.editor import VideoFileClip, concatenate_videoclips, vfx
 import numpy as np
 import gc
+import threading
+from slide_ocr import find_on_slides
 
 # Suppress Whisper warnings
 warnings.filterwarnings("ignore")
 
+# 'tiny' for speed/RAM; part of the transcript's artifact key
+WHISPER_MODEL = "tiny"
+
 class VideoProcessor:
     """
     Processes static slide videos into dynamic shorts.
     """
     
+    # Long-lived processes (generator daemon) keep one Whisper model per process
+    # instead of loading it for every video
+    keep_model_warm = False
+    _shared_model = None
+    _model_lock = threading.Lock()
+    
+    # Transcript / slide caches still needed by later rows of the same source video
+    pinned_caches = set()
+    
+    # ScratchSpace index set by ShortsEngine; transcript caches are evictable unless pinned
+    scratch = None
+    # ArtifactStore set by ShortsEngine: transcripts keyed by the video's content hash
+    artifacts = None
+    # SlideOCR set by ShortsEngine when VIDEO_PROCESSING.ENABLE_OCR is on (and Tesseract is installed)
+    slide_ocr = None
+    
     def __init__(self, temp_dir="temp", debug=False):
         self.debug = debug
         self.temp_dir = temp_dir
         self.model = None # Lazy load
         self.current_cache_file = None # Track file to delete later
+        self.last_cut_plan = None # Cuts chosen by the last prepare_video_for_short
         
         # Ensure temp folder exists
         os.makedirs(self.temp_dir, exist_ok=True)
@@ -34,9 +56,36 @@ class VideoProcessor:
     def _load_model(self):
         """Lazy loads the Whisper model."""
         if self.model is None:
+            if VideoProcessor.keep_model_warm:
+                with VideoProcessor._model_lock:
+                    if VideoProcessor._shared_model is None:
+                        VideoProcessor._shared_model = whisper.load_model(WHISPER_MODEL)
+                self.model = VideoProcessor._shared_model
+                return
             # Using 'tiny' for speed/RAM. 
             if self.debug: print("⏳ Loading Whisper Model (tiny)...")
-            self.model = whisper.load_model("tiny")
+            self.model = whisper.load_model(WHISPER_MODEL)
+
+    @staticmethod
+    def cache_owner(cache_path):
+        """Scratch owner of a transcript ({video}.json) or slide ({video}.slides.json) cache."""
+        name = os.path.basename(cache_path)
+        if name.endswith('.slides.json'):
+            return f"slides:{name[:-len('.slides.json')]}"
+        return f"transcript:{name[:-len('.json')]}"
+
+    @classmethod
+    def track_cache(cls, cache_path):
+        """Registers a cache on use; held while a row group pins it, so eviction cannot take it mid-group."""
+        if cls.scratch:
+            cls.scratch.register(cache_path, cls.cache_owner(cache_path), hold=cache_path in cls.pinned_caches)
+
+    @classmethod
+    def unpin_cache(cls, cache_path):
+        """The group's last row is done with the cache: it becomes evictable (or is deleted by the caller)."""
+        if cache_path in cls.pinned_caches:
+            cls.pinned_caches.discard(cache_path)
+            if cls.scratch: cls.scratch.unhold(cls.cache_owner(cache_path))
 
     def get_transcript_map(self, video_path):
         """
@@ -49,6 +98,16 @@ class VideoProcessor:
         # 1. Check Cache
         if os.path.exists(cache_path):
             if self.debug: print(f"⚡ Using existing temp transcript: {cache_path}")
+            VideoProcessor.track_cache(cache_path)
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+
+        # Same video content transcribed before (under any file name)
+        artifact_key = VideoProcessor.artifacts.key('transcript', files=[video_path], model=WHISPER_MODEL) \
+            if VideoProcessor.artifacts else None
+        if artifact_key and VideoProcessor.artifacts.fetch(artifact_key, cache_path) is not None:
+            if self.debug: print(f"⚡ Transcript found in artifact store: {filename}")
+            VideoProcessor.track_cache(cache_path)
             with open(cache_path, 'r') as f:
                 return json.load(f)
 
@@ -56,26 +115,68 @@ class VideoProcessor:
         self._load_model()
         if self.debug: print(f"🎙️ Transcribing audio for indexing: {filename}")
         
-        result = self.model.transcribe(video_path)
+        if self.model is VideoProcessor._shared_model:
+            # One warm model, several rows: transcribe one at a time
+            with VideoProcessor._model_lock:
+                result = self.model.transcribe(video_path)
+        else:
+            result = self.model.transcribe(video_path)
         segments = result['segments']
         
         # 3. Save to Temp
         with open(cache_path, 'w') as f:
             json.dump(segments, f)
+        VideoProcessor.track_cache(cache_path)
+        if artifact_key:
+            VideoProcessor.artifacts.save(artifact_key, cache_path, stage='transcript', meta={'segments': len(segments)})
             
         return segments
 
-    def find_best_timestamp(self, segments, keyword, last_end_time):
+    def get_slide_index(self, video_path):
+        """
+        On-screen text per slide (one OCR per slide change), cached like the transcript.
+        Empty when slide OCR is off.
+        """
+        ocr = VideoProcessor.slide_ocr
+        if ocr is None:
+            return []
+        filename = os.path.basename(video_path)
+        cache_path = os.path.join(self.temp_dir, f"{filename}.slides.json")
+        if os.path.exists(cache_path):
+            VideoProcessor.track_cache(cache_path)
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+
+        artifact_key = VideoProcessor.artifacts.key('slide_ocr', files=[video_path], **ocr.params()) \
+            if VideoProcessor.artifacts else None
+        if artifact_key and VideoProcessor.artifacts.fetch(artifact_key, cache_path) is not None:
+            VideoProcessor.track_cache(cache_path)
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+
+        if self.debug: print(f"🔎 Indexing slide text: {filename}")
+        slides = ocr.build(video_path)
+        with open(cache_path, 'w') as f:
+            json.dump(slides, f)
+        VideoProcessor.track_cache(cache_path)
+        if artifact_key:
+            VideoProcessor.artifacts.save(artifact_key, cache_path, stage='slide_ocr', meta={'slides': len(slides)})
+        return slides
+
+    def find_best_timestamp(self, segments, keyword, last_end_time, slides=None):
         """
-        Scans transcript for keyword to find best scene.
+        Scans transcript (and on-screen slide text) for keyword to find best scene.
         """
-        # Strategy 1: Semantic Search (Forward only)
+        # Strategy 1: Semantic Search (Forward only); the earlier of spoken and on-screen hits
         if keyword and len(keyword) > 3:
-            for seg in segments:
-                if seg['start'] >= last_end_time and keyword.lower() in seg['text'].lower():
-                    #if self.debug: print(f"   ✅ Found '{keyword}' at {seg['start']:.2f}s")
-                    print(f"   ✅ Found '{keyword}' at {seg['start']:.2f}s")
-                    return seg['start']
+            spoken = next((seg['start'] for seg in segments
+                           if seg['start'] >= last_end_time and keyword.lower() in seg['text'].lower()), None)
+            shown = find_on_slides(slides, keyword, last_end_time) if slides else None
+            hits = [t for t in (spoken, shown) if t is not None]
+            if hits:
+                start = min(hits)
+                print(f"   ✅ Found '{keyword}' at {start:.2f}s" + (" (on screen)" if start == shown and start != spoken else ""))
+                return start
         
         # Strategy 2: Linear Flow (Fallback)
         # Jumps 1.5s forward to ensure visual change
@@ -121,25 +222,41 @@ class VideoProcessor:
                 seen.add(w)
         return ordered
 
-    def release_resources(self):
-        """
-        CRITICAL: Cleans RAM and deletes Temp files.
-        """
+    def release_model(self):
+        """Drops the Whisper model but keeps the transcript cache on disk."""
+        if self.model is not None and self.model is VideoProcessor._shared_model:
+            self.model = None  # Shared warm model stays loaded for the next video
+            return
         if self.model is not None:
             if self.debug: print("🧹 Releasing Whisper AI from memory...")
             del self.model
             self.model = None
             gc.collect()
 
-        if self.current_cache_file and os.path.exists(self.current_cache_file):
+    def release_resources(self):
+        """
+        CRITICAL: Cleans RAM and deletes Temp files.
+        """
+        self.release_model()
+
+        if self.current_cache_file in VideoProcessor.pinned_caches:
+            return
+        if self.current_cache_file and VideoProcessor.scratch:
+            VideoProcessor.scratch.discard(self.current_cache_file)
+            self.current_cache_file = None
+        elif self.current_cache_file and os.path.exists(self.current_cache_file):
             try:
                 os.remove(self.current_cache_file)
                 self.current_cache_file = None
             except: pass
 
-    def prepare_video_for_short(self, video_path, total_duration, script=None, width=1080, style='smart'):
+    def prepare_video_for_short(self, video_path, total_duration, script=None, width=1080, style='smart', cut_plan=None):
         """
         Main Pipeline: Index -> Match -> Extract -> Cleanup
+        
+        cut_plan: [(start, length), ...] from an earlier attempt (checkpoint journal);
+        replayed as-is when it still adds up to total_duration. The cuts actually
+        used are left in self.last_cut_plan.
         """
         video = VideoFileClip(video_path)
         vid_duration = video.duration
@@ -148,9 +265,14 @@ class VideoProcessor:
         safe_duration = vid_duration - 5.0
         if safe_duration < 10: safe_duration = vid_duration 
         
-        # Get Intelligence
-        transcript = self.get_transcript_map(video_path)
-        keywords = self.extract_keywords_ordered(script) if script else []
+        if cut_plan and abs(sum(length for _, length in cut_plan) - total_duration) > 0.05:
+            cut_plan = None  # Voice tracks changed length since the plan was made
+        self.last_cut_plan = []
+        
+        # Get Intelligence (not needed when replaying a plan)
+        transcript = self.get_transcript_map(video_path) if not cut_plan else []
+        slides = self.get_slide_index(video_path) if not cut_plan else []
+        keywords = self.extract_keywords_ordered(script) if script and not cut_plan else []
         
         final_clips = []
         current_generated_duration = 0.0
@@ -159,7 +281,16 @@ class VideoProcessor:
 
         if self.debug: print(f"✂️  Generating variable clips for {total_duration}s video...")
 
-        while current_generated_duration < total_duration:
+        for start_t, this_clip_len in (cut_plan or []):
+            sub = video.subclip(start_t, start_t + this_clip_len)
+            if sub.w != width:
+                sub = sub.resize(width=width)
+            final_clips.append(self.apply_micro_zoom(sub, clip_index, this_clip_len))
+            self.last_cut_plan.append((start_t, this_clip_len))
+            current_generated_duration += this_clip_len
+            clip_index += 1
+
+        while not cut_plan and current_generated_duration < total_duration:
             
             # 1. Pick a Random Duration (Strict Pacing)
             this_clip_len = random.uniform(1.5, 2.5)
@@ -172,7 +303,7 @@ class VideoProcessor:
             target_kw = keywords[clip_index] if clip_index < len(keywords) else None
             
             # 3. Find Start Time
-            start_t = self.find_best_timestamp(transcript, target_kw, current_time_marker)
+            start_t = self.find_best_timestamp(transcript, target_kw, current_time_marker, slides)
             
             # 4. Safety Bounds Check
             if start_t + this_clip_len > safe_duration:
@@ -189,6 +320,7 @@ class VideoProcessor:
             sub = self.apply_micro_zoom(sub, clip_index, this_clip_len)
             
             final_clips.append(sub)
+            self.last_cut_plan.append((start_t, this_clip_len))
             
             current_generated_duration += this_clip_len
             current_time_marker = start_t + this_clip_len
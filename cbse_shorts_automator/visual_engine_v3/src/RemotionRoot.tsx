@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { Composition, staticFile, continueRender, delayRender } from 'remotion';
+import { Composition, staticFile, continueRender, delayRender, getInputProps } from 'remotion';
 import { VisualScenario } from './types/schema';
 import { MainVideo } from './MainVideo'; // Updated component name
 import './style.css'; 
@@ -19,8 +19,9 @@ export const RemotionRoot: React.FC = () => {
     const FPS = 30; // Define a consistent FPS for conversion
 
     useEffect(() => {
-        // 1. Fetch the scenario data from the public folder
-        fetch(staticFile('scenario_data.json')) 
+        // 1. Fetch the scenario data from the public folder (one file per short: --props '{"scenarioFile": ...}')
+        const { scenarioFile } = getInputProps() as { scenarioFile?: string };
+        fetch(staticFile(scenarioFile || 'scenario_data.json'))
             .then(res => {
                 if (!res.ok) {
                     throw new Error(`HTTP error! status: ${res.status}`);
@@ -4,6 +4,7 @@ export interface VisualScenario {
         resolution: { w: number; h: number };
         seed: number;
         duration_seconds: number;
+        channel_name?: string;
     };
     assets: {
         audio_url: string;
@@ -9,6 +9,7 @@ INTERFACE: Maintains 100% backward compatibility with existing codebase.
 
 import os
 import random
+import threading
 from moviepy.editor import AudioFileClip
 
 # Import our modular voice engines
@@ -60,9 +61,21 @@ class VoiceManager:
         self.voice_name = voice_name
         
         # Logging attributes (NEW - for Google Sheets logging)
+        # Tracked per thread too, so concurrent rows don't read each other's voice
+        self._thread_state = threading.local()
+        self._last_used_system = None
         self.last_used_system = None  # e.g., "Google-account1-NeeraNeural2" or "Edge-PrabhatNeural"
         self.char_count = 0
     
+    @property
+    def last_used_system(self):
+        return getattr(self._thread_state, 'last_used_system', None) or self._last_used_system
+    
+    @last_used_system.setter
+    def last_used_system(self, value):
+        self._thread_state.last_used_system = value
+        self._last_used_system = value
+    
     @staticmethod
     def get_random_voice_name():
         """
@@ -337,6 +350,18 @@ class VoiceManager:
     def print_usage_summary(self):
         """Print usage summary to console."""
         self.tracker.print_summary()
+    
+    def warm(self):
+        """
+        Creates every Google TTS client and makes one cheap call (list_voices)
+        on each, so credentials, token and channel are ready before the first short.
+        
+        Returns:
+            int: Number of Google accounts that answered
+        """
+        if not self.google_engine:
+            return 0
+        return sum(1 for account in self.google_accounts if self.google_engine.test_account(account))
 
 
 # ============================================================================
@@ -8,6 +8,7 @@ Handles usage monitoring, account rotation, and fallback decisions.
 import os
 import json
 import datetime
+import threading
 from pathlib import Path
 
 # ============================================================================
@@ -40,6 +41,9 @@ class VoiceUsageTracker:
         
         self.usage_history = self._load_usage_history()
         self.quota_state = self._load_quota_state()
+        
+        # Templates and the staged pipeline synthesize from several threads
+        self.lock = threading.RLock()
     
     def _load_usage_history(self):
         """Load cumulative usage log (append-only)."""
@@ -91,13 +95,14 @@ class VoiceUsageTracker:
     
     def register_account(self, account_name):
         """Register a new Google Cloud account for tracking."""
-        if account_name not in self.quota_state['accounts']:
-            self.quota_state['accounts'][account_name] = {
-                'used_chars': 0,
-                'quota_limit': MONTHLY_QUOTA,
-                'available': MONTHLY_QUOTA
-            }
-            self._save_quota_state()
+        with self.lock:
+            if account_name not in self.quota_state['accounts']:
+                self.quota_state['accounts'][account_name] = {
+                    'used_chars': 0,
+                    'quota_limit': MONTHLY_QUOTA,
+                    'available': MONTHLY_QUOTA
+                }
+                self._save_quota_state()
     
     def get_account_status(self, account_name):
         """
@@ -145,28 +150,29 @@ class VoiceUsageTracker:
             voice_used: Voice name used
             video_id: Optional video identifier
         """
-        # Update quota state (only for Google)
-        if provider == 'google':
-            if account_name not in self.quota_state['accounts']:
-                self.register_account(account_name)
+        with self.lock:
+            # Update quota state (only for Google)
+            if provider == 'google':
+                if account_name not in self.quota_state['accounts']:
+                    self.register_account(account_name)
             
-            acc = self.quota_state['accounts'][account_name]
-            acc['used_chars'] += chars_used
-            acc['available'] = acc['quota_limit'] - acc['used_chars']
-            self._save_quota_state()
-        
-        # Append to usage history
-        log_entry = {
-            'timestamp': datetime.datetime.now().isoformat(),
-            'account': account_name,
-            'provider': provider,
-            'chars': chars_used,
-            'voice': voice_used,
-            'video_id': video_id,
-            'cost_usd': self._estimate_cost(provider, chars_used) if provider == 'google' else 0
-        }
-        self.usage_history.append(log_entry)
-        self._save_usage_history()
+                acc = self.quota_state['accounts'][account_name]
+                acc['used_chars'] += chars_used
+                acc['available'] = acc['quota_limit'] - acc['used_chars']
+                self._save_quota_state()
+        
+            # Append to usage history
+            log_entry = {
+                'timestamp': datetime.datetime.now().isoformat(),
+                'account': account_name,
+                'provider': provider,
+                'chars': chars_used,
+                'voice': voice_used,
+                'video_id': video_id,
+                'cost_usd': self._estimate_cost(provider, chars_used) if provider == 'google' else 0
+            }
+            self.usage_history.append(log_entry)
+            self._save_usage_history()
     
     def _estimate_cost(self, provider, chars_used):
         """
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+File: worker_pool.py
+Multi-process row worker pool for main_shorts_generator (--workers N).
+
+- Each worker process owns its own ShortsEngine + GeminiManager and renders
+  one row at a time, so Whisper/moviepy/ffmpeg state never crosses rows
+  of different workers.
+- A job is a row group (rows sharing a chapter PDF / lecture video); the whole
+  group goes to one worker so the download and transcript are reused. Results
+  stream back per row; the parent deletes shared downloads.
+- Workers are recycled after MAX_JOBS_PER_WORKER rows or once their RSS
+  crosses MAX_RSS_MB (checked between rows).
+- The parent watches RSS while a row is rendering and kills a worker that
+  runs past KILL_RSS_MB. A crashed or killed worker only fails its own row;
+  a replacement is spawned and the batch continues.
+"""
+
+import os
+import queue
+import traceback
+import multiprocessing as mp
+
+POLL_INTERVAL = 1.0
+
+def get_rss_mb(pid=None):
+    """
+    Resident set size of a process in MB (Linux /proc, falls back to peak RSS of self).
+    """
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except (OSError, ValueError):
+        pass
+    if pid == os.getpid():
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return 0.0
+
+def _worker_main(worker_id, job_queue, result_queue, max_jobs, max_rss_mb):
+    """
+    Worker process entry point. Heavy modules are imported here (in the child),
+    never in the parent.
+    """
+    import main_shorts_generator as msg
+    from shorts_engine import ShortsEngine
+
+    try:
+        engine = ShortsEngine(msg.CONFIG_FILE)
+        gemini = msg.GeminiManager()
+    except Exception as e:
+        result_queue.put(('init_failed', worker_id, None, str(e)))
+        return
+
+    jobs_done = 0
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+
+        job_id, group, plans = job
+
+        def report(row_num, success, meta_data):
+            result_queue.put(('row', worker_id, job_id, (row_num, success, meta_data)))
+
+        try:
+            msg.process_group(engine, gemini, group, report, delete_files=False, plans=plans)
+        except Exception:
+            # Rows without a 'row' message are failed by the parent on 'done'
+            traceback.print_exc()
+
+        jobs_done += len(group)
+        rss = get_rss_mb()
+        retire = None
+        if jobs_done >= max_jobs:
+            retire = f"{jobs_done} jobs done"
+        elif max_rss_mb and rss >= max_rss_mb:
+            retire = f"RSS {rss:.0f} MB >= {max_rss_mb} MB"
+
+        # Retirement travels with the result so the parent never hands this worker another group
+        result_queue.put(('done', worker_id, job_id, (rss, retire)))
+        if retire:
+            break
+
+class _Worker:
+    """Parent-side handle for one worker process."""
+
+    def __init__(self, worker_id, process, job_queue):
+        self.worker_id = worker_id
+        self.process = process
+        self.job_queue = job_queue
+        self.current_job = None
+        self.retiring = False
+
+class RowWorkerPool:
+    """
+    Runs process_group for sheet row groups across recycled worker processes.
+
+    Usage:
+        pool = RowWorkerPool(num_workers=4, on_result=write_back)
+        processed = pool.run([[(row_num, row), ...], ...])
+    """
+
+    def __init__(self, num_workers, max_jobs_per_worker=4, max_rss_mb=6144,
+                 kill_rss_mb=12288, on_result=None, failure_prefix="Failed: ", context_fn=None):
+        """
+        Args:
+            num_workers: Max concurrent worker processes
+            max_jobs_per_worker: Recycle a worker after this many rows (checked between groups)
+            max_rss_mb: Recycle a worker between rows once RSS reaches this
+            kill_rss_mb: Kill a worker mid-row once RSS reaches this (0 disables)
+            on_result: Callback(row_num, success, meta_data), called in the parent
+            failure_prefix: Status prefix for rows lost to a crashed worker
+            context_fn: Callable(group) -> picklable extras sent with the group (scheduler plans)
+        """
+        self.num_workers = max(1, int(num_workers))
+        self.max_jobs_per_worker = max(1, int(max_jobs_per_worker))
+        self.max_rss_mb = max_rss_mb
+        self.kill_rss_mb = kill_rss_mb
+        self.on_result = on_result
+        self.failure_prefix = failure_prefix
+        self.context_fn = context_fn
+
+        # 'spawn' gives every worker a clean interpreter (no inherited torch/ffmpeg state)
+        self.ctx = mp.get_context('spawn')
+        self.result_queue = self.ctx.Queue()
+        self.workers = {}
+        self.next_worker_id = 0
+
+        self.source = None
+        self.pending = []
+        self.jobs = {}
+        self.outstanding = {}
+        self.completed = 0
+        self.init_failures = 0
+
+    # ------------------------------------------------------------------
+    # Worker lifecycle
+    # ------------------------------------------------------------------
+    def _spawn_worker(self):
+        worker_id = self.next_worker_id
+        self.next_worker_id += 1
+
+        job_queue = self.ctx.Queue()
+        process = self.ctx.Process(
+            target=_worker_main,
+            args=(worker_id, job_queue, self.result_queue,
+                  self.max_jobs_per_worker, self.max_rss_mb),
+            name=f"shorts-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self.workers[worker_id] = _Worker(worker_id, process, job_queue)
+        print(f"   🧵 Worker {worker_id} started (pid {process.pid})")
+
+    def _retire_worker(self, worker, reason):
+        worker.retiring = True
+        print(f"   ♻️ Recycling worker {worker.worker_id}: {reason}")
+        worker.process.join(timeout=30)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join()
+        self.workers.pop(worker.worker_id, None)
+
+    def _kill_worker(self, worker, reason):
+        print(f"   💀 Killing worker {worker.worker_id} (pid {worker.process.pid}): {reason}")
+        worker.process.kill()
+        worker.process.join()
+        self._fail_current_job(worker, reason)
+        self.workers.pop(worker.worker_id, None)
+
+    def _fail_current_job(self, worker, reason):
+        if worker.current_job is None:
+            return
+        job_id = worker.current_job
+        worker.current_job = None
+        self._fail_outstanding(job_id, f"Worker crashed ({reason})")
+
+    def _fail_outstanding(self, job_id, reason):
+        for row_num in self.outstanding.pop(job_id, []):
+            self._report(row_num, False, {"status": f"{self.failure_prefix} {reason}"})
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+    def _report(self, row_num, success, meta_data):
+        self.completed += 1
+        if self.on_result:
+            try:
+                self.on_result(row_num, success, meta_data)
+            except Exception as e:
+                print(f"⚠️ Result callback failed for row {row_num}: {e}")
+
+    def _has_work(self):
+        """Pulls the next row from the source only when a worker can take it."""
+        if not self.pending and self.source is not None:
+            try:
+                group = next(self.source)
+            except StopIteration:
+                self.source = None
+                return False
+            job_id = len(self.jobs)
+            self.jobs[job_id] = group
+            self.outstanding[job_id] = [row_num for row_num, _ in group]
+            self.pending.append(job_id)
+        return bool(self.pending)
+
+    def _dispatch(self):
+        # Keep the pool topped up while there is work left
+        busy_or_idle = len(self.workers)
+        while busy_or_idle < self.num_workers and self._has_work():
+            self._spawn_worker()
+            busy_or_idle += 1
+
+        for worker in list(self.workers.values()):
+            if worker.current_job is None and not worker.retiring:
+                if not self._has_work():
+                    break
+                job_id = self.pending.pop(0)
+                worker.current_job = job_id
+                group = self.jobs[job_id]
+                context = self.context_fn(group) if self.context_fn else None
+                worker.job_queue.put((job_id, group, context))
+
+    def _handle_message(self, msg):
+        kind, worker_id, job_id, payload = msg
+        worker = self.workers.get(worker_id)
+
+        if kind == 'init_failed':
+            print(f"❌ Worker {worker_id} failed to initialise: {payload}")
+            if worker:
+                worker.retiring = True
+                # The row was handed over before init finished; give it back to the queue
+                if worker.current_job is not None:
+                    self.pending.insert(0, worker.current_job)
+                    worker.current_job = None
+                self.workers.pop(worker_id, None)
+            self.init_failures += 1
+            # Respawning would fail the same way; fail the queued rows instead of looping
+            # and leave rows not yet pulled from the source untouched
+            if not self.workers or self.init_failures >= 3:
+                self.source = None
+                while self.pending:
+                    self._fail_outstanding(self.pending.pop(0), f"Worker init failed: {payload}")
+            return
+
+        if kind == 'row':
+            row_num, success, meta_data = payload
+            rows = self.outstanding.get(job_id, [])
+            if row_num in rows:
+                rows.remove(row_num)
+                self._report(row_num, success, meta_data)
+            return
+
+        if kind == 'done':
+            rss, retire = payload
+            if worker:
+                worker.current_job = None
+            print(f"   📊 Worker {worker_id} finished rows {[n for n, _ in self.jobs[job_id]]} (RSS {rss:.0f} MB)")
+            self._fail_outstanding(job_id, "Row was not processed")
+            if retire and worker:
+                self._retire_worker(worker, retire)
+
+    def _drain_results(self, timeout=0.0):
+        try:
+            msg = self.result_queue.get(timeout=timeout) if timeout else self.result_queue.get_nowait()
+        except queue.Empty:
+            return
+        self._handle_message(msg)
+        while True:
+            try:
+                self._handle_message(self.result_queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def _check_health(self):
+        for worker in list(self.workers.values()):
+            if worker.retiring:
+                continue
+
+            if not worker.process.is_alive():
+                # A result may still be in flight from just before the exit
+                self._drain_results()
+                if worker.worker_id not in self.workers:
+                    continue
+                reason = f"exit code {worker.process.exitcode}"
+                print(f"   ❌ Worker {worker.worker_id} died: {reason}")
+                self._fail_current_job(worker, reason)
+                self.workers.pop(worker.worker_id, None)
+                continue
+
+            if self.kill_rss_mb and worker.current_job is not None:
+                rss = get_rss_mb(worker.process.pid)
+                if rss >= self.kill_rss_mb:
+                    self._kill_worker(worker, f"RSS {rss:.0f} MB >= {self.kill_rss_mb} MB")
+
+    def _shutdown(self):
+        for worker in list(self.workers.values()):
+            try:
+                worker.job_queue.put(None)
+            except Exception:
+                pass
+        for worker in list(self.workers.values()):
+            worker.process.join(timeout=30)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+        self.workers.clear()
+
+    def run(self, groups):
+        """
+        Processes rows and blocks until every row has a result.
+
+        Args:
+            groups: Iterable of row groups, each a list of (sheet_row_number, row_values);
+                  consumed lazily, one group ahead of a free worker
+
+        Returns:
+            int: Number of rows that were attempted
+        """
+        self.source = iter(groups)
+        self.jobs = {}
+        self.outstanding = {}
+        self.pending = []
+        self.completed = 0
+
+        try:
+            while self._has_work() or any(w.current_job is not None for w in self.workers.values()):
+                self._dispatch()
+                self._drain_results(timeout=POLL_INTERVAL)
+                self._check_health()
+        except KeyboardInterrupt:
+            print("\n🛑 Interrupted: stopping workers...")
+            for worker in list(self.workers.values()):
+                worker.process.kill()
+            raise
+        finally:
+            self._shutdown()
+
+        return self.completed